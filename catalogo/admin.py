@@ -3,6 +3,35 @@
 from django.contrib import admin
 from .models import Producto, Categoria, Marca
 
+
+class BajaLogicaAdminMixin:
+    # El admin ve también lo dado de baja (el manager por defecto lo oculta).
+    # Sin borrado físico: se da de baja y la purga (purgar_eliminados) borra después.
+    # Las acciones pasan por dar_de_baja()/restaurar() para que corran save()
+    # y las señales (feed de sincronización, caché del escáner, fichas).
+    actions = ['dar_de_baja', 'restaurar']
+
+    def get_queryset(self, request):
+        return self.model.todos.all()
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description="Dar de baja los seleccionados")
+    def dar_de_baja(self, request, queryset):
+        registros = list(queryset.filter(activo=True))
+        for registro in registros:
+            registro.dar_de_baja()
+        self.message_user(request, f"{len(registros)} dado(s) de baja.")
+
+    @admin.action(description="Restaurar los seleccionados")
+    def restaurar(self, request, queryset):
+        registros = list(queryset.filter(activo=False))
+        for registro in registros:
+            registro.restaurar()
+        self.message_user(request, f"{len(registros)} restaurado(s).")
+
+
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
     list_display = ('nombre',)
@@ -14,9 +43,9 @@ class MarcaAdmin(admin.ModelAdmin):
     search_fields = ('nombre',) # Necesario si Producto lo usa en autocomplete
 
 @admin.register(Producto)
-class ProductoAdmin(admin.ModelAdmin):
-    list_display = ('sku', 'nombre', 'categoria', 'marca', 'precio_venta', 'stock_actual')
-    list_filter = ('categoria', 'marca', 'perishable', 'control_por_lote')
+class ProductoAdmin(BajaLogicaAdminMixin, admin.ModelAdmin):
+    list_display = ('sku', 'nombre', 'categoria', 'marca', 'precio_venta', 'stock_actual', 'activo')
+    list_filter = ('activo', 'categoria', 'marca', 'perishable', 'control_por_lote')
     
     # --- ESTA ES LA LÍNEA QUE SOLUCIONA EL ERROR ---
     # Le dice a Django cómo buscar un Producto
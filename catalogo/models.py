@@ -1,6 +1,53 @@
 # En: catalogo/models.py
 
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Cast, Floor
+from django.utils import timezone
+
+
+def calcular_precio_con_iva(precio_venta, impuesto_iva):
+    # Misma regla que la propiedad Producto.precio_venta_con_iva, reutilizable
+    # cuando solo tenemos los valores (ej: .values() o caché del escáner).
+    # Aritmética entera con redondeo hacia arriba desde ,5: da exactamente lo
+    # mismo que precio_con_iva_sql() en la base (sin flotantes de por medio).
+    if precio_venta is None or impuesto_iva is None:
+        return 0
+    return (precio_venta * (100 + impuesto_iva) + 50) // 100
+
+
+def precio_con_iva_sql(precio='precio_venta', iva='impuesto_iva'):
+    # La misma regla como expresión SQL, para ordenar y filtrar en la base.
+    # FLOOR: en MySQL la división entre enteros devuelve decimal.
+    return Cast(Floor((F(precio) * (100 + F(iva)) + 50) / 100), models.IntegerField())
+
+
+class ProductoQuerySet(models.QuerySet):
+
+    def con_precio_con_iva(self):
+        """Anota precio_con_iva (mismo valor que la propiedad precio_venta_con_iva)."""
+        return self.annotate(precio_con_iva=precio_con_iva_sql())
+
+class ActivosManager(models.Manager):
+    # Baja lógica: el manager por defecto (objects) oculta lo dado de baja.
+    # Para verlo todo (purga, reportes históricos, snapshots) usar Modelo.todos.
+    def get_queryset(self):
+        return super().get_queryset().filter(activo=True)
+
+
+class BajaLogicaMixin:
+    # Requiere los campos 'activo' y 'fecha_baja'. El borrado físico (con todo
+    # su historial) lo hace en segundo plano: manage.py purgar_eliminados
+    def dar_de_baja(self):
+        self.activo = False
+        self.fecha_baja = timezone.now()
+        self.save(update_fields=['activo', 'fecha_baja'])
+
+    def restaurar(self):
+        self.activo = True
+        self.fecha_baja = None
+        self.save(update_fields=['activo', 'fecha_baja'])
+
 
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100, verbose_name='Nombre de la Categoría')
@@ -12,7 +59,7 @@ class Marca(models.Model):
     def __str__(self):
         return self.nombre
 
-class Producto(models.Model):
+class Producto(BajaLogicaMixin, models.Model):
     # --- 1. Identificación ---
     sku = models.CharField(max_length=50, unique=True, verbose_name="SKU", blank=True)
     ean_upc = models.CharField(max_length=50, unique=True, blank=True, null=True, verbose_name="EAN/UPC")
@@ -47,14 +94,19 @@ class Producto(models.Model):
     ficha_tecnica_url = models.FileField(upload_to='fichas/', null=True, blank=True, verbose_name='Ficha Técnica') # <-- NUEVO
     es_vegano = models.BooleanField(default=False, verbose_name="Es Vegano")
     sin_gluten = models.BooleanField(default=False, verbose_name="Sin Gluten")
+
+    # --- Baja lógica (ver ActivosManager) ---
+    activo = models.BooleanField(default=True, verbose_name="Activo")
+    fecha_baja = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de Baja")
+
+    objects = ActivosManager.from_queryset(ProductoQuerySet)()
+    todos = models.Manager.from_queryset(ProductoQuerySet)()
     
     # --- 5. Propiedades (Derivados) ---
     @property
     def precio_venta_con_iva(self):
-        if self.precio_venta is None or self.impuesto_iva is None:
-            return 0
-        precio_con_iva = self.precio_venta * (1 + (self.impuesto_iva / 100))
-        return round(precio_con_iva)
+        # En consultas: Producto.objects.con_precio_con_iva() (ordenar/filtrar en SQL)
+        return calcular_precio_con_iva(self.precio_venta, self.impuesto_iva)
     
     @property
     def alerta_bajo_stock(self): # <-- NUEVO
@@ -1,8 +1,17 @@
-from django.shortcuts import render, get_object_or_404
+from django.http import Http404
+from django.shortcuts import render
 from .models import Producto, Categoria
 
-def inicio(request):
-    productos = Producto.objects.all()
+# Las vistas de solo lectura del catálogo son async: bajo ASGI no ocupan un
+# thread mientras esperan. Las consultas NO corren en el loop: el ORM async
+# (aget, async for) envuelve cada una en sync_to_async(thread_sensitive=True),
+# o sea un salto al thread de sincronía por consulta. Por eso no son más
+# rápidas que la versión síncrona (ver benchmark_async).
+# Ojo: los querysets se materializan antes de render(), porque la plantilla
+# no puede tocar la BD desde un contexto async.
+
+async def inicio(request):
+    productos = [p async for p in Producto.objects.all()]
 
     return render(request, 'catalogo/inicio.html', {'productos': productos})
 
@@ -10,16 +19,22 @@ def acercade(request):
 
     return render(request, 'catalogo/acercade.html')
 
-def producto(request, producto_id):
-    producto_obj = get_object_or_404(Producto, id=producto_id)
+async def producto(request, producto_id):
+    try:
+        producto_obj = await Producto.objects.select_related('categoria').aget(id=producto_id)
+    except Producto.DoesNotExist:
+        raise Http404("Producto no encontrado.")
 
     return render(request, 'catalogo/producto.html', {'producto': producto_obj})
 
-def categoria(request, nombre_categoria):
-    categoria_obj = get_object_or_404(Categoria, nombre=nombre_categoria)
-    productos = Producto.objects.filter(categoria=categoria_obj)
+async def categoria(request, nombre_categoria):
+    try:
+        categoria_obj = await Categoria.objects.aget(nombre=nombre_categoria)
+    except Categoria.DoesNotExist:
+        raise Http404("Categoría no encontrada.")
+    productos = [p async for p in Producto.objects.filter(categoria=categoria_obj)]
 
     return render(request, 'catalogo/categoria.html', {
         'categoria': categoria_obj,
         'productos': productos
-    })
\ No newline at end of file
+    })
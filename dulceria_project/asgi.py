@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+El feed en vivo de stock (gestion/inventario/eventos/, Server-Sent Events)
+es una vista async: servirlo con un servidor ASGI, por ejemplo
+    uvicorn dulceria_project.asgi:application
 """
 
 import os
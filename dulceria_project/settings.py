@@ -40,16 +40,21 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'catalogo',
     'gestion',
-    'rutificador',
+    # 'rutificador' no va aquí: es una librería, no una app de Django, y como app
+    # se importaba (~100 ms) en cada arranque sin usarse
 ]
 
 MIDDLEWARE = [
+    # Primero, para que mida la petición completa (ver gestion/middleware.py)
+    'gestion.middleware.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    # Permisos por rol en toda la URLconf de gestión (necesita usuario y mensajes)
+    'gestion.middleware.PermisosMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -59,12 +64,21 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Plantillas compiladas una vez por proceso, también con DEBUG (runserver
+            # vacía esta caché al editar una plantilla); no depende del default de Django
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'gestion.permisos.permisos',
+                'gestion.fragmentos.fragmentos',
             ],
         },
     },
@@ -90,6 +104,66 @@ DATABASES = {
     }
 }
 
+# Para benchmarks y pruebas locales sin MySQL: DULCERIA_DB=sqlite python manage.py ...
+if os.environ.get('DULCERIA_DB') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+
+# Caché: Redis compartido si se define DULCERIA_REDIS_URL (necesario con varios
+# procesos para que el límite de intentos de login y las sesiones sean comunes);
+# si no, memoria local del proceso.
+if os.environ.get('DULCERIA_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DULCERIA_REDIS_URL'],
+        }
+    }
+    # Sesiones: se leen de la caché compartida y solo se escriben en la base al modificarse
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    # Fragmentos de formularios cacheados (ver gestion/fragmentos.py)
+    FRAGMENTOS_FORMULARIOS = True
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+    # Con caché por proceso las sesiones van solo a la base: con cached_db un
+    # logout (o cerrar_sesiones) limpiaría solo la caché del worker que lo atiende
+    # y los demás seguirían aceptando la sesión cerrada.
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    # Igual con los formularios cacheados: la versión de opciones la cambia el
+    # worker que guarda y los demás seguirían mostrando opciones viejas.
+    FRAGMENTOS_FORMULARIOS = False
+
+# Proxies inversos de confianza delante de la app (nginx, balanceador). Con 0
+# la IP del cliente es REMOTE_ADDR; con N se toma de X-Forwarded-For, la que
+# agregó el proxy más cercano (ver gestion/autenticacion.ip_de).
+PROXIES_CONFIABLES = int(os.environ.get('DULCERIA_PROXIES_CONFIABLES', '0'))
+
+
+# Vigencia (segundos) de los fragmentos de plantilla cacheados (ver gestion/fragmentos.py)
+FRAGMENTOS_TTL = 600
+
+# Atraso máximo (segundos) tolerado en el stock de los reportes cacheados (ver gestion/reportes.py)
+REPORTES_VENTANA = 300
+
+# Antigüedad mínima (segundos) de un cambio para entregarlo al feed de sincronización (ver gestion/sincronizacion.py)
+SYNC_MARGEN_SEGUNDOS = 5
+
+
+# Autenticación: límite de intentos fallidos y bloqueo por estado (ver gestion/autenticacion.py)
+AUTHENTICATION_BACKENDS = ['gestion.autenticacion.EstadoModelBackend']
+LOGIN_VENTANA_SEGUNDOS = 15 * 60
+LOGIN_MAX_INTENTOS_USUARIO = 5
+LOGIN_MAX_INTENTOS_IP = 20
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -155,4 +229,47 @@ LOGOUT_REDIRECT_URL = 'login'
 # Página de login (donde se redirige si se intenta acceder a una vista protegida)
 LOGIN_URL = 'login'
 
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
\ No newline at end of file
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Segundos que una entrada de la caché del escáner POS se considera vigente
+# antes de refrescarla desde la BD (los cambios en otros workers se ven tras este plazo).
+ESCANER_CACHE_TTL = 30
+
+
+# Eventos en vivo de stock (SSE, ver gestion/eventos.py): cada cuántos segundos
+# leer los movimientos nuevos de la BD. Obligatorio con varios workers (el aviso
+# en vivo es por proceso); None = solo los del propio worker, sin consultas.
+EVENTOS_SONDEO = float(os.environ['EVENTOS_SONDEO']) if os.environ.get('EVENTOS_SONDEO') else None
+
+
+# Instrumentación por petición (gestion.middleware.InstrumentacionMiddleware)
+# MUESTREO: fracción de peticiones medidas (1.0 = todas, 0 = ninguna).
+INSTRUMENTACION_MUESTREO = 1.0 if DEBUG else 0.1
+INSTRUMENTACION_UMBRAL_LENTO_MS = 500
+INSTRUMENTACION_MIN_DUPLICADAS = 5
+
+# Métricas Prometheus (/metrics, ver gestion/metricas.py)
+# METRICAS_DIR: directorio compartido para sumar los workers de gunicorn/uwsgi (None = un solo proceso).
+METRICAS_DIR = os.environ.get('METRICAS_DIR')
+METRICAS_INTERVALO_VOLCADO = 5
+# Si se define, /metrics exige la cabecera "Authorization: Bearer <token>".
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+# Sin token, /metrics solo responde a estas IPs (separadas por coma; por defecto loopback).
+METRICAS_IPS = [ip.strip() for ip in os.environ.get('METRICAS_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'gestion': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
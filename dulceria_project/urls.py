@@ -16,15 +16,23 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from django.contrib.auth import views as auth_views
 from django.conf import settings
 from django.conf.urls.static import static
+from gestion.views import metricas_prometheus
+from gestion.autenticacion import LoginForm
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('catalogo.urls')),
+    # Login con límite de intentos (ver gestion/autenticacion.py); el resto, el de Django
+    path('accounts/login/', auth_views.LoginView.as_view(authentication_form=LoginForm), name='login'),
     path('accounts/', include('django.contrib.auth.urls')),
 
     path('gestion/', include('gestion.urls')),
+
+    # Métricas en formato Prometheus
+    path('metrics', metricas_prometheus, name='metricas'),
 ]
 
 if settings.DEBUG:
@@ -1,18 +1,32 @@
 # En: gestion/admin.py
 
 from django.contrib import admin
-from .models import Proveedor, MovimientoInventario
+from catalogo.admin import BajaLogicaAdminMixin
+from .models import Proveedor, MovimientoInventario, VentaPOS, CorreoPendiente
 
 # Registramos los modelos del PDF
 @admin.register(Proveedor)
-class ProveedorAdmin(admin.ModelAdmin):
-    list_display = ('razon_social', 'rut_nif', 'email', 'estado')
+class ProveedorAdmin(BajaLogicaAdminMixin, admin.ModelAdmin):
+    list_display = ('razon_social', 'rut_nif', 'email', 'estado', 'activo')
     search_fields = ('razon_social', 'rut_nif')
-    list_filter = ('estado', 'pais')
+    list_filter = ('activo', 'estado', 'pais')
 
 @admin.register(MovimientoInventario)
 class MovimientoInventarioAdmin(admin.ModelAdmin):
     list_display = ('fecha', 'producto', 'tipo', 'cantidad', 'proveedor', 'doc_ref')
     search_fields = ('producto__sku', 'producto__nombre', 'doc_ref', 'lote', 'serie')
     list_filter = ('tipo', 'bodega', 'fecha')
-    autocomplete_fields = ('producto', 'proveedor') # Facilita la búsqueda
\ No newline at end of file
+    autocomplete_fields = ('producto', 'proveedor') # Facilita la búsqueda
+
+@admin.register(VentaPOS)
+class VentaPOSAdmin(admin.ModelAdmin):
+    list_display = ('id_venta', 'fecha', 'bodega', 'usuario')
+    search_fields = ('id_venta',)
+    list_filter = ('bodega', 'fecha')
+
+@admin.register(CorreoPendiente)
+class CorreoPendienteAdmin(admin.ModelAdmin):
+    list_display = ('asunto', 'estado', 'intentos', 'proximo_intento', 'fecha_creacion')
+    list_filter = ('estado',)
+    # El cuerpo puede traer claves temporales: no se muestra
+    exclude = ('cuerpo',)
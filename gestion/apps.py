@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class GestionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gestion'
+
+    def ready(self):
+        # Registra los receptores de señales (caché del escáner, etc.)
+        from . import signals  # noqa: F401
+        # Anotador de consultas en cada conexión nueva (antes de abrir ninguna)
+        from . import middleware  # noqa: F401
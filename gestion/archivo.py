@@ -0,0 +1,82 @@
+# En: gestion/archivo.py
+
+from collections import defaultdict
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import F, Max
+
+from .models import MovimientoInventario, MovimientoArchivado, SaldoCierre
+
+# -----------------------------------------------------------------
+# ARCHIVO DEL LEDGER (períodos cerrados)
+# -----------------------------------------------------------------
+# MovimientoInventario solo crece. Los meses cerrados se mueven, por
+# tandas, a MovimientoArchivado (mismo id y columnas) y su efecto queda
+# acumulado en SaldoCierre por producto/bodega/lote. Así la tabla viva
+# solo tiene lo reciente y:
+#   - saldo real = SaldoCierre + movimientos vivos
+#   - historial completo = movimientos vivos + archivados (ver historial())
+# Los resúmenes diarios (ResumenDiarioMovimiento) no se tocan: el dashboard
+# y los reportes de períodos archivados siguen leyendo de ahí.
+
+CAMPOS = [
+    'id', 'producto_id', 'proveedor_id', 'tipo', 'cantidad', 'unidad', 'cantidad_documento', 'fecha', 'bodega_id',
+    'lote', 'serie', 'fecha_vencimiento', 'doc_ref', 'fecha_comprometida', 'motivo', 'observaciones',
+]
+IDS_POR_UPDATE = 1000
+
+
+def fecha_corte():
+    """Fecha hasta la que el ledger está archivado (None si nunca se archivó)."""
+    return SaldoCierre.objects.aggregate(corte=Max('fecha_corte'))['corte']
+
+
+def _acumular_saldos(filas, corte):
+    deltas = {}
+    for fila in filas:
+        delta = MovimientoInventario(tipo=fila['tipo'], cantidad=fila['cantidad']).delta_bodega
+        if delta:
+            clave = (fila['producto_id'], fila['bodega_id'], fila['lote'] or '')
+            deltas[clave] = deltas.get(clave, 0) + delta
+    if not deltas:
+        return
+    SaldoCierre.objects.bulk_create(
+        [SaldoCierre(producto_id=pr, bodega_id=bo, lote=lote, fecha_corte=corte) for pr, bo, lote in deltas],
+        ignore_conflicts=True,
+    )
+    # Un UPDATE relativo por valor de delta distinto (son pocos comparados con las claves)
+    ids = {
+        (pr, bo, lote): pk for pk, pr, bo, lote in
+        SaldoCierre.objects.filter(producto_id__in={pr for pr, _, _ in deltas}).values_list('pk', 'producto_id', 'bodega_id', 'lote')
+    }
+    por_delta = defaultdict(list)
+    for clave, delta in deltas.items():
+        por_delta[delta].append(ids[clave])
+    for delta, pks in por_delta.items():
+        for inicio in range(0, len(pks), IDS_POR_UPDATE):
+            SaldoCierre.objects.filter(pk__in=pks[inicio:inicio + IDS_POR_UPDATE]).update(
+                cantidad=F('cantidad') + delta, fecha_corte=corte,
+            )
+
+
+def archivar_tanda(corte, lote=5000):
+    """Archiva hasta `lote` movimientos anteriores a `corte`. Devuelve cuántos movió."""
+    with transaction.atomic():
+        filas = list(MovimientoInventario.objects.filter(fecha__lt=corte).order_by('pk').values(*CAMPOS)[:lote])
+        if not filas:
+            return 0
+        MovimientoArchivado.objects.bulk_create([MovimientoArchivado(**fila) for fila in filas])
+        _acumular_saldos(filas, corte)
+        MovimientoInventario.objects.filter(pk__in=[fila['id'] for fila in filas]).delete()
+    return len(filas)
+
+
+def historial(filtro=None, chunk_size=2000):
+    """Movimientos vivos y archivados (de más nuevo a más antiguo), como un solo iterable."""
+    vivos = MovimientoInventario.objects.select_related('producto', 'bodega').order_by('-fecha')
+    archivados = MovimientoArchivado.objects.select_related('producto', 'bodega').order_by('-fecha')
+    if filtro is not None:
+        vivos, archivados = vivos.filter(filtro), archivados.filter(filtro)
+    # Todo lo archivado es anterior a lo vivo: basta con encadenar
+    return chain(vivos.iterator(chunk_size=chunk_size), archivados.iterator(chunk_size=chunk_size))
@@ -0,0 +1,174 @@
+# En: gestion/autenticacion.py
+
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.forms import AuthenticationForm
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.utils import timezone
+
+from .models import CustomUser, SesionActiva
+
+# -----------------------------------------------------------------
+# LÍMITE DE INTENTOS DE LOGIN (ventana deslizante en caché)
+# -----------------------------------------------------------------
+# Cada login fallido suma 1 a un contador por usuario y otro por IP. Se
+# usan dos ventanas fijas (la actual y la anterior) ponderadas según lo
+# que va de la actual: aproxima una ventana deslizante con solo cache.incr,
+# sin tocar la base. Si se pasa el máximo, el backend ni siquiera calcula
+# el hash de la clave (que es lo caro de un ataque de fuerza bruta).
+#
+# Configuración en settings: LOGIN_VENTANA_SEGUNDOS, LOGIN_MAX_INTENTOS_USUARIO
+# y LOGIN_MAX_INTENTOS_IP. Con varios procesos la caché debe ser compartida
+# (Redis, ver CACHES en settings); con LocMem el límite es por proceso.
+# Detrás de un proxy inverso hay que definir PROXIES_CONFIABLES (ver ip_de).
+
+PREFIJO = 'login-fallidos'
+
+
+def _ventana():
+    return getattr(settings, 'LOGIN_VENTANA_SEGUNDOS', 900)
+
+
+def _claves(username, ip):
+    claves = []
+    if username:
+        claves.append(('usuario', str(username).strip().lower(), getattr(settings, 'LOGIN_MAX_INTENTOS_USUARIO', 5)))
+    if ip:
+        claves.append(('ip', ip, getattr(settings, 'LOGIN_MAX_INTENTOS_IP', 20)))
+    return claves
+
+
+def _intentos(tipo, valor, ahora=None):
+    ventana = _ventana()
+    ahora = ahora or time.time()
+    actual = int(ahora // ventana)
+    valores = cache.get_many([f'{PREFIJO}:{tipo}:{valor}:{actual}', f'{PREFIJO}:{tipo}:{valor}:{actual - 1}'])
+    transcurrido = (ahora % ventana) / ventana
+    return (
+        valores.get(f'{PREFIJO}:{tipo}:{valor}:{actual}', 0)
+        + valores.get(f'{PREFIJO}:{tipo}:{valor}:{actual - 1}', 0) * (1 - transcurrido)
+    )
+
+
+def ip_de(request):
+    """
+    IP del cliente. Detrás de un proxy inverso REMOTE_ADDR es la del proxy (y
+    todos los clientes compartirían el límite por IP): con PROXIES_CONFIABLES
+    = N se usa la N-ésima dirección desde la derecha de X-Forwarded-For, la
+    que anotó nuestro proxy más externo. Las de más a la izquierda las manda
+    el cliente y no se usan (se pueden falsificar).
+    """
+    if request is None:
+        return ''
+    proxies = getattr(settings, 'PROXIES_CONFIABLES', 0)
+    if proxies:
+        reenviadas = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(reenviadas) >= proxies:
+            return reenviadas[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def bloqueado_por_intentos(username, ip):
+    return any(_intentos(tipo, valor) >= maximo for tipo, valor, maximo in _claves(username, ip))
+
+
+def registrar_fallo(username, ip):
+    ventana = _ventana()
+    actual = int(time.time() // ventana)
+    for tipo, valor, _ in _claves(username, ip):
+        clave = f'{PREFIJO}:{tipo}:{valor}:{actual}'
+        # add() no pisa un contador existente; dura dos ventanas (la actual y como "anterior")
+        cache.add(clave, 0, timeout=2 * ventana)
+        try:
+            cache.incr(clave)
+        except ValueError:
+            # Expiró entre add() e incr()
+            cache.set(clave, 1, timeout=2 * ventana)
+
+
+def limpiar_fallos(username):
+    ventana = _ventana()
+    actual = int(time.time() // ventana)
+    valor = str(username).strip().lower()
+    cache.delete_many([f'{PREFIJO}:usuario:{valor}:{actual}', f'{PREFIJO}:usuario:{valor}:{actual - 1}'])
+
+
+# -----------------------------------------------------------------
+# BACKEND DE AUTENTICACIÓN
+# -----------------------------------------------------------------
+class EstadoModelBackend(ModelBackend):
+    """
+    ModelBackend que además:
+      - corta los intentos cuando el usuario o la IP superan el límite
+      - no deja entrar a usuarios BLOQUEADO (tampoco a sus sesiones abiertas:
+        get_user() pasa por user_can_authenticate() en cada petición, con el
+        usuario que igual se lee para request.user; no agrega consultas)
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(CustomUser.USERNAME_FIELD)
+        ip = ip_de(request)
+        if bloqueado_por_intentos(username, ip):
+            # PermissionDenied detiene la cadena de backends (y emite user_login_failed)
+            raise PermissionDenied("Demasiados intentos fallidos.")
+        usuario = super().authenticate(request, username=username, password=password, **kwargs)
+        if usuario is None:
+            registrar_fallo(username, ip)
+        else:
+            limpiar_fallos(username)
+        return usuario
+
+    def user_can_authenticate(self, user):
+        return super().user_can_authenticate(user) and user.estado != CustomUser.Estados.BLOQUEADO
+
+
+class LoginForm(AuthenticationForm):
+    error_messages = {
+        **AuthenticationForm.error_messages,
+        'demasiados_intentos': "Demasiados intentos fallidos. Espera unos minutos antes de volver a intentarlo.",
+    }
+
+    def clean(self):
+        username = self.cleaned_data.get('username')
+        if username and bloqueado_por_intentos(username, ip_de(self.request)):
+            raise ValidationError(self.error_messages['demasiados_intentos'], code='demasiados_intentos')
+        return super().clean()
+
+
+# -----------------------------------------------------------------
+# SESIONES ACTIVAS POR USUARIO
+# -----------------------------------------------------------------
+# Se escribe solo al entrar y al salir (señales user_logged_in /
+# user_logged_out, ver signals.py), nunca por petición. Una sesión cuenta
+# como activa mientras no llegue su fecha de expiración.
+
+def registrar_sesion(request, usuario):
+    if not request.session.session_key:
+        request.session.save()
+    ahora = timezone.now()
+    SesionActiva.objects.filter(usuario=usuario, expira__lte=ahora).delete()
+    SesionActiva.objects.update_or_create(
+        session_key=request.session.session_key,
+        defaults={
+            'usuario': usuario,
+            'ip': ip_de(request) or None,
+            'user_agent': request.META.get('HTTP_USER_AGENT', '')[:255],
+            'expira': request.session.get_expiry_date(),
+        },
+    )
+
+
+def cerrar_sesiones(usuario):
+    """Cierra todas las sesiones abiertas del usuario (p. ej. al bloquearlo)."""
+    from importlib import import_module
+
+    almacen = import_module(settings.SESSION_ENGINE).SessionStore
+    claves = list(SesionActiva.objects.filter(usuario=usuario).values_list('session_key', flat=True))
+    for clave in claves:
+        almacen(session_key=clave).delete()
+    SesionActiva.objects.filter(usuario=usuario).delete()
+    return len(claves)
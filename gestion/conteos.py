@@ -0,0 +1,225 @@
+# En: gestion/conteos.py
+
+import csv
+import io
+from collections import defaultdict
+from zipfile import BadZipFile
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum, Value, F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .dependencias import cargar
+from .models import MovimientoInventario, ConteoInventario, LineaConteo, SaldoCierre
+from .movimientos import registrar_movimientos, cantidad_con_signo
+from .ventas import resolver_codigos
+
+# -----------------------------------------------------------------
+# CONTEO FÍSICO DE INVENTARIO (toma de inventario masiva)
+# -----------------------------------------------------------------
+# 1. Se abre un ConteoInventario por bodega.
+# 2. Las cantidades contadas llegan por archivo (CSV/XLSX con columnas
+#    codigo, lote, cantidad) o lectura a lectura desde el escáner.
+# 3. Las diferencias contra el saldo del ledger (producto/bodega/lote) salen
+#    de una sola consulta agrupada y se escriben con UPDATE por valor de saldo.
+#    Se recalculan al cargar un archivo (todo el conteo), en cada lectura del
+#    escáner (solo ese producto) o a pedido; ver el detalle no recalcula.
+# 4. Al contabilizar se generan todos los AJ-P/AJ-N de una vez con
+#    registrar_movimientos(), en una sola transacción.
+#
+# Un conteo parcial (conteo cíclico) solo ajusta lo contado. En uno completo
+# lo que tiene saldo en la bodega y no se contó entra como línea en cero, y
+# al contabilizar recibe su AJ-N.
+
+COLUMNAS_CODIGO = ('codigo', 'sku', 'ean', 'ean_upc')
+LINEAS_POR_TANDA = 1000
+
+
+def leer_filas(archivo):
+    """
+    Devuelve las filas del archivo como dicts con las cabeceras en minúscula.
+    Un archivo ilegible es un ValidationError (las vistas solo capturan ese).
+    """
+    nombre = (getattr(archivo, 'name', '') or '').lower()
+    if nombre.endswith('.xlsx'):
+        try:
+            hoja = cargar('excel.lector')(archivo, read_only=True, data_only=True).active
+            filas = hoja.iter_rows(values_only=True)
+            cabeceras = [str(c or '').strip().lower() for c in next(filas, ())]
+            return [dict(zip(cabeceras, fila)) for fila in filas]
+        except BadZipFile:
+            raise ValidationError("El archivo no es un XLSX válido.")
+
+    texto = archivo.read()
+    if isinstance(texto, bytes):
+        try:
+            texto = texto.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ValidationError("El archivo no está en UTF-8 (guárdalo como \"CSV UTF-8\").")
+    try:
+        dialecto = csv.Sniffer().sniff(texto[:2048], delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.reader(io.StringIO(texto), dialecto)
+    cabeceras = [c.strip().lower() for c in next(lector, [])]
+    return [dict(zip(cabeceras, fila)) for fila in lector]
+
+
+def _normalizar(filas):
+    """{(codigo, lote): cantidad} sumando las filas repetidas."""
+    conteos = {}
+    for numero, fila in enumerate(filas, start=2):
+        codigo = next((str(fila[c]).strip() for c in COLUMNAS_CODIGO if fila.get(c) not in (None, '')), '')
+        if not codigo:
+            continue
+        lote = str(fila.get('lote') or '').strip()
+        try:
+            cantidad = int(float(fila.get('cantidad') or 0))
+        except (TypeError, ValueError):
+            raise ValidationError(f"Fila {numero}: cantidad inválida ({fila.get('cantidad')}).")
+        if cantidad < 0:
+            raise ValidationError(f"Fila {numero}: la cantidad no puede ser negativa.")
+        conteos[(codigo, lote)] = conteos.get((codigo, lote), 0) + cantidad
+    return conteos
+
+
+def _guardar_lineas(conteo, conteos, acumular):
+    # Devuelve las claves (producto_id, lote) tocadas
+    if conteo.estado != ConteoInventario.Estados.ABIERTO:
+        raise ValidationError("El conteo ya fue contabilizado.")
+
+    por_codigo = resolver_codigos(list({codigo for codigo, _ in conteos}))
+    desconocidos = sorted({codigo for codigo, _ in conteos if codigo not in por_codigo})
+    if desconocidos:
+        raise ValidationError(f"Códigos no encontrados: {', '.join(desconocidos[:20])}")
+
+    cantidades = {}
+    for (codigo, lote), cantidad in conteos.items():
+        clave = (por_codigo[codigo][0], lote)
+        cantidades[clave] = cantidades.get(clave, 0) + cantidad
+
+    with transaction.atomic():
+        existentes = {
+            (linea.producto_id, linea.lote): linea
+            for linea in conteo.lineas.filter(producto_id__in={pk for pk, _ in cantidades})
+        }
+        nuevas, modificadas = [], []
+        for (producto_id, lote), cantidad in cantidades.items():
+            linea = existentes.get((producto_id, lote))
+            if linea is None:
+                nuevas.append(LineaConteo(conteo=conteo, producto_id=producto_id, lote=lote, cantidad_contada=cantidad))
+            else:
+                linea.cantidad_contada = linea.cantidad_contada + cantidad if acumular else cantidad
+                linea.diferencia = None
+                modificadas.append(linea)
+        LineaConteo.objects.bulk_create(nuevas, batch_size=LINEAS_POR_TANDA)
+        LineaConteo.objects.bulk_update(modificadas, ['cantidad_contada', 'diferencia'], batch_size=LINEAS_POR_TANDA)
+    return list(cantidades)
+
+
+def cargar_archivo(conteo, archivo):
+    """Carga (o reemplaza) las cantidades contadas desde un CSV/XLSX. Devuelve las líneas afectadas."""
+    return len(_guardar_lineas(conteo, _normalizar(leer_filas(archivo)), acumular=False))
+
+
+def registrar_lectura(conteo, codigo, cantidad=1, lote=''):
+    """Una lectura del escáner: suma `cantidad` a la línea del código y recalcula ese producto."""
+    claves = _guardar_lineas(conteo, {(str(codigo).strip(), str(lote or '').strip()): cantidad}, acumular=True)
+    calcular_diferencias(conteo, productos={producto_id for producto_id, _ in claves})
+    return len(claves)
+
+
+def _saldos(bodega_id, productos=None):
+    """{(producto_id, lote): saldo} de la bodega; `productos` acota a esos productos (ids o subconsulta)."""
+    movimientos = MovimientoInventario.objects.filter(bodega_id=bodega_id)
+    cierres = SaldoCierre.objects.filter(bodega_id=bodega_id)
+    if productos is not None:
+        movimientos = movimientos.filter(producto_id__in=productos)
+        cierres = cierres.filter(producto_id__in=productos)
+
+    # Una consulta agrupada trae el saldo de cada (producto, lote) de la bodega
+    saldos = dict(
+        ((producto_id, lote), saldo)
+        for producto_id, lote, saldo in
+        movimientos
+        .annotate(lote_normalizado=Coalesce('lote', Value('')))
+        .values('producto_id', 'lote_normalizado')
+        .annotate(saldo=Sum(cantidad_con_signo(por_bodega=True)))
+        .values_list('producto_id', 'lote_normalizado', 'saldo')
+    )
+    # Más lo acumulado de los períodos archivados (ver archivo.py)
+    for producto_id, lote, cantidad in cierres.values_list('producto_id', 'lote', 'cantidad'):
+        saldos[(producto_id, lote)] = (saldos.get((producto_id, lote)) or 0) + cantidad
+    return saldos
+
+
+def calcular_diferencias(conteo, productos=None):
+    """
+    Saldo del ledger y diferencia de las líneas del conteo (solo las de
+    `productos` si se indica). En un conteo completo, el cálculo de todo el
+    conteo agrega antes en cero lo que tiene saldo y no se contó.
+    """
+    lineas = conteo.lineas.all()
+    if productos is not None:
+        lineas = lineas.filter(producto_id__in=productos)
+
+    with transaction.atomic():
+        if conteo.completo and productos is None:
+            saldos = _saldos(conteo.bodega_id)
+            contadas = set(lineas.values_list('producto_id', 'lote'))
+            LineaConteo.objects.bulk_create([
+                LineaConteo(conteo=conteo, producto_id=producto_id, lote=lote, cantidad_contada=0)
+                for (producto_id, lote), saldo in saldos.items()
+                if saldo and (producto_id, lote) not in contadas
+            ], batch_size=LINEAS_POR_TANDA)
+        else:
+            saldos = _saldos(conteo.bodega_id, lineas.values('producto_id'))
+
+        # Se agrupan las líneas por saldo: un UPDATE por valor distinto (son
+        # pocos comparados con las líneas) rinde mucho más que bulk_update.
+        por_saldo = defaultdict(list)
+        for pk, producto_id, lote in lineas.values_list('pk', 'producto_id', 'lote'):
+            por_saldo[saldos.get((producto_id, lote)) or 0].append(pk)
+        for saldo, pks in por_saldo.items():
+            for inicio in range(0, len(pks), LINEAS_POR_TANDA):
+                LineaConteo.objects.filter(pk__in=pks[inicio:inicio + LINEAS_POR_TANDA]).update(cantidad_sistema=saldo)
+        lineas.update(diferencia=F('cantidad_contada') - F('cantidad_sistema'))
+
+
+def contabilizar(conteo):
+    """
+    Registra los ajustes AJ-P/AJ-N de todas las líneas con diferencia, en una
+    sola transacción, y cierra el conteo. Devuelve la cantidad de ajustes.
+    """
+    with transaction.atomic():
+        conteo = ConteoInventario.objects.select_for_update().get(pk=conteo.pk)
+        if conteo.estado != ConteoInventario.Estados.ABIERTO:
+            raise ValidationError("El conteo ya fue contabilizado.")
+
+        # Se recalcula al contabilizar: el ledger pudo moverse desde la vista previa
+        calcular_diferencias(conteo)
+        ahora = timezone.now()
+        motivo = f"Conteo físico #{conteo.pk}: {conteo.descripcion}"[:255]
+        ajustes = [
+            MovimientoInventario(
+                producto_id=producto_id,
+                bodega_id=conteo.bodega_id,
+                tipo=MovimientoInventario.TipoMovimiento.AJUSTE_POS if diferencia > 0 else MovimientoInventario.TipoMovimiento.AJUSTE_NEG,
+                cantidad=abs(diferencia),
+                lote=lote or None,
+                fecha=ahora,
+                doc_ref=f"CONTEO-{conteo.pk}",
+                motivo=motivo,
+            )
+            for producto_id, lote, diferencia in
+            conteo.lineas.exclude(diferencia=0).values_list('producto_id', 'lote', 'diferencia')
+        ]
+        for inicio in range(0, len(ajustes), LINEAS_POR_TANDA):
+            registrar_movimientos(ajustes[inicio:inicio + LINEAS_POR_TANDA])
+
+        conteo.estado = ConteoInventario.Estados.CONTABILIZADO
+        conteo.fecha_contabilizacion = ahora
+        conteo.save(update_fields=['estado', 'fecha_contabilizacion'])
+    return len(ajustes)
@@ -0,0 +1,118 @@
+# En: gestion/correo.py
+
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import CorreoPendiente
+
+logger = logging.getLogger('gestion.correo')
+
+# -----------------------------------------------------------------
+# COLA DE CORREOS SALIENTES
+# -----------------------------------------------------------------
+# Las vistas solo encolan (un INSERT, en la misma transacción que el
+# usuario creado) y responden al tiro. procesar_cola() toma una tanda de
+# correos vencidos, los envía por UNA sola conexión (get_connection +
+# send_messages) y reintenta los fallidos con espera exponencial.
+#
+# Para que varios procesos puedan vaciar la cola a la vez, cada tanda se
+# "reserva" con un UPDATE que marca reservado_por y corre proximo_intento
+# (si el proceso muere, la reserva vence sola después de RESERVA_SEGUNDOS).
+#
+# Los enviados se borran. Los descartados (FALLIDO) quedan para revisar el
+# error, pero sin cuerpo: puede traer una clave temporal en texto plano, y
+# esa clave ya no sirve de nada (hay que generar otra desde usuarios).
+#
+# Configuración en settings: CORREO_MAX_INTENTOS, CORREO_ESPERA_BASE
+# (segundos) y CORREO_ESPERA_MAXIMA (segundos).
+
+RESERVA_SEGUNDOS = 300
+
+
+def encolar(asunto, cuerpo, destinatarios, remitente=None):
+    destinatarios = [d for d in destinatarios if d]
+    if not destinatarios:
+        return None
+    return CorreoPendiente.objects.create(
+        asunto=asunto, cuerpo=cuerpo, destinatarios=destinatarios,
+        remitente=remitente or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def encolar_varios(correos, remitente=None):
+    """Encola de una vez (un bulk_create) una lista de (asunto, cuerpo, destinatarios)."""
+    remitente = remitente or settings.DEFAULT_FROM_EMAIL
+    pendientes = [
+        CorreoPendiente(asunto=asunto, cuerpo=cuerpo, destinatarios=[d for d in destinatarios if d], remitente=remitente)
+        for asunto, cuerpo, destinatarios in correos
+    ]
+    return CorreoPendiente.objects.bulk_create([p for p in pendientes if p.destinatarios], batch_size=500)
+
+
+def _espera(intentos):
+    base = getattr(settings, 'CORREO_ESPERA_BASE', 60)
+    maxima = getattr(settings, 'CORREO_ESPERA_MAXIMA', 3600)
+    return timedelta(seconds=min(maxima, base * 2 ** (intentos - 1)))
+
+
+def _reservar(lote):
+    ahora = timezone.now()
+    token = uuid.uuid4().hex
+    candidatos = list(
+        CorreoPendiente.objects
+        .filter(estado=CorreoPendiente.Estados.PENDIENTE, proximo_intento__lte=ahora)
+        .order_by('proximo_intento', 'pk').values_list('pk', flat=True)[:lote]
+    )
+    if not candidatos:
+        return []
+    # Si otro proceso reservó alguno entre medio, el filtro por fecha lo deja fuera
+    CorreoPendiente.objects.filter(pk__in=candidatos, proximo_intento__lte=ahora).update(
+        reservado_por=token, proximo_intento=ahora + timedelta(seconds=RESERVA_SEGUNDOS),
+    )
+    return list(CorreoPendiente.objects.filter(reservado_por=token).order_by('pk'))
+
+
+def procesar_cola(lote=100, conexion=None):
+    """Envía una tanda de correos pendientes. Devuelve (enviados, fallidos)."""
+    correos = _reservar(lote)
+    if not correos:
+        return 0, 0
+
+    max_intentos = getattr(settings, 'CORREO_MAX_INTENTOS', 5)
+    enviados, fallidos = [], []
+    conexion = conexion or get_connection(fail_silently=False)
+    try:
+        conexion.open()
+        for correo in correos:
+            mensaje = EmailMessage(correo.asunto, correo.cuerpo, correo.remitente, correo.destinatarios, connection=conexion)
+            try:
+                # Uno por uno sobre la misma conexión: un destinatario malo no bota la tanda
+                conexion.send_messages([mensaje])
+                enviados.append(correo.pk)
+            except Exception as e:
+                fallidos.append((correo, e))
+    except Exception as e:
+        # No se pudo ni abrir la conexión: toda la tanda se reintenta
+        fallidos = [(correo, e) for correo in correos if correo.pk not in enviados]
+    finally:
+        conexion.close()
+
+    CorreoPendiente.objects.filter(pk__in=enviados).delete()
+    ahora = timezone.now()
+    for correo, error in fallidos:
+        correo.intentos += 1
+        correo.ultimo_error = str(error)[:1000]
+        correo.reservado_por = ''
+        if correo.intentos >= max_intentos:
+            correo.estado = CorreoPendiente.Estados.FALLIDO
+            correo.cuerpo = ''
+            logger.error("Correo %s descartado tras %s intentos: %s", correo.pk, correo.intentos, error)
+        else:
+            correo.proximo_intento = ahora + _espera(correo.intentos)
+        correo.save(update_fields=['intentos', 'ultimo_error', 'reservado_por', 'estado', 'proximo_intento', 'cuerpo'])
+    return len(enviados), len(fallidos)
@@ -0,0 +1,47 @@
+# En: gestion/dependencias.py
+
+from importlib import import_module
+
+# -----------------------------------------------------------------
+# DEPENDENCIAS PESADAS U OPCIONALES (carga diferida)
+# -----------------------------------------------------------------
+# openpyxl, numpy y pyarrow cuestan cientos de milisegundos de import y se
+# usan en pocas rutas (exportaciones, reportes, snapshots). No se importan al
+# cargar los módulos: cada uso pide su backend aquí y se importa la primera
+# vez. Así un worker nuevo o un manage.py corto no pagan por ellos.
+#
+# gestion/tests.py verifica que arrancar Django y cargar la URLconf no
+# importe ninguno de estos módulos.
+
+BACKENDS = {
+    # nombre: (módulo, atributo o None para el módulo completo, opcional)
+    'excel.libro': ('openpyxl', 'Workbook', False),
+    'excel.lector': ('openpyxl', 'load_workbook', False),
+    'numpy': ('numpy', None, True),
+    'pyarrow': ('pyarrow', None, True),
+    'pyarrow.parquet': ('pyarrow.parquet', None, True),
+}
+
+MODULOS_PESADOS = sorted({modulo.split('.')[0] for modulo, _, _ in BACKENDS.values()})
+
+_cargados = {}
+
+
+def cargar(nombre):
+    """
+    Devuelve el backend `nombre` importándolo la primera vez. Los opcionales
+    devuelven None si la librería no está instalada (el llamador usa su
+    alternativa); los obligatorios dejan pasar el ImportError.
+    """
+    if nombre not in _cargados:
+        modulo, atributo, opcional = BACKENDS[nombre]
+        try:
+            objeto = import_module(modulo)
+        except ImportError:
+            if not opcional:
+                raise
+            objeto = None
+        if objeto is not None and atributo:
+            objeto = getattr(objeto, atributo)
+        _cargados[nombre] = objeto
+    return _cargados[nombre]
@@ -0,0 +1,113 @@
+# En: gestion/escaner.py
+
+import threading
+import time
+
+from django.conf import settings
+
+from catalogo.models import Producto, calcular_precio_con_iva
+from .metricas import escaner_cache_total
+
+# -----------------------------------------------------------------
+# CACHÉ DE CÓDIGOS PARA EL ESCÁNER DEL POS
+# -----------------------------------------------------------------
+# Mapa en memoria (por proceso) de EAN/SKU -> resumen del producto.
+# - Se precarga completo la primera vez que se usa (una sola consulta).
+# - Las señales de Producto invalidan la entrada en este proceso.
+# - Los otros workers se enteran por el TTL: una entrada vencida se
+#   refresca sola con una búsqueda por índice (ean_upc/sku son únicos).
+# - La búsqueda puntual corre fuera del lock: si mientras tanto llegó una
+#   invalidación (cambió la generación), su resultado puede ser anterior
+#   al cambio y no se guarda.
+# - Un código puede ser el EAN de un producto y el SKU de otro: manda el EAN.
+
+CAMPOS_RESUMEN = ('id', 'sku', 'ean_upc', 'nombre', 'precio_venta', 'impuesto_iva', 'stock_actual')
+
+
+def _resumen(fila):
+    return {
+        'id': fila['id'],
+        'sku': fila['sku'],
+        'ean_upc': fila['ean_upc'],
+        'nombre': fila['nombre'],
+        'precio_venta': fila['precio_venta'],
+        'precio_venta_con_iva': calcular_precio_con_iva(fila['precio_venta'], fila['impuesto_iva']),
+        'stock_actual': fila['stock_actual'],
+    }
+
+
+class CacheEscaner:
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'ESCANER_CACHE_TTL', 30)
+        self._lock = threading.Lock()
+        self._por_codigo = {}   # codigo -> (resumen | None, instante de carga)
+        self._codigos_por_id = {}  # producto_id -> [codigos]
+        self._generacion = 0  # sube con cada invalidación
+        self._cargado = False
+
+    def _guardar(self, codigo, resumen, ahora):
+        self._por_codigo[codigo] = (resumen, ahora)
+        if resumen is not None:
+            self._codigos_por_id.setdefault(resumen['id'], set()).add(codigo)
+
+    def cargar(self):
+        """Precarga todo el catálogo en una sola consulta."""
+        ahora = time.monotonic()
+        filas = Producto.objects.values(*CAMPOS_RESUMEN)
+        with self._lock:
+            self._por_codigo.clear()
+            self._codigos_por_id.clear()
+            resumenes = [_resumen(fila) for fila in filas]
+            # Primero los SKU y después los EAN, que pisan a un SKU igual
+            for campo in ('sku', 'ean_upc'):
+                for resumen in resumenes:
+                    if resumen[campo]:
+                        self._guardar(resumen[campo], resumen, ahora)
+            self._cargado = True
+
+    def _buscar_en_bd(self, codigo):
+        for campo in ('ean_upc', 'sku'):
+            fila = Producto.objects.filter(**{campo: codigo}).values(*CAMPOS_RESUMEN).first()
+            if fila:
+                return _resumen(fila)
+        return None
+
+    def buscar(self, codigo):
+        """Devuelve el resumen del producto para un EAN o SKU, o None."""
+        if not self._cargado:
+            self.cargar()
+
+        ahora = time.monotonic()
+        entrada = self._por_codigo.get(codigo)
+        if entrada is not None and ahora - entrada[1] < self.ttl:
+            escaner_cache_total.inc(resultado='acierto')
+            return entrada[0]
+        escaner_cache_total.inc(resultado='fallo')
+
+        # No estaba o venció: búsqueda puntual por índice
+        generacion = self._generacion
+        resumen = self._buscar_en_bd(codigo)
+        with self._lock:
+            if generacion == self._generacion:
+                self._guardar(codigo, resumen, ahora)
+        return resumen
+
+    def invalidar(self, producto_id, *codigos):
+        # Los códigos explícitos cubren las entradas negativas (None) que
+        # quedaron guardadas antes de que el producto existiera.
+        with self._lock:
+            self._generacion += 1
+            for codigo in self._codigos_por_id.pop(producto_id, set()) | set(codigos):
+                self._por_codigo.pop(codigo, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self._por_codigo.clear()
+            self._codigos_por_id.clear()
+            self._cargado = False
+
+
+# Instancia única por proceso
+cache_escaner = CacheEscaner()
@@ -0,0 +1,213 @@
+# En: gestion/eventos.py
+
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+
+from catalogo.models import Producto
+from .models import MovimientoInventario
+
+logger = logging.getLogger('gestion.eventos')
+
+# -----------------------------------------------------------------
+# BROKER DE EVENTOS DE STOCK (SSE)
+# -----------------------------------------------------------------
+# Publica los movimientos registrados a las pantallas suscritas por
+# Server-Sent Events (ver views.stock_eventos). Cada suscriptor es una
+# corrutina esperando en su propio asyncio.Event: no hay un hilo por
+# cliente, así un worker ASGI mantiene miles de conexiones ociosas.
+#
+# publicar() se llama desde código síncrono (on_commit de los movimientos),
+# por eso entrega a cada suscriptor con loop.call_soon_threadsafe().
+#
+# El broker es por proceso: el on_commit solo avisa a los suscriptores del
+# worker que registró el movimiento. Con varios workers hay que activar
+# settings.EVENTOS_SONDEO (segundos): cada worker con suscriptores lee los
+# MovimientoInventario nuevos por id y los publica, vengan de donde vengan
+# (y el on_commit deja de publicar, para no duplicar). Los ids que faltan
+# en una lectura (transacción todavía abierta o revertida) se vuelven a
+# buscar durante HUECOS_VIGENCIA segundos, así un movimiento que se hace
+# visible después de uno posterior no se pierde.
+
+# Segundos que se acumulan eventos antes de enviarlos (agrupa ráfagas)
+VENTANA_AGRUPACION = 0.5
+# Máximo de movimientos que se guardan por producto en un evento agrupado
+MAX_MOVIMIENTOS_POR_EVENTO = 50
+# Segundos que se sigue buscando un id salteado en el sondeo
+HUECOS_VIGENCIA = 30
+
+
+def intervalo_sondeo():
+    return getattr(settings, 'EVENTOS_SONDEO', None)
+
+
+def _varios_workers():
+    # WEB_CONCURRENCY lo respetan gunicorn y uvicorn; METRICAS_DIR solo se
+    # define con workers pre-fork (ver metricas.py)
+    try:
+        workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+    except ValueError:
+        workers = 1
+    return workers > 1 or bool(getattr(settings, 'METRICAS_DIR', None))
+
+
+class Suscripcion:
+
+    def __init__(self, loop, bodegas=None, productos=None):
+        self.loop = loop
+        self.bodegas = bodegas or set()
+        self.productos = productos or set()
+        # producto_id -> evento acumulado (solo el último estado por producto)
+        self.pendientes = {}
+        self.hay_datos = asyncio.Event()
+
+    def acepta(self, evento):
+        if self.productos and evento['producto_id'] not in self.productos:
+            return False
+        if self.bodegas and not self.bodegas.intersection(evento['bodegas']):
+            return False
+        return True
+
+    def entregar(self, evento):
+        # Corre dentro del loop del suscriptor
+        if not self.acepta(evento):
+            return
+        previo = self.pendientes.get(evento['producto_id'])
+        if previo is not None:
+            # Ráfaga sobre el mismo producto: un solo evento con el stock final
+            evento = {
+                **evento,
+                'movimientos': (previo['movimientos'] + evento['movimientos'])[-MAX_MOVIMIENTOS_POR_EVENTO:],
+                'bodegas': sorted(set(previo['bodegas']) | set(evento['bodegas'])),
+            }
+        self.pendientes[evento['producto_id']] = evento
+        self.hay_datos.set()
+
+    async def siguiente_lote(self, espera_maxima):
+        """Espera eventos hasta `espera_maxima` segundos; [] si no hubo ninguno."""
+        try:
+            await asyncio.wait_for(self.hay_datos.wait(), timeout=espera_maxima)
+        except asyncio.TimeoutError:
+            return []
+        await asyncio.sleep(VENTANA_AGRUPACION)
+        lote = list(self.pendientes.values())
+        self.pendientes.clear()
+        self.hay_datos.clear()
+        return lote
+
+
+class BrokerStock:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscripciones = set()
+        self._sondeo = None
+        self._advertido = False
+
+    def suscribir(self, bodegas=None, productos=None):
+        # Debe llamarse desde el loop que va a consumir los eventos
+        loop = asyncio.get_running_loop()
+        suscripcion = Suscripcion(loop, bodegas, productos)
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+        intervalo = intervalo_sondeo()
+        if intervalo:
+            if self._sondeo is None or self._sondeo.done():
+                self._sondeo = loop.create_task(self._sondear(intervalo))
+        elif not self._advertido and _varios_workers():
+            self._advertido = True
+            logger.warning(
+                'Eventos de stock sin EVENTOS_SONDEO con varios workers: cada '
+                'suscriptor solo verá los movimientos de su propio worker.'
+            )
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    @property
+    def total_suscriptores(self):
+        return len(self._suscripciones)
+
+    def publicar(self, evento):
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            try:
+                suscripcion.loop.call_soon_threadsafe(suscripcion.entregar, evento)
+            except RuntimeError:
+                # El loop ya se cerró (worker reiniciando)
+                self.desuscribir(suscripcion)
+
+    async def _sondear(self, intervalo):
+        # Corre mientras haya suscriptores; suscribir() la vuelve a lanzar
+        ultimo = await sync_to_async(_ultimo_movimiento)()
+        huecos = {}
+        while self._suscripciones:
+            await asyncio.sleep(intervalo)
+            movimientos, saldos, ultimo = await sync_to_async(_movimientos_nuevos)(ultimo, huecos)
+            for evento in eventos_desde_movimientos(movimientos, saldos):
+                self.publicar(evento)
+
+
+def _ultimo_movimiento():
+    return MovimientoInventario.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def _movimientos_nuevos(ultimo, huecos):
+    """
+    Movimientos con id > `ultimo` o pendientes en `huecos` ({id: vence}, se
+    actualiza en el lugar). Devuelve (movimientos, saldos, último id leído).
+    """
+    ahora = time.monotonic()
+    for pk in [pk for pk, vence in huecos.items() if vence < ahora]:
+        del huecos[pk]
+    movimientos = list(
+        MovimientoInventario.objects.filter(Q(pk__gt=ultimo) | Q(pk__in=list(huecos))).order_by('pk')
+    )
+    ids = {movimiento.pk for movimiento in movimientos}
+    for pk in ids & huecos.keys():
+        del huecos[pk]
+    if movimientos:
+        nuevo = max(ids)
+        for pk in range(ultimo + 1, nuevo):
+            if pk not in ids:
+                huecos[pk] = ahora + HUECOS_VIGENCIA
+        ultimo = max(ultimo, nuevo)
+    saldos = dict(
+        Producto.todos.filter(pk__in={movimiento.producto_id for movimiento in movimientos})
+        .values_list('pk', 'stock_actual')
+    )
+    return movimientos, saldos, ultimo
+
+
+def eventos_desde_movimientos(movimientos, saldos):
+    """Arma un evento por producto a partir de una tanda de movimientos."""
+    eventos = {}
+    for movimiento in movimientos:
+        evento = eventos.setdefault(movimiento.producto_id, {
+            'producto_id': movimiento.producto_id,
+            'stock_actual': saldos.get(movimiento.producto_id),
+            'bodegas': [],
+            'movimientos': [],
+        })
+        if movimiento.bodega_id not in evento['bodegas']:
+            evento['bodegas'].append(movimiento.bodega_id)
+        evento['movimientos'].append({
+            'tipo': movimiento.tipo,
+            'cantidad': movimiento.cantidad,
+            'bodega_id': movimiento.bodega_id,
+            'fecha': movimiento.fecha.isoformat() if movimiento.fecha else None,
+        })
+    return list(eventos.values())
+
+
+# Instancia única por proceso
+broker_stock = BrokerStock()
@@ -4,10 +4,27 @@ from django import forms
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from catalogo.models import Producto, Categoria, Marca
-from .models import Proveedor, MovimientoInventario, CustomUser, Bodega
+from .models import Proveedor, MovimientoInventario, CustomUser, Bodega, ConteoInventario
+from .ventas import resolver_codigos
+from .archivo import fecha_corte
+from .precios import CAMPOS as CAMPOS_PRECIO, PORCENTAJE, MONTO
+from .unidades import resolver as resolver_unidad, COMPRA
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 import re
 
+
+def _unico_entre_bajas(form, campo):
+    # validate_unique() usa el manager por defecto (solo activos): un valor
+    # que ocupa un registro dado de baja terminaría en IntegrityError
+    valor = form.cleaned_data.get(campo)
+    modelo = form._meta.model
+    if valor and modelo.todos.filter(activo=False, **{campo: valor}).exclude(pk=form.instance.pk).exists():
+        raise ValidationError(
+            f"Ya existe un {modelo._meta.verbose_name} dado de baja con este valor. "
+            "Restáurelo desde el admin o espere a que se purgue."
+        )
+    return valor
+
 # -----------------------------------------------------------------
 #FORMULARIO PARA CATEGORÍAS
 # -----------------------------------------------------------------
@@ -175,6 +192,12 @@ class ProductoForm(forms.ModelForm):
                 raise ValidationError("Error: El Stock Máximo no puede ser menor que el Stock Mínimo.")
         return cleaned_data
         
+    def clean_sku(self):
+        return _unico_entre_bajas(self, 'sku')
+
+    def clean_ean_upc(self):
+        return _unico_entre_bajas(self, 'ean_upc')
+
     def clean_nombre(self):
         nombre = self.cleaned_data.get('nombre')
         # Esta expresión regular busca cualquier cosa que NO sea una letra (a-z, A-Z) o un espacio
@@ -184,6 +207,9 @@ class ProductoForm(forms.ModelForm):
 
 # --- Formulario de Proveedor ---
 class ProveedorForm(forms.ModelForm):
+
+    def clean_rut_nif(self):
+        return _unico_entre_bajas(self, 'rut_nif')
     
     class Meta:
         model = Proveedor
@@ -240,8 +266,9 @@ class MovimientoForm(forms.ModelForm):
         required=False,
         widget=forms.Select(attrs={'class': 'form-select'})
     )
+    # Las transferencias se registran en pareja desde su propia pantalla
     tipo = forms.ChoiceField(
-        choices=MovimientoInventario.TipoMovimiento.choices,
+        choices=[(v, l) for v, l in MovimientoInventario.TipoMovimiento.choices if v not in MovimientoInventario.TIPOS_TRANSFERENCIA],
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     
@@ -251,12 +278,19 @@ class MovimientoForm(forms.ModelForm):
         widget=forms.Select(attrs={'class': 'form-select'}),
         label="Bodega"
     )
+    # Vacío = unidad de stock. En la unidad de compra se convierte al guardar (ver unidades.py)
+    unidad = forms.ChoiceField(
+        choices=[('', 'Unidad de stock')] + ProductoForm.UOM_CHOICES[1:],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label="Unidad"
+    )
 
     class Meta:
         model = MovimientoInventario
         fields = [
-            'producto', 'tipo', 'cantidad', 
-            'proveedor', 'bodega', 'doc_ref',
+            'producto', 'tipo', 'cantidad', 'unidad',
+            'proveedor', 'bodega', 'doc_ref', 'fecha_comprometida',
             'lote', 'serie', 'fecha_vencimiento', 'observaciones', 'motivo', 'fecha'
         ]
         
@@ -266,10 +300,10 @@ class MovimientoForm(forms.ModelForm):
             if not field.widget.attrs.get('class'):
                  field.widget.attrs.setdefault('class', 'form-control')
             
-            if field_name in ['proveedor', 'doc_ref', 'lote', 'serie', 'fecha_vencimiento', 'observaciones', 'motivo']:
+            if field_name in ['proveedor', 'doc_ref', 'fecha_comprometida', 'lote', 'serie', 'fecha_vencimiento', 'observaciones', 'motivo']:
                 field.required = False
             
-            if field_name == 'fecha_vencimiento':
+            if field_name in ('fecha_vencimiento', 'fecha_comprometida'):
                 field.widget = forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
             
             if field_name == 'fecha':
@@ -282,8 +316,195 @@ class MovimientoForm(forms.ModelForm):
             raise ValidationError("La cantidad del movimiento no puede ser cero.")
         return cantidad
     
+    def clean(self):
+        cleaned_data = super().clean()
+        producto, unidad, cantidad = (cleaned_data.get(c) for c in ('producto', 'unidad', 'cantidad'))
+        if producto and unidad and cantidad:
+            _, factor = resolver_unidad(unidad, producto.uom_compra, producto.uom_venta, producto.factor_conversion)
+            if factor is None:
+                self.add_error('unidad', f"{producto.sku} se compra en {producto.uom_compra or '--'} y se vende en {producto.uom_venta or '--'}.")
+            elif cantidad * factor % 100:
+                self.add_error('cantidad', f"{cantidad} {unidad} no da unidades de stock enteras (factor {producto.factor_conversion}).")
+        return cleaned_data
+
+    def clean_fecha(self):
+        fecha = self.cleaned_data.get('fecha')
+        corte = fecha_corte()
+        if fecha and corte and fecha < corte:
+            raise ValidationError(f"El período hasta {corte:%Y-%m-%d} está cerrado y archivado.")
+        return fecha
+
     def clean_fecha_vencimiento(self):
         fecha = self.cleaned_data.get('fecha_vencimiento')
         if fecha and fecha < timezone.now().date():
             raise ValidationError("La fecha de vencimiento no puede ser una fecha pasada.")
-        return fecha
\ No newline at end of file
+        return fecha
+
+
+# -----------------------------------------------------------------
+# FORMULARIOS DE CONTEO FÍSICO
+# -----------------------------------------------------------------
+class ConteoInventarioForm(forms.ModelForm):
+    class Meta:
+        model = ConteoInventario
+        fields = ['descripcion', 'bodega', 'completo']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['descripcion'].widget.attrs.update({'class': 'form-control', 'placeholder': 'Ej: Toma anual 2026'})
+        self.fields['bodega'].widget.attrs.update({'class': 'form-select'})
+        self.fields['completo'].widget.attrs.update({'class': 'form-check-input'})
+
+class CargaConteoForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo de conteo (CSV o XLSX)",
+        help_text="Columnas: codigo (EAN o SKU), lote (opcional), cantidad.",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise ValidationError("El archivo debe ser CSV o XLSX.")
+        return archivo
+
+
+# -----------------------------------------------------------------
+# FORMULARIO DE ALTA MASIVA DE USUARIOS
+# -----------------------------------------------------------------
+class CargaUsuariosForm(forms.Form):
+    archivo = forms.FileField(
+        label="Planilla de usuarios (CSV o XLSX)",
+        help_text="Columnas: username, email, first_name, last_name, telefono, rol, estado.",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise ValidationError("El archivo debe ser CSV o XLSX.")
+        return archivo
+
+
+# -----------------------------------------------------------------
+# FORMULARIO DE RECEPCIÓN DE COMPRA (documento de varias líneas)
+# -----------------------------------------------------------------
+class RecepcionForm(forms.Form):
+    proveedor = forms.ModelChoiceField(queryset=Proveedor.objects.order_by('razon_social'), required=False, label="Proveedor",
+                                       widget=forms.Select(attrs={'class': 'form-select'}))
+    bodega = forms.ModelChoiceField(queryset=Bodega.objects.all(), label="Bodega",
+                                    widget=forms.Select(attrs={'class': 'form-select'}))
+    lineas = forms.CharField(
+        label="Líneas",
+        help_text="Una por fila: código (EAN o SKU); cantidad; unidad (opcional, por defecto la de compra del producto o, si no tiene, la de stock); lote (opcional).",
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 8, 'placeholder': '7801234567890;10;CAJA\nSKU-001;24;UN;L202601'}),
+    )
+    doc_ref = forms.CharField(label="Doc. Referencia", required=False, widget=forms.TextInput(attrs={'class': 'form-control'}))
+    fecha_comprometida = forms.DateField(label="Fecha Comprometida", required=False,
+                                         widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+
+    def clean_lineas(self):
+        # La conversión de unidades se hace al registrar, con los productos ya
+        # bloqueados (registrar_movimientos + unidades.normalizar)
+        filas = []
+        for numero, texto in enumerate(self.cleaned_data['lineas'].splitlines(), start=1):
+            if not texto.strip():
+                continue
+            partes = [p.strip() for p in texto.split(';')]
+            try:
+                cantidad = int(partes[1])
+            except (IndexError, ValueError):
+                raise ValidationError(f"Fila {numero}: formato inválido, se espera código;cantidad;unidad;lote.")
+            if cantidad <= 0:
+                raise ValidationError(f"Fila {numero}: la cantidad debe ser positiva.")
+            unidad = partes[2].upper() if len(partes) > 2 and partes[2] else COMPRA
+            filas.append((partes[0], cantidad, unidad, partes[3] if len(partes) > 3 else ''))
+        if not filas:
+            raise ValidationError("Ingresa al menos una línea.")
+
+        por_codigo = resolver_codigos(list({codigo for codigo, _, _, _ in filas}))
+        desconocidos = sorted({codigo for codigo, _, _, _ in filas if codigo not in por_codigo})
+        if desconocidos:
+            raise ValidationError(f"Códigos no encontrados: {', '.join(desconocidos[:20])}")
+        return [
+            {'producto_id': por_codigo[codigo][0], 'cantidad': cantidad, 'unidad': unidad, 'lote': lote}
+            for codigo, cantidad, unidad, lote in filas
+        ]
+
+
+# -----------------------------------------------------------------
+# FORMULARIO DE ACTUALIZACIÓN MASIVA DE PRECIOS (ver precios.py)
+# -----------------------------------------------------------------
+class ActualizacionPreciosForm(forms.Form):
+    categoria = forms.ModelChoiceField(queryset=Categoria.objects.order_by('nombre'), required=False, label="Categoría",
+                                       widget=forms.Select(attrs={'class': 'form-select'}))
+    marca = forms.ModelChoiceField(queryset=Marca.objects.order_by('nombre'), required=False, label="Marca",
+                                   widget=forms.Select(attrs={'class': 'form-select'}))
+    proveedor = forms.ModelChoiceField(queryset=Proveedor.objects.order_by('razon_social'), required=False, label="Proveedor",
+                                       widget=forms.Select(attrs={'class': 'form-select'}))
+    campo = forms.ChoiceField(choices=list(CAMPOS_PRECIO.items()), label="Campo",
+                              widget=forms.Select(attrs={'class': 'form-select'}))
+    modo = forms.ChoiceField(choices=[(PORCENTAJE, 'Porcentaje (%)'), (MONTO, 'Monto fijo ($)')], label="Tipo de ajuste",
+                             widget=forms.Select(attrs={'class': 'form-select'}))
+    valor = forms.DecimalField(max_digits=9, decimal_places=2, label="Ajuste",
+                               help_text="Positivo sube, negativo baja. Ej: 5,5 (%) o -200 ($).",
+                               widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}))
+
+    def clean(self):
+        datos = super().clean()
+        if not any(datos.get(c) for c in ('categoria', 'marca', 'proveedor')):
+            raise ValidationError("Elige al menos una categoría, marca o proveedor.")
+        valor, modo = datos.get('valor'), datos.get('modo')
+        if valor is not None:
+            if valor == 0:
+                self.add_error('valor', "El ajuste no puede ser cero.")
+            elif modo == PORCENTAJE and valor < -100:
+                self.add_error('valor', "No se puede bajar más de un 100%.")
+            elif modo == MONTO and valor != valor.to_integral_value():
+                self.add_error('valor', "Los montos son en pesos enteros.")
+        return datos
+
+
+# -----------------------------------------------------------------
+# FORMULARIO DE TRANSFERENCIA ENTRE BODEGAS
+# -----------------------------------------------------------------
+class TransferenciaForm(forms.Form):
+    origen = forms.ModelChoiceField(queryset=Bodega.objects.all(), label="Bodega de Origen",
+                                    widget=forms.Select(attrs={'class': 'form-select'}))
+    destino = forms.ModelChoiceField(queryset=Bodega.objects.all(), label="Bodega de Destino",
+                                     widget=forms.Select(attrs={'class': 'form-select'}))
+    lineas = forms.CharField(
+        label="Líneas",
+        help_text="Una por fila: código (EAN o SKU); cantidad; lote (opcional).",
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 8, 'placeholder': '7801234567890;12\nSKU-001;5;L202601'}),
+    )
+    doc_ref = forms.CharField(label="Doc. Referencia", required=False, widget=forms.TextInput(attrs={'class': 'form-control'}))
+    observaciones = forms.CharField(label="Observaciones", required=False, widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 2}))
+
+    def clean_lineas(self):
+        filas = []
+        for numero, texto in enumerate(self.cleaned_data['lineas'].splitlines(), start=1):
+            if not texto.strip():
+                continue
+            partes = [p.strip() for p in texto.split(';')]
+            try:
+                cantidad = int(partes[1])
+            except (IndexError, ValueError):
+                raise ValidationError(f"Fila {numero}: formato inválido, se espera código;cantidad;lote.")
+            if cantidad <= 0:
+                raise ValidationError(f"Fila {numero}: la cantidad debe ser positiva.")
+            filas.append((partes[0], cantidad, partes[2] if len(partes) > 2 else ''))
+        if not filas:
+            raise ValidationError("Ingresa al menos una línea.")
+
+        por_codigo = resolver_codigos(list({codigo for codigo, _, _ in filas}))
+        desconocidos = sorted({codigo for codigo, _, _ in filas if codigo not in por_codigo})
+        if desconocidos:
+            raise ValidationError(f"Códigos no encontrados: {', '.join(desconocidos[:20])}")
+        return [{'producto_id': por_codigo[codigo][0], 'cantidad': cantidad, 'lote': lote} for codigo, cantidad, lote in filas]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('origen') and cleaned_data.get('origen') == cleaned_data.get('destino'):
+            raise ValidationError("La bodega de origen y destino deben ser distintas.")
+        return cleaned_data
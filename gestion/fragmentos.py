@@ -0,0 +1,53 @@
+# En: gestion/fragmentos.py
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# -----------------------------------------------------------------
+# CACHÉ DE FRAGMENTOS DE PLANTILLA
+# -----------------------------------------------------------------
+# Los formularios vacíos de producto_list e inventario_list son casi todo
+# <option> de los selects (productos, proveedores, bodegas, categorías,
+# marcas) y el navbar depende solo del rol. Se cachean con {% cache %}:
+#   - navbar:      clave por rol
+#   - formularios: clave por rol y versión de opciones
+# La versión de opciones cambia al guardar/eliminar cualquiera de esos
+# modelos (ver signals.py). Los movimientos no la tocan: actualizan el stock
+# con UPDATE directo y el stock no aparece en las opciones.
+# La versión vive en la caché: solo sirve si la caché es compartida entre
+# workers (Redis). Con la LocMem por proceso, FRAGMENTOS_FORMULARIOS = False
+# y las plantillas dibujan los formularios sin pasar por {% cache %} (ni la
+# versión ni el fragmento se consultan); el navbar sí se cachea, no depende
+# de datos.
+# Solo se cachean formularios sin enviar (los que traen errores se dibujan
+# siempre) y nunca el csrf_token, que va fuera del fragmento.
+
+CLAVE_VERSION = 'fragmentos:version-formularios'
+
+
+def ttl():
+    return getattr(settings, 'FRAGMENTOS_TTL', 600)
+
+
+def version_formularios():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        version = time.time_ns()
+        cache.add(CLAVE_VERSION, version, None)
+        version = cache.get(CLAVE_VERSION, version)
+    return version
+
+
+def invalidar_formularios(**kwargs):
+    cache.set(CLAVE_VERSION, time.time_ns(), None)
+
+
+def fragmentos(request):
+    """Context processor: versión de opciones (se calcula solo si una plantilla la usa), TTL y si se cachean los formularios."""
+    return {
+        'version_formularios': version_formularios,
+        'fragmentos_ttl': ttl,
+        'fragmentos_formularios': getattr(settings, 'FRAGMENTOS_FORMULARIOS', False),
+    }
@@ -0,0 +1,92 @@
+# En: gestion/kpis.py
+
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Sum, Q, F, Case, When, IntegerField
+from django.utils import timezone
+
+from catalogo.models import Producto
+from .models import MovimientoInventario, ResumenDiarioMovimiento
+
+# -----------------------------------------------------------------
+# KPIs DE INVENTARIO (versión síncrona y async)
+# -----------------------------------------------------------------
+# La versión async no consulta en paralelo: el ORM async pasa cada consulta
+# por sync_to_async(thread_sensitive=True), todas al mismo thread, una tras
+# otra (con asyncio.gather también). Se corren las tres en UN solo salto a
+# ese thread; el loop queda libre mientras tanto.
+
+def kpis_inventario():
+    today = timezone.now().date()
+    return {
+        'movimientos_hoy': MovimientoInventario.objects.filter(fecha__date=today).count(),
+        'stock_total': Producto.objects.aggregate(total=Sum('stock_actual'))['total'] or 0,
+        'productos_unicos': Producto.objects.count()
+    }
+
+
+async def akpis_inventario():
+    return await sync_to_async(kpis_inventario)()
+
+
+
+# -----------------------------------------------------------------
+# DASHBOARD DE INICIO (sobre ResumenDiarioMovimiento)
+# -----------------------------------------------------------------
+# Todo sale de los resúmenes diarios: 12 meses son a lo más unos miles de
+# filas agrupadas, en vez de recorrer el ledger completo.
+
+def costo_unitario(prefijo=''):
+    # costo_promedio si ya fue calculado, si no el costo estándar.
+    # `prefijo` permite usarlo desde otro modelo (ej. 'producto__').
+    return Case(
+        When(**{f'{prefijo}costo_promedio__gt': 0}, then=F(f'{prefijo}costo_promedio')),
+        default=F(f'{prefijo}costo_estandar'),
+        output_field=IntegerField(),
+    )
+
+
+def datos_dashboard(dias=30, top=10):
+    hoy = timezone.localdate()
+    desde = hoy - timedelta(days=dias - 1)
+    resumenes = ResumenDiarioMovimiento.objects.filter(fecha__gte=desde, fecha__lte=hoy)
+    es_entrada = Q(tipo__in=MovimientoInventario.TIPOS_ENTRADA)
+    es_salida = Q(tipo__in=MovimientoInventario.TIPOS_SALIDA)
+
+    flujo_diario = list(
+        resumenes.values('fecha')
+        .annotate(entradas=Sum('cantidad', filter=es_entrada), salidas=Sum('cantidad', filter=es_salida))
+        .order_by('fecha')
+    )
+
+    top_productos = list(
+        resumenes.filter(es_salida)
+        .values('producto__sku', 'producto__nombre')
+        .annotate(total=Sum('cantidad'))
+        .order_by('-total')[:top]
+    )
+
+    por_bodega = list(
+        resumenes.values('bodega__nombre')
+        .annotate(cantidad=Sum('cantidad'), movimientos=Sum('movimientos'))
+        .order_by('-cantidad')
+    )
+
+    valor_por_categoria = list(
+        Producto.objects.values('categoria__nombre')
+        .annotate(valor=Sum(F('stock_actual') * costo_unitario()), unidades=Sum('stock_actual'))
+        .order_by('-valor')
+    )
+
+    return {
+        'dias': dias,
+        'flujo_diario': [
+            {'fecha': fila['fecha'].isoformat(), 'entradas': fila['entradas'] or 0, 'salidas': fila['salidas'] or 0}
+            for fila in flujo_diario
+        ],
+        'top_productos': top_productos,
+        'por_bodega': por_bodega,
+        'valor_por_categoria': valor_por_categoria,
+        'valor_total': sum(fila['valor'] or 0 for fila in valor_por_categoria),
+    }
@@ -0,0 +1,46 @@
+# En: gestion/management/commands/archivar_movimientos.py
+
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gestion.archivo import archivar_tanda
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve los movimientos de meses cerrados a MovimientoArchivado, por tandas, y acumula "
+        "su efecto en SaldoCierre. La tabla viva queda solo con los meses recientes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=24, help="Meses recientes que se conservan en la tabla viva.")
+        parser.add_argument('--antes-de', help="Archiva lo anterior a esta fecha YYYY-MM-DD (se ajusta al inicio de su mes).")
+        parser.add_argument('--lote', type=int, default=5000, help="Movimientos por transacción.")
+
+    def handle(self, *args, **opts):
+        if opts['antes_de']:
+            try:
+                fecha = datetime.strptime(opts['antes_de'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--antes-de debe tener formato YYYY-MM-DD.")
+        else:
+            hoy = timezone.localdate()
+            meses = hoy.year * 12 + hoy.month - 1 - opts['meses']
+            fecha = hoy.replace(year=meses // 12, month=meses % 12 + 1, day=1)
+
+        # Solo períodos cerrados: el corte siempre es el inicio de un mes
+        corte = timezone.make_aware(datetime.combine(fecha.replace(day=1), time.min))
+        if corte >= timezone.now():
+            raise CommandError("El corte debe ser anterior al mes en curso.")
+
+        total = 0
+        while True:
+            movidos = archivar_tanda(corte, opts['lote'])
+            if not movidos:
+                break
+            total += movidos
+            self.stdout.write(f"  {total} movimientos archivados...")
+
+        self.stdout.write(self.style.SUCCESS(f"{total} movimientos anteriores a {corte:%Y-%m-%d} archivados."))
@@ -0,0 +1,180 @@
+# En: gestion/management/commands/benchmark.py
+
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from catalogo.models import Producto
+from gestion.fragmentos import invalidar_formularios
+from gestion.models import CustomUser, Bodega, MovimientoInventario
+
+USUARIO_BENCHMARK = 'benchmark'
+# Host de las peticiones simuladas: se agrega a ALLOWED_HOSTS solo durante la
+# corrida (sin setup_test_environment, que instrumenta el render y falsea los tiempos)
+HOST_BENCHMARK = 'localhost'
+# Escenarios que escriben en la base: fuera de SQLite solo si se piden por nombre
+ESCRITURA = {'registrar_movimiento'}
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide los caminos críticos (listados, búsquedas, exportaciones, registro de "
+        "movimientos y portada del catálogo) y compara contra un baseline en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario',
+            help="Usuario existente con el que se mide. Obligatorio fuera de SQLite "
+                 "(con SQLite, por defecto se crea el usuario 'benchmark').",
+        )
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--escenarios', help="Lista separada por comas (por defecto, todos).")
+        parser.add_argument('--salida', help="Guarda el resultado en este archivo JSON.")
+        parser.add_argument('--baseline', help="JSON de una corrida anterior para comparar.")
+        parser.add_argument(
+            '--tolerancia', type=float, default=0.20,
+            help="Regresión permitida sobre el p95 del baseline (0.20 = 20%%)."
+        )
+
+    def handle(self, *args, **opts):
+        producto = Producto.objects.order_by('pk').first()
+        bodega = Bodega.objects.order_by('pk').first()
+        if producto is None or bodega is None:
+            raise CommandError("No hay datos. Ejecuta antes: python manage.py generar_datos")
+
+        # Contra una base real (MySQL) no se crean usuarios ROOT de paso
+        local = connection.vendor == 'sqlite'
+        if opts['usuario']:
+            usuario = CustomUser.objects.filter(username=opts['usuario']).first()
+            if usuario is None:
+                raise CommandError(f"El usuario {opts['usuario']} no existe.")
+        elif local:
+            usuario = CustomUser.objects.filter(username=USUARIO_BENCHMARK).first()
+            if usuario is None:
+                usuario = CustomUser(username=USUARIO_BENCHMARK, rol=CustomUser.Roles.ROOT, email='benchmark@ejemplo.cl')
+                usuario.set_unusable_password()
+                usuario.save()
+        else:
+            raise CommandError(
+                f"Con la base {connection.vendor} indica --usuario (uno existente) o usa DULCERIA_DB=sqlite."
+            )
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, HOST_BENCHMARK]):
+            self._correr(usuario, producto, bodega, opts)
+
+    def _correr(self, usuario, producto, bodega, opts):
+        local = connection.vendor == 'sqlite'
+        cliente = Client(HTTP_HOST=HOST_BENCHMARK)
+        cliente.force_login(usuario)
+
+        termino = producto.nombre.split()[0][:4]
+        escenarios = {
+            'catalogo_inicio': lambda: cliente.get('/'),
+            'inventario_list': lambda: cliente.get('/gestion/inventario/'),
+            'producto_list': lambda: cliente.get('/gestion/productos/'),
+            # Sin fragmentos cacheados (versión de opciones invalidada en cada llamada)
+            'inventario_list_sin_fragmentos': lambda: (invalidar_formularios(), cliente.get('/gestion/inventario/'))[1],
+            'producto_list_sin_fragmentos': lambda: (invalidar_formularios(), cliente.get('/gestion/productos/'))[1],
+            'producto_list_busqueda': lambda: cliente.get('/gestion/productos/', {'q': termino}),
+            'exportar_productos': lambda: cliente.get('/gestion/productos/exportar/'),
+            'exportar_proveedores': lambda: cliente.get('/gestion/proveedores/exportar/'),
+            'exportar_inventario': lambda: cliente.get('/gestion/inventario/exportar/'),
+            'exportar_usuarios': lambda: cliente.get('/gestion/usuarios/exportar/'),
+            'exportar_categorias': lambda: cliente.get('/gestion/categorias/exportar/'),
+            'exportar_marcas': lambda: cliente.get('/gestion/marcas/exportar/'),
+            'exportar_valorizacion': lambda: cliente.get('/gestion/inventario/valorizacion/exportar/'),
+            'exportar_abc': lambda: cliente.get('/gestion/inventario/abc/exportar/'),
+            'registrar_movimiento': lambda: cliente.post('/gestion/inventario/', {
+                'producto': producto.pk,
+                'tipo': MovimientoInventario.TipoMovimiento.INGRESO,
+                'cantidad': 1,
+                'bodega': bodega.pk,
+                'fecha': timezone.localtime().strftime('%Y-%m-%dT%H:%M'),
+                'doc_ref': 'BENCHMARK',
+            }),
+        }
+        if opts['escenarios']:
+            pedidos = [e.strip() for e in opts['escenarios'].split(',') if e.strip()]
+            desconocidos = set(pedidos) - set(escenarios)
+            if desconocidos:
+                raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+            escenarios = {nombre: escenarios[nombre] for nombre in pedidos}
+        elif not local:
+            escenarios = {nombre: llamada for nombre, llamada in escenarios.items() if nombre not in ESCRITURA}
+            self.stderr.write(f"Se omiten los escenarios que escriben ({', '.join(sorted(ESCRITURA))}): pídelos con --escenarios.")
+
+        resultado = {
+            'motor_bd': connection.vendor,
+            'fecha': timezone.now().isoformat(),
+            'productos': Producto.objects.count(),
+            'movimientos': MovimientoInventario.objects.count(),
+            'escenarios': {
+                nombre: self._medir(nombre, llamada, opts['repeticiones'])
+                for nombre, llamada in escenarios.items()
+            },
+        }
+
+        texto = json.dumps(resultado, indent=2)
+        if opts['salida']:
+            with open(opts['salida'], 'w', encoding='utf-8') as f:
+                f.write(texto)
+        self.stdout.write(texto)
+
+        if opts['baseline']:
+            regresiones = self._comparar(resultado, opts['baseline'], opts['tolerancia'])
+            if regresiones:
+                for linea in regresiones:
+                    self.stderr.write(self.style.ERROR(linea))
+                raise CommandError(f"{len(regresiones)} regresiones respecto al baseline.", returncode=1)
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto al baseline."))
+
+    def _medir(self, nombre, llamada, repeticiones):
+        self.stderr.write(f"Midiendo {nombre}...")
+        respuesta = llamada()  # calentamiento
+        if respuesta.status_code >= 400:
+            raise CommandError(f"{nombre} respondió {respuesta.status_code}")
+        tiempos, consultas = [], []
+        for _ in range(repeticiones):
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                respuesta = llamada()
+                if hasattr(respuesta, 'streaming_content'):
+                    for _ in respuesta.streaming_content:
+                        pass
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            if respuesta.status_code >= 400:
+                raise CommandError(f"{nombre} respondió {respuesta.status_code}")
+            consultas.append(len(capturadas))
+        return {
+            'p50_ms': round(statistics.median(tiempos), 2),
+            'p95_ms': round(_percentil(tiempos, 95), 2),
+            'consultas': max(consultas),
+            'status': respuesta.status_code,
+        }
+
+    def _comparar(self, resultado, ruta_baseline, tolerancia):
+        with open(ruta_baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['escenarios']
+        regresiones = []
+        for nombre, actual in resultado['escenarios'].items():
+            previo = baseline.get(nombre)
+            if previo is None:
+                continue
+            limite = previo['p95_ms'] * (1 + tolerancia)
+            if actual['p95_ms'] > limite:
+                regresiones.append(f"{nombre}: p95 {actual['p95_ms']} ms > {limite:.2f} ms (baseline {previo['p95_ms']} ms)")
+            if actual['consultas'] > previo['consultas']:
+                regresiones.append(f"{nombre}: {actual['consultas']} consultas > {previo['consultas']} del baseline")
+        return regresiones
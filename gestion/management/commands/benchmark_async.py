@@ -0,0 +1,109 @@
+# En: gestion/management/commands/benchmark_async.py
+
+import asyncio
+import json
+import statistics
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.shortcuts import render
+from django.test import RequestFactory
+
+from catalogo import views as catalogo_views
+from catalogo.models import Producto, Categoria
+from gestion.kpis import kpis_inventario, akpis_inventario
+
+
+# -----------------------------------------------------------------
+# Referencias síncronas (implementación previa de las vistas). Bajo ASGI
+# Django las ejecuta con sync_to_async(thread_sensitive=True), que es
+# exactamente lo que se reproduce aquí para compararlas.
+# -----------------------------------------------------------------
+def inicio_sync(request):
+    return render(request, 'catalogo/inicio.html', {'productos': Producto.objects.all()})
+
+def producto_sync(request, producto_id):
+    return render(request, 'catalogo/producto.html', {'producto': Producto.objects.get(id=producto_id)})
+
+def categoria_sync(request, nombre_categoria):
+    categoria_obj = Categoria.objects.get(nombre=nombre_categoria)
+    productos = Producto.objects.filter(categoria=categoria_obj)
+    return render(request, 'catalogo/categoria.html', {'categoria': categoria_obj, 'productos': productos})
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Compara las vistas async de solo lectura contra su versión síncrona bajo concurrencia tipo uvicorn."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, default=50, help="Peticiones simultáneas por ronda.")
+        parser.add_argument('--rondas', type=int, default=5)
+        parser.add_argument('--salida', help="Archivo donde guardar el resultado en JSON.")
+
+    def handle(self, *args, **options):
+        producto = Producto.objects.first()
+        categoria = Categoria.objects.first()
+        if producto is None or categoria is None:
+            raise CommandError("Se necesitan productos y categorías.")
+
+        factory = RequestFactory()
+        escenarios = {
+            'inicio': (
+                lambda: catalogo_views.inicio(factory.get('/')),
+                lambda: inicio_sync(factory.get('/')),
+            ),
+            'producto': (
+                lambda: catalogo_views.producto(factory.get('/'), producto.id),
+                lambda: producto_sync(factory.get('/'), producto.id),
+            ),
+            'categoria': (
+                lambda: catalogo_views.categoria(factory.get('/'), categoria.nombre),
+                lambda: categoria_sync(factory.get('/'), categoria.nombre),
+            ),
+            'kpis_inventario': (akpis_inventario, kpis_inventario),
+        }
+
+        resultado = asyncio.run(self._medir(escenarios, options['concurrencia'], options['rondas']))
+
+        texto = json.dumps(resultado, indent=2)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as f:
+                f.write(texto)
+        self.stdout.write(texto)
+
+    async def _medir(self, escenarios, concurrencia, rondas):
+        resultado = {}
+        for nombre, (llamada_async, llamada_sync) in escenarios.items():
+            resultado[nombre] = {
+                'async': await self._rondas(llamada_async, concurrencia, rondas),
+                'sync': await self._rondas(sync_to_async(llamada_sync), concurrencia, rondas),
+            }
+        return resultado
+
+    async def _rondas(self, corrutina, concurrencia, rondas):
+        latencias = []
+
+        async def una():
+            inicio = time.perf_counter()
+            await corrutina()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+        await una()  # calentamiento (plantillas, conexiones)
+        latencias.clear()
+
+        inicio_total = time.perf_counter()
+        for _ in range(rondas):
+            await asyncio.gather(*[una() for _ in range(concurrencia)])
+        total = time.perf_counter() - inicio_total
+
+        return {
+            'peticiones': len(latencias),
+            'p50_ms': round(statistics.median(latencias), 2),
+            'p95_ms': round(_percentil(latencias, 95), 2),
+            'req_por_seg': round(len(latencias) / total, 1),
+        }
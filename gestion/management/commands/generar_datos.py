@@ -0,0 +1,202 @@
+# En: gestion/management/commands/generar_datos.py
+
+import random
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from catalogo.models import Producto, Categoria, Marca
+from gestion.models import Proveedor, Bodega, MovimientoInventario, StockBodega
+
+# Prefijos para reconocer (y poder borrar) los datos sintéticos
+PREFIJO_SKU = 'GEN-'
+PREFIJO_RUT = 'GEN-'
+PREFIJO_NOMBRE = 'Gen '
+
+PALABRAS = [
+    'Chocolate', 'Caramelo', 'Gomita', 'Alfajor', 'Turron', 'Mani', 'Menta', 'Frutilla',
+    'Limon', 'Naranja', 'Coco', 'Manjar', 'Vainilla', 'Almendra', 'Nuez', 'Miel',
+    'Chicle', 'Galleta', 'Bombon', 'Calugas', 'Merengue', 'Praline', 'Cereza', 'Canela',
+]
+UOMS = ['UN', 'CAJA', 'PAQ', 'KG']
+
+# Tipo de movimiento y su peso relativo en la simulación
+PESOS_TIPO = [
+    (MovimientoInventario.TipoMovimiento.INGRESO, 35),
+    (MovimientoInventario.TipoMovimiento.SALIDA, 50),
+    (MovimientoInventario.TipoMovimiento.AJUSTE_POS, 5),
+    (MovimientoInventario.TipoMovimiento.AJUSTE_NEG, 5),
+    (MovimientoInventario.TipoMovimiento.DEVOLUCION, 5),
+]
+
+
+class Command(BaseCommand):
+    help = "Genera datos sintéticos reproducibles (misma semilla = mismos datos) para benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--productos', type=int, default=1000)
+        parser.add_argument('--categorias', type=int, default=20)
+        parser.add_argument('--marcas', type=int, default=30)
+        parser.add_argument('--proveedores', type=int, default=50)
+        parser.add_argument('--bodegas', type=int, default=5)
+        parser.add_argument('--movimientos', type=int, default=100000)
+        parser.add_argument('--dias', type=int, default=365, help="Días de historia de los movimientos.")
+        parser.add_argument('--lote', type=int, default=5000, help="Filas por INSERT masivo.")
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(opts['semilla'])
+        lote = opts['lote']
+
+        # Siempre se parte de cero: misma semilla = mismos datos
+        self._limpiar()
+
+        # Nota: en MySQL bulk_create no devuelve los ids, por eso cada
+        # tabla se vuelve a leer (por prefijo, en orden de inserción).
+        with transaction.atomic():
+            Categoria.objects.bulk_create(
+                [Categoria(nombre=f"{PREFIJO_NOMBRE}Categoria {i}") for i in range(opts['categorias'])]
+            )
+            categorias = list(Categoria.objects.filter(nombre__startswith=PREFIJO_NOMBRE).order_by('pk'))
+            Marca.objects.bulk_create(
+                [Marca(nombre=f"{PREFIJO_NOMBRE}Marca {i}") for i in range(opts['marcas'])]
+            )
+            marcas = list(Marca.objects.filter(nombre__startswith=PREFIJO_NOMBRE).order_by('pk'))
+            Bodega.objects.bulk_create(
+                [Bodega(nombre=f"{PREFIJO_NOMBRE}Bodega {i}", ubicacion=f"Sector {i}") for i in range(opts['bodegas'])]
+            )
+            bodegas = list(Bodega.objects.filter(nombre__startswith=PREFIJO_NOMBRE).order_by('pk'))
+            Proveedor.objects.bulk_create([
+                Proveedor(
+                    rut_nif=f"{PREFIJO_RUT}{i:06d}",
+                    razon_social=f"{PREFIJO_NOMBRE}Proveedor {i}",
+                    email=f"proveedor{i}@ejemplo.cl",
+                    ciudad=rnd.choice(['Santiago', 'Valparaiso', 'Concepcion']),
+                    pais='Chile',
+                )
+                for i in range(opts['proveedores'])
+            ])
+            proveedores = list(Proveedor.objects.filter(rut_nif__startswith=PREFIJO_RUT).order_by('pk'))
+            Producto.objects.bulk_create([
+                self._producto(rnd, i, categorias, marcas) for i in range(opts['productos'])
+            ], batch_size=lote)
+            productos = list(Producto.objects.filter(sku__startswith=PREFIJO_SKU).order_by('pk'))
+
+            # Vínculo proveedor-producto (1 a 3 proveedores por producto)
+            Enlace = Proveedor.productos_suministrados.through
+            enlaces = set()
+            proveedores_de = {}
+            for producto in productos:
+                elegidos = rnd.sample(proveedores, k=min(len(proveedores), rnd.randint(1, 3))) if proveedores else []
+                proveedores_de[producto.pk] = elegidos
+                enlaces.update((proveedor.pk, producto.pk) for proveedor in elegidos)
+            Enlace.objects.bulk_create(
+                [Enlace(proveedor_id=pv, producto_id=pr) for pv, pr in sorted(enlaces)], batch_size=lote
+            )
+
+        stock, stock_bodega = self._movimientos(rnd, opts, productos, bodegas, proveedores_de)
+
+        # Stock final (total y por bodega) consistente con el ledger generado
+        for producto in productos:
+            producto.stock_actual = stock[producto.pk]
+        Producto.objects.bulk_update(productos, ['stock_actual'], batch_size=lote)
+        StockBodega.objects.bulk_create(
+            [StockBodega(producto_id=pr, bodega_id=bo, cantidad=cantidad) for (pr, bo), cantidad in stock_bodega.items()],
+            batch_size=lote,
+        )
+        # Los movimientos se insertaron en bloque, sin pasar por los resúmenes diarios
+        call_command('reconstruir_resumenes', stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generados {len(productos)} productos, {len(categorias)} categorías, {len(marcas)} marcas, "
+            f"{len(proveedores)} proveedores, {len(bodegas)} bodegas y {opts['movimientos']} movimientos "
+            f"(semilla {opts['semilla']})."
+        ))
+
+    def _producto(self, rnd, i, categorias, marcas):
+        nombre = f"{rnd.choice(PALABRAS)} {rnd.choice(PALABRAS)}"
+        costo = rnd.randint(100, 5000)
+        perecible = rnd.random() < 0.4
+        return Producto(
+            sku=f"{PREFIJO_SKU}{i:06d}",
+            ean_upc=f"790{i:09d}",
+            nombre=nombre,
+            descripcion=f"{nombre} (dato sintético)",
+            categoria=rnd.choice(categorias) if categorias else None,
+            marca=rnd.choice(marcas) if marcas else None,
+            uom_compra='CAJA',
+            uom_venta=rnd.choice(UOMS),
+            factor_conversion=rnd.choice([1, 6, 12, 24]),
+            costo_estandar=costo,
+            costo_promedio=costo,
+            precio_venta=int(costo * rnd.uniform(1.3, 2.2)),
+            stock_minimo=rnd.randint(0, 50),
+            perishable=perecible,
+            control_por_lote=perecible or rnd.random() < 0.2,
+        )
+
+    def _movimientos(self, rnd, opts, productos, bodegas, proveedores_de):
+        total = opts['movimientos']
+        tipos, pesos = zip(*PESOS_TIPO)
+        entradas = set(MovimientoInventario.TIPOS_ENTRADA)
+        stock = {producto.pk: 0 for producto in productos}
+        stock_bodega = {}
+        if not total or not productos or not bodegas:
+            return stock, stock_bodega
+
+        inicio = timezone.now() - timedelta(days=opts['dias'])
+        paso = timedelta(days=opts['dias']) / total
+        buffer = []
+
+        for n in range(total):
+            producto = rnd.choice(productos)
+            bodega = rnd.choice(bodegas)
+            clave = (producto.pk, bodega.pk)
+            tipo = rnd.choices(tipos, weights=pesos)[0]
+            cantidad = rnd.randint(1, 48)
+            # Se valida contra la bodega, como registrar_movimientos (StockBodega.reservar_salidas)
+            if tipo not in entradas and stock_bodega.get(clave, 0) < cantidad:
+                # Sin stock suficiente en esa bodega: la simulación repone primero
+                tipo = MovimientoInventario.TipoMovimiento.INGRESO
+                cantidad = rnd.randint(cantidad, cantidad + 200)
+
+            fecha = inicio + paso * n
+            movimiento = MovimientoInventario(
+                producto_id=producto.pk,
+                tipo=tipo,
+                cantidad=cantidad,
+                fecha=fecha,
+                bodega=bodega,
+                doc_ref=f"GEN-DOC-{n // 5:07d}",
+            )
+            if tipo == MovimientoInventario.TipoMovimiento.INGRESO and proveedores_de[producto.pk]:
+                movimiento.proveedor = rnd.choice(proveedores_de[producto.pk])
+            if producto.control_por_lote:
+                movimiento.lote = f"L{fecha:%Y%m}-{producto.pk % 97:02d}"
+            if producto.perishable and tipo in entradas:
+                movimiento.fecha_vencimiento = (fecha + timedelta(days=rnd.randint(30, 365))).date()
+
+            delta = cantidad if tipo in entradas else -cantidad
+            stock[producto.pk] += delta
+            stock_bodega[clave] = stock_bodega.get(clave, 0) + delta
+            buffer.append(movimiento)
+            if len(buffer) >= opts['lote']:
+                MovimientoInventario.objects.bulk_create(buffer)
+                buffer.clear()
+                self.stdout.write(f"  {n + 1}/{total} movimientos...")
+
+        if buffer:
+            MovimientoInventario.objects.bulk_create(buffer)
+        return stock, stock_bodega
+
+    def _limpiar(self):
+        productos = Producto.todos.filter(sku__startswith=PREFIJO_SKU)
+        MovimientoInventario.objects.filter(producto__in=productos).delete()
+        productos.delete()
+        Proveedor.todos.filter(rut_nif__startswith=PREFIJO_RUT).delete()
+        Bodega.objects.filter(nombre__startswith=PREFIJO_NOMBRE).delete()
+        Categoria.objects.filter(nombre__startswith=PREFIJO_NOMBRE).delete()
+        Marca.objects.filter(nombre__startswith=PREFIJO_NOMBRE).delete()
@@ -0,0 +1,34 @@
+# En: gestion/management/commands/procesar_correos.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestion.correo import procesar_cola
+
+
+class Command(BaseCommand):
+    help = (
+        "Envía los correos encolados en tandas sobre una sola conexión SMTP, reintentando "
+        "los fallidos con espera exponencial. Con --continuo queda corriendo como worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100, help="Correos por tanda (y por conexión).")
+        parser.add_argument('--continuo', action='store_true', help="No termina al vaciar la cola.")
+        parser.add_argument('--intervalo', type=float, default=5.0, help="Segundos de espera con la cola vacía.")
+
+    def handle(self, *args, **opts):
+        total_enviados = total_fallidos = 0
+        while True:
+            enviados, fallidos = procesar_cola(opts['lote'])
+            total_enviados += enviados
+            total_fallidos += fallidos
+            if enviados or fallidos:
+                self.stdout.write(f"  tanda: {enviados} enviados, {fallidos} fallidos")
+                continue
+            if not opts['continuo']:
+                break
+            time.sleep(opts['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS(f"{total_enviados} correos enviados, {total_fallidos} fallidos (se reintentarán)."))
@@ -0,0 +1,32 @@
+# En: gestion/management/commands/purgar_eliminados.py
+
+from django.core.management.base import BaseCommand
+
+from gestion.purga import MODELOS, pendientes, purgar
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra físicamente los productos y proveedores dados de baja (y su historial), "
+        "por tandas cortas con pausas para no bloquear las tablas del día a día."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modelo', choices=sorted(MODELOS), help="Solo productos o solo proveedores.")
+        parser.add_argument('--dias', type=int, default=30, help="Purga lo dado de baja hace al menos estos días.")
+        parser.add_argument('--tanda', type=int, default=1000, help="Filas dependientes por transacción.")
+        parser.add_argument('--pausa', type=float, default=0.1, help="Segundos de espera entre tandas.")
+
+    def handle(self, *args, **opts):
+        nombres = [opts['modelo']] if opts['modelo'] else sorted(MODELOS)
+        for nombre in nombres:
+            purgados = filas = 0
+            for registro in pendientes(MODELOS[nombre], opts['dias']).order_by('fecha_baja').iterator():
+                tocadas = purgar(registro, opts['tanda'], opts['pausa'])
+                if tocadas is None:
+                    self.stdout.write(f"  {nombre} {registro.pk} fue restaurado: se omite.")
+                    continue
+                purgados += 1
+                filas += tocadas
+                self.stdout.write(f"  {nombre} {registro}: {tocadas} filas")
+            self.stdout.write(self.style.SUCCESS(f"{purgados} {nombre}(s) purgados ({filas} filas)."))
@@ -0,0 +1,85 @@
+# En: gestion/management/commands/reconstruir_resumenes.py
+
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum, Count, Min, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from gestion.models import MovimientoInventario, MovimientoArchivado, ResumenDiarioMovimiento
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye los resúmenes diarios (producto, bodega, tipo) desde el historial de "
+        "movimientos, por tramos de días con agregación en SQL e inserción masiva."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help="Fecha inicial YYYY-MM-DD (por defecto, el primer movimiento).")
+        parser.add_argument('--hasta', help="Fecha final YYYY-MM-DD inclusive (por defecto, el último movimiento).")
+        parser.add_argument('--dias-por-tramo', type=int, default=31)
+
+    def handle(self, *args, **opts):
+        # El historial incluye lo archivado (ver gestion/archivo.py)
+        rangos = [modelo.objects.aggregate(primero=Min('fecha'), ultimo=Max('fecha')) for modelo in (MovimientoInventario, MovimientoArchivado)]
+        rango = {
+            'primero': min((r['primero'] for r in rangos if r['primero']), default=None),
+            'ultimo': max((r['ultimo'] for r in rangos if r['ultimo']), default=None),
+        }
+        if rango['primero'] is None:
+            self.stdout.write("No hay movimientos.")
+            return
+
+        try:
+            desde = datetime.strptime(opts['desde'], '%Y-%m-%d').date() if opts['desde'] else timezone.localdate(rango['primero'])
+            hasta = datetime.strptime(opts['hasta'], '%Y-%m-%d').date() if opts['hasta'] else timezone.localdate(rango['ultimo'])
+        except ValueError:
+            raise CommandError("Las fechas deben tener formato YYYY-MM-DD.")
+
+        paso = timedelta(days=max(1, opts['dias_por_tramo']))
+        total = 0
+        inicio_tramo = desde
+        while inicio_tramo <= hasta:
+            fin_tramo = min(inicio_tramo + paso - timedelta(days=1), hasta)
+            total += self._reconstruir_tramo(inicio_tramo, fin_tramo)
+            self.stdout.write(f"  {inicio_tramo} a {fin_tramo}: listo")
+            inicio_tramo = fin_tramo + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} filas de resumen reconstruidas entre {desde} y {hasta}."))
+
+    def _reconstruir_tramo(self, desde, hasta):
+        # Límites en hora local, igual que ResumenDiarioMovimiento.acumular()
+        inicio = timezone.make_aware(datetime.combine(desde, time.min))
+        fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+
+        # Un mismo día puede estar repartido entre la tabla viva y el archivo: se suman
+        acumulado = {}
+        for modelo in (MovimientoInventario, MovimientoArchivado):
+            filas = (
+                modelo.objects.filter(fecha__gte=inicio, fecha__lt=fin)
+                .annotate(dia=TruncDate('fecha'))
+                .values('dia', 'producto_id', 'bodega_id', 'tipo')
+                .annotate(total=Sum('cantidad'), veces=Count('id'))
+                .order_by()
+            )
+            for fila in filas.iterator(chunk_size=5000):
+                clave = (fila['dia'], fila['producto_id'], fila['bodega_id'], fila['tipo'])
+                cantidad, veces = acumulado.get(clave, (0, 0))
+                acumulado[clave] = (cantidad + fila['total'], veces + fila['veces'])
+
+        with transaction.atomic():
+            ResumenDiarioMovimiento.objects.filter(fecha__gte=desde, fecha__lte=hasta).delete()
+            creadas = ResumenDiarioMovimiento.objects.bulk_create(
+                (
+                    ResumenDiarioMovimiento(
+                        fecha=dia, producto_id=producto_id, bodega_id=bodega_id,
+                        tipo=tipo, cantidad=cantidad, movimientos=veces,
+                    )
+                    for (dia, producto_id, bodega_id, tipo), (cantidad, veces) in acumulado.items()
+                ),
+                batch_size=5000,
+            )
+        return len(creadas)
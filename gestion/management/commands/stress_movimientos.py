@@ -0,0 +1,212 @@
+# En: gestion/management/commands/stress_movimientos.py
+
+import multiprocessing
+import random
+import threading
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, OperationalError, connection, connections
+from django.db.models import Sum
+
+from catalogo.models import Producto
+from gestion.models import Bodega, MovimientoInventario, StockBodega
+from gestion.movimientos import registrar_movimientos, cantidad_con_signo
+from gestion.transferencias import registrar_transferencia
+
+PREFIJO = 'STRESS-'
+STOCK_INICIAL = 500
+REINTENTOS = 20
+
+TIPOS = [
+    MovimientoInventario.TipoMovimiento.INGRESO,
+    MovimientoInventario.TipoMovimiento.SALIDA,
+    MovimientoInventario.TipoMovimiento.SALIDA,
+    MovimientoInventario.TipoMovimiento.AJUSTE_POS,
+    MovimientoInventario.TipoMovimiento.AJUSTE_NEG,
+]
+
+
+def _transferir(rnd, producto_ids, bodega_ids):
+    origen, destino = rnd.sample(bodega_ids, 2)
+    lineas = [
+        {'producto_id': producto_id, 'cantidad': rnd.randint(1, 20)}
+        for producto_id in rnd.sample(producto_ids, rnd.randint(1, len(producto_ids)))
+    ]
+    registrar_transferencia(origen, destino, lineas, doc_ref=f"{PREFIJO}TR")
+    return len(lineas) * 2
+
+
+def _trabajador(semilla, operaciones, producto_ids, bodega_ids, en_bloque, transferencias=0.0):
+    """Postea `operaciones` movimientos al azar. Devuelve (aceptados, rechazados, reintentos)."""
+    rnd = random.Random(semilla)
+    aceptados = rechazados = reintentos = 0
+    try:
+        for _ in range(operaciones):
+            if len(bodega_ids) > 1 and rnd.random() < transferencias:
+                for intento in range(REINTENTOS):
+                    try:
+                        aceptados += _transferir(rnd, producto_ids, bodega_ids)
+                        break
+                    except (ValidationError, IntegrityError):
+                        rechazados += 1
+                        break
+                    except OperationalError:
+                        reintentos += 1
+                        time.sleep(0.01 * (intento + 1))
+                continue
+            lineas = rnd.randint(2, 5) if en_bloque else 1
+            movimientos = [
+                MovimientoInventario(
+                    producto_id=rnd.choice(producto_ids),
+                    bodega_id=rnd.choice(bodega_ids),
+                    tipo=rnd.choice(TIPOS),
+                    cantidad=rnd.randint(1, 20),
+                    doc_ref=f"{PREFIJO}{semilla}",
+                )
+                for _ in range(lineas)
+            ]
+            for intento in range(REINTENTOS):
+                try:
+                    if en_bloque:
+                        registrar_movimientos(movimientos)
+                    else:
+                        movimientos[0].save()
+                    aceptados += len(movimientos)
+                    break
+                except (ValidationError, IntegrityError):
+                    # Stock insuficiente (validación o CHECK de la BD): rechazo esperado
+                    rechazados += len(movimientos)
+                    break
+                except OperationalError:
+                    # SQLite: "database is locked" bajo contención, se reintenta
+                    reintentos += 1
+                    for movimiento in movimientos:
+                        movimiento.pk = None
+                    time.sleep(0.01 * (intento + 1))
+            else:
+                rechazados += len(movimientos)
+    finally:
+        connections.close_all()
+    return aceptados, rechazados, reintentos
+
+
+def _trabajador_proceso(args):
+    return _trabajador(*args)
+
+
+class Command(BaseCommand):
+    help = (
+        "Postea movimientos IN/OUT/AJ (y transferencias) en paralelo sobre pocos SKUs y verifica que "
+        "stock_actual y los saldos por bodega cuadren con el ledger. Sale con código 1 si no cuadra."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trabajadores', type=int, default=8)
+        parser.add_argument('--operaciones', type=int, default=200, help="Operaciones por trabajador.")
+        parser.add_argument('--productos', type=int, default=3, help="Cantidad de SKUs 'calientes'.")
+        parser.add_argument('--bodegas', type=int, default=2)
+        parser.add_argument('--modo', choices=['hilos', 'procesos'], default='hilos')
+        parser.add_argument('--en-bloque', action='store_true',
+                            help="Usa registrar_movimientos() con documentos de varias líneas en vez de save().")
+        parser.add_argument('--transferencias', type=float, default=0.0,
+                            help="Fracción de operaciones que son transferencias entre bodegas (0 a 1).")
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--conservar', action='store_true', help="No borra los datos de prueba al terminar.")
+
+    def handle(self, *args, **opts):
+        producto_ids, bodega_ids = self._preparar(opts['productos'], opts['bodegas'])
+        tareas = [
+            (opts['semilla'] * 1000 + n, opts['operaciones'], producto_ids, bodega_ids, opts['en_bloque'], opts['transferencias'])
+            for n in range(opts['trabajadores'])
+        ]
+
+        inicio = time.perf_counter()
+        if opts['modo'] == 'procesos':
+            # fork: los hijos heredan Django ya configurado; cada uno abre su propia conexión
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(opts['trabajadores']) as pool:
+                resultados = pool.map(_trabajador_proceso, tareas)
+        else:
+            resultados = [None] * len(tareas)
+
+            def correr(i, tarea):
+                resultados[i] = _trabajador(*tarea)
+
+            hilos = [threading.Thread(target=correr, args=(i, t)) for i, t in enumerate(tareas)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        aceptados = sum(r[0] for r in resultados)
+        rechazados = sum(r[1] for r in resultados)
+        reintentos = sum(r[2] for r in resultados)
+        errores = self._verificar(producto_ids)
+
+        self.stdout.write(
+            f"Motor: {connection.vendor} | modo: {opts['modo']} | trabajadores: {opts['trabajadores']}\n"
+            f"Movimientos aceptados: {aceptados} | rechazados por stock: {rechazados} | reintentos: {reintentos}\n"
+            f"Duración: {duracion:.2f} s | {aceptados / duracion:.1f} movimientos/s sostenidos"
+        )
+
+        if not opts['conservar']:
+            self._limpiar()
+
+        if errores:
+            for error in errores:
+                self.stderr.write(self.style.ERROR(error))
+            raise CommandError("Stock inconsistente con el ledger.", returncode=1)
+        self.stdout.write(self.style.SUCCESS("Stock consistente con el ledger."))
+
+    def _preparar(self, cantidad_productos, cantidad_bodegas):
+        self._limpiar()
+        for i in range(cantidad_bodegas):
+            Bodega.objects.create(nombre=f"{PREFIJO}Bodega {i}")
+        bodegas = list(Bodega.objects.filter(nombre__startswith=PREFIJO).values_list('pk', flat=True))
+        productos = []
+        for i in range(cantidad_productos):
+            producto = Producto.objects.create(sku=f"{PREFIJO}{i:03d}", ean_upc=f"{PREFIJO}{i:03d}", nombre=f"Stress {i}")
+            MovimientoInventario(
+                producto=producto, bodega_id=bodegas[0], cantidad=STOCK_INICIAL,
+                tipo=MovimientoInventario.TipoMovimiento.INGRESO, doc_ref=f"{PREFIJO}INICIAL",
+            ).save()
+            productos.append(producto.pk)
+        return productos, bodegas
+
+    def _verificar(self, producto_ids):
+        errores = []
+        ledger = dict(
+            MovimientoInventario.objects.filter(producto_id__in=producto_ids)
+            .values('producto_id').annotate(total=Sum(cantidad_con_signo()))
+            .values_list('producto_id', 'total')
+        )
+        for pk, stock in Producto.objects.filter(pk__in=producto_ids).values_list('pk', 'stock_actual'):
+            if stock < 0:
+                errores.append(f"Producto {pk}: stock negativo ({stock}).")
+            if stock != (ledger.get(pk) or 0):
+                errores.append(f"Producto {pk}: stock_actual {stock} != suma del ledger {ledger.get(pk)}.")
+
+        # Saldos por bodega: deben cuadrar con el ledger (contando transferencias) y sumar el total
+        ledger_bodega = {
+            (pr, bo): total for pr, bo, total in
+            MovimientoInventario.objects.filter(producto_id__in=producto_ids)
+            .values('producto_id', 'bodega_id').annotate(total=Sum(cantidad_con_signo(por_bodega=True)))
+            .values_list('producto_id', 'bodega_id', 'total')
+        }
+        suma_bodegas = {}
+        for pr, bo, cantidad in StockBodega.objects.filter(producto_id__in=producto_ids).values_list('producto_id', 'bodega_id', 'cantidad'):
+            suma_bodegas[pr] = suma_bodegas.get(pr, 0) + cantidad
+            if cantidad != (ledger_bodega.get((pr, bo)) or 0):
+                errores.append(f"Producto {pr} en bodega {bo}: saldo {cantidad} != ledger {ledger_bodega.get((pr, bo))}.")
+        for pk, stock in Producto.objects.filter(pk__in=producto_ids).values_list('pk', 'stock_actual'):
+            if suma_bodegas.get(pk, 0) != stock:
+                errores.append(f"Producto {pk}: suma por bodega {suma_bodegas.get(pk, 0)} != stock_actual {stock}.")
+        return errores
+
+    def _limpiar(self):
+        MovimientoInventario.objects.filter(producto__sku__startswith=PREFIJO).delete()
+        Producto.todos.filter(sku__startswith=PREFIJO).delete()
+        Bodega.objects.filter(nombre__startswith=PREFIJO).delete()
@@ -0,0 +1,292 @@
+# En: gestion/metricas.py
+
+import atexit
+import glob
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin workers pre-fork, no hay archivos que consolidar
+    fcntl = None
+
+from django.conf import settings
+
+# -----------------------------------------------------------------
+# REGISTRO DE MÉTRICAS (formato de texto Prometheus)
+# -----------------------------------------------------------------
+# Contadores e histogramas en memoria, servidos en /metrics.
+#
+# Modo multiproceso (gunicorn/uwsgi con varios workers pre-fork): si
+# settings.METRICAS_DIR apunta a un directorio compartido, cada proceso
+# vuelca sus valores a <dir>/metricas_<pid>_<id>.json (como máximo cada
+# METRICAS_INTERVALO_VOLCADO segundos y al salir) y /metrics suma los
+# archivos de todos los procesos más los valores vivos del que responde.
+#
+# El <id> es propio de cada proceso: un worker nuevo que recicla el pid de
+# uno muerto no pisa su archivo. Los archivos de procesos muertos se
+# consolidan en <dir>/metricas_finalizados.json y se borran (los contadores
+# no retroceden y el directorio no crece con cada reinicio de workers):
+#   - al servir /metrics, los de pids que ya no existen;
+#   - con marcar_proceso_muerto(pid), desde el hook child_exit de gunicorn
+#     (cubre también un pid reciclado antes del siguiente scrape).
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LE_INF = 'le="+Inf"'
+
+
+def _etiquetas_texto(nombres, valores, extra=''):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formato_numero(valor):
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, registro, nombre, ayuda, etiquetas=()):
+        self.registro = registro
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.valores = {}  # tupla de etiquetas -> valor
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = tuple(str(etiquetas.get(e, '')) for e in self.etiquetas)
+        with self.registro.lock:
+            self.valores[clave] = self.valores.get(clave, 0) + cantidad
+        self.registro.volcar_si_corresponde()
+
+    def exportar(self):
+        return {'|'.join(k): v for k, v in self.valores.items()}
+
+    @staticmethod
+    def combinar(total, parcial):
+        for clave, valor in parcial.items():
+            total[clave] = total.get(clave, 0) + valor
+
+    def lineas(self, datos):
+        for clave, valor in sorted(datos.items()):
+            valores = clave.split('|') if self.etiquetas else ()
+            yield f"{self.nombre}{_etiquetas_texto(self.etiquetas, valores)} {_formato_numero(valor)}"
+
+
+class Histograma:
+    tipo = 'histogram'
+
+    def __init__(self, registro, nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        self.registro = registro
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(buckets)
+        self.valores = {}  # tupla de etiquetas -> [conteos por bucket..., suma, total]
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(str(etiquetas.get(e, '')) for e in self.etiquetas)
+        with self.registro.lock:
+            serie = self.valores.get(clave)
+            if serie is None:
+                serie = self.valores[clave] = [0] * (len(self.buckets) + 2)
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+        self.registro.volcar_si_corresponde()
+
+    def exportar(self):
+        return {'|'.join(k): list(v) for k, v in self.valores.items()}
+
+    @staticmethod
+    def combinar(total, parcial):
+        for clave, serie in parcial.items():
+            if clave in total:
+                total[clave] = [a + b for a, b in zip(total[clave], serie)]
+            else:
+                total[clave] = list(serie)
+
+    def lineas(self, datos):
+        for clave, serie in sorted(datos.items()):
+            valores = clave.split('|') if self.etiquetas else ()
+            for limite, conteo in zip(self.buckets, serie):
+                le = f'le="{_formato_numero(limite)}"'
+                yield f"{self.nombre}_bucket{_etiquetas_texto(self.etiquetas, valores, le)} {conteo}"
+            yield f"{self.nombre}_bucket{_etiquetas_texto(self.etiquetas, valores, LE_INF)} {serie[-1]}"
+            yield f"{self.nombre}_sum{_etiquetas_texto(self.etiquetas, valores)} {_formato_numero(serie[-2])}"
+            yield f"{self.nombre}_count{_etiquetas_texto(self.etiquetas, valores)} {serie[-1]}"
+
+
+ARCHIVO_PROCESO = re.compile(r'metricas_(\d+)_[0-9a-f]+\.json$')
+FINALIZADOS = 'metricas_finalizados.json'
+
+
+def _pid_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # existe, pero es de otro usuario
+    return True
+
+
+class RegistroMetricas:
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.metricas = {}
+        self._ultimo_volcado = 0.0
+        self._pid = None
+        self._id_proceso = None
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self.metricas.setdefault(nombre, Contador(self, nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        return self.metricas.setdefault(nombre, Histograma(self, nombre, ayuda, etiquetas, buckets))
+
+    # --- Modo multiproceso ---
+    @property
+    def directorio(self):
+        return getattr(settings, 'METRICAS_DIR', None)
+
+    def _archivo_propio(self):
+        # Se renueva tras un fork: cada worker tiene su propio archivo
+        if self._pid != os.getpid():
+            self._pid, self._id_proceso = os.getpid(), uuid.uuid4().hex[:12]
+        return os.path.join(self.directorio, f'metricas_{self._pid}_{self._id_proceso}.json')
+
+    @contextmanager
+    def _bloqueo(self, exclusivo):
+        # Entre procesos: nadie lee mientras se mueve un archivo a los finalizados
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directorio, '.bloqueo'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _leer(ruta):
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _escribir(self, destino, datos):
+        temporal = f'{destino}.{os.getpid()}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f)
+        os.replace(temporal, destino)  # reemplazo atómico: nunca se lee un archivo a medias
+
+    def _combinar(self, combinados, parcial):
+        for nombre, datos in (parcial or {}).items():
+            if nombre in self.metricas:
+                self.metricas[nombre].combinar(combinados.setdefault(nombre, {}), datos)
+
+    def _consolidar(self, rutas):
+        """Suma los archivos de procesos muertos a los finalizados y los borra."""
+        if not rutas or fcntl is None:
+            return
+        with self._bloqueo(exclusivo=True):
+            rutas = [ruta for ruta in rutas if os.path.exists(ruta)]  # otro proceso pudo adelantarse
+            if not rutas:
+                return
+            finalizados = os.path.join(self.directorio, FINALIZADOS)
+            total = self._leer(finalizados) or {}
+            for ruta in rutas:
+                self._combinar(total, self._leer(ruta))
+            self._escribir(finalizados, total)
+            for ruta in rutas:
+                os.remove(ruta)
+
+    def marcar_proceso_muerto(self, pid):
+        """Para el hook child_exit de gunicorn: consolida los archivos del worker `pid`."""
+        if self.directorio:
+            self._consolidar(glob.glob(os.path.join(self.directorio, f'metricas_{int(pid)}_*.json')))
+
+    def volcar_si_corresponde(self):
+        if not self.directorio:
+            return
+        ahora = time.monotonic()
+        if ahora - self._ultimo_volcado < getattr(settings, 'METRICAS_INTERVALO_VOLCADO', 5):
+            return
+        self._ultimo_volcado = ahora
+        self.volcar()
+
+    def volcar(self):
+        if not self.directorio:
+            return
+        with self.lock:
+            datos = {nombre: metrica.exportar() for nombre, metrica in self.metricas.items()}
+        self._escribir(self._archivo_propio(), datos)
+
+    def _datos_combinados(self):
+        with self.lock:
+            combinados = {nombre: metrica.exportar() for nombre, metrica in self.metricas.items()}
+        if not self.directorio:
+            return combinados
+        propio = self._archivo_propio()
+        procesos = {}
+        for ruta in glob.glob(os.path.join(self.directorio, 'metricas_*.json')):
+            coincide = ARCHIVO_PROCESO.search(ruta)
+            if coincide and ruta != propio:  # de este proceso se usan los valores vivos
+                procesos[ruta] = int(coincide.group(1))
+        self._consolidar([ruta for ruta, pid in procesos.items() if not _pid_vivo(pid)])
+
+        with self._bloqueo(exclusivo=False):
+            for ruta in [*procesos, os.path.join(self.directorio, FINALIZADOS)]:
+                self._combinar(combinados, self._leer(ruta))
+        return combinados
+
+    def texto_prometheus(self):
+        combinados = self._datos_combinados()
+        lineas = []
+        for nombre, metrica in sorted(self.metricas.items()):
+            lineas.append(f"# HELP {nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {nombre} {metrica.tipo}")
+            lineas.extend(metrica.lineas(combinados.get(nombre, {})))
+        return '\n'.join(lineas) + '\n'
+
+
+registro = RegistroMetricas()
+atexit.register(registro.volcar)
+
+# --- Métricas de la aplicación ---
+latencia_peticiones = registro.histograma(
+    'dulceria_http_request_duration_seconds', 'Latencia de las peticiones HTTP por vista.', ('vista', 'metodo')
+)
+movimientos_registrados_total = registro.contador(
+    'dulceria_movimientos_registrados_total', 'Movimientos de inventario registrados.', ('tipo', 'bodega')
+)
+quiebres_stock_total = registro.contador(
+    'dulceria_quiebres_stock_total', 'Veces que un producto quedó con stock 0 tras una salida.'
+)
+exportacion_duracion = registro.histograma(
+    'dulceria_exportacion_duration_seconds', 'Duración de las exportaciones a Excel.', ('exportacion',)
+)
+exportacion_filas_total = registro.contador(
+    'dulceria_exportacion_filas_total', 'Filas escritas por las exportaciones a Excel.', ('exportacion',)
+)
+escaner_cache_total = registro.contador(
+    'dulceria_escaner_cache_total', 'Búsquedas en la caché del escáner POS por resultado.', ('resultado',)
+)
@@ -0,0 +1,227 @@
+# En: gestion/middleware.py
+
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from . import metricas
+from .permisos import permisos_de, permisos_de_peticion, permiso_para, denegar
+
+logger = logging.getLogger('gestion.instrumentacion')
+
+
+# -----------------------------------------------------------------
+# INSTRUMENTACIÓN POR PETICIÓN (tiempos, consultas SQL, N+1)
+# -----------------------------------------------------------------
+class RegistroConsultas:
+    """execute_wrapper que anota cada consulta SQL y su duración."""
+
+    def __init__(self):
+        self.consultas = []  # (sql, ms)
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append((sql, (time.perf_counter() - inicio) * 1000))
+
+    @property
+    def total_ms(self):
+        return sum(ms for _, ms in self.consultas)
+
+    def duplicadas(self, minimo):
+        # Misma sentencia (sin parámetros) repetida: típico patrón N+1
+        conteo = Counter(sql for sql, _ in self.consultas)
+        return [(sql, veces) for sql, veces in conteo.most_common() if veces >= minimo]
+
+    def mas_lentas(self, cantidad):
+        return sorted(self.consultas, key=lambda c: c[1], reverse=True)[:cantidad]
+
+
+# La conexión es por thread: bajo ASGI las consultas de una vista async corren
+# en el thread de sync_to_async, no en el del loop. Por eso el registro de la
+# petición viaja en un ContextVar (sync_to_async copia el contexto) y cada
+# conexión lleva un execute_wrapper fijo que anota en el registro vigente.
+_registro_actual = ContextVar('registro_consultas', default=None)
+
+
+def _anotar_consulta(execute, sql, params, many, context):
+    registro = _registro_actual.get()
+    if registro is None:
+        return execute(sql, params, many, context)
+    return registro(execute, sql, params, many, context)
+
+
+def _instalar_anotador(sender=None, connection=None, **kwargs):
+    if _anotar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_anotar_consulta)
+
+
+connection_created.connect(_instalar_anotador, dispatch_uid='instrumentacion_anotador')
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide cada petición (muestreada) y deja:
+      - cabecera Server-Timing (visible en las DevTools del navegador)
+      - una línea de log JSON por petición en el logger 'gestion.instrumentacion'
+      - un warning con las consultas más lentas y repetidas si la petición es lenta
+    Además alimenta el histograma de latencia por vista de /metrics (siempre,
+    sin muestreo: solo cuesta medir el tiempo).
+    Configuración en settings: INSTRUMENTACION_MUESTREO (0 a 1),
+    INSTRUMENTACION_UMBRAL_LENTO_MS e INSTRUMENTACION_MIN_DUPLICADAS.
+
+    Es sync y async: bajo ASGI no obliga a Django a pasar toda la cadena por
+    sync_to_async (va primero en MIDDLEWARE).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.muestreo = getattr(settings, 'INSTRUMENTACION_MUESTREO', 1.0)
+        self.umbral_lento_ms = getattr(settings, 'INSTRUMENTACION_UMBRAL_LENTO_MS', 500)
+        self.min_duplicadas = getattr(settings, 'INSTRUMENTACION_MIN_DUPLICADAS', 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _muestrear(self):
+        return self.muestreo >= 1 or random.random() < self.muestreo
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        if not self._muestrear():
+            response = self.get_response(request)
+            self._observar_latencia(request, time.perf_counter() - inicio)
+            return response
+
+        # La conexión de este thread puede venir de antes de conectar la señal
+        _instalar_anotador(connection=connection)
+        registro = RegistroConsultas()
+        token = _registro_actual.set(registro)
+        try:
+            response = self.get_response(request)
+        finally:
+            _registro_actual.reset(token)
+        return self._registrar(request, response, registro, inicio)
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        if not self._muestrear():
+            response = await self.get_response(request)
+            self._observar_latencia(request, time.perf_counter() - inicio)
+            return response
+
+        registro = RegistroConsultas()
+        token = _registro_actual.set(registro)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _registro_actual.reset(token)
+        return self._registrar(request, response, registro, inicio)
+
+    def _registrar(self, request, response, registro, inicio):
+        total_ms = (time.perf_counter() - inicio) * 1000
+        self._observar_latencia(request, total_ms / 1000)
+
+        db_ms = registro.total_ms
+        response['Server-Timing'] = (
+            f'total;dur={total_ms:.1f}, '
+            f'db;dur={db_ms:.1f};desc="{len(registro.consultas)} consultas"'
+        )
+
+        vista = self._vista(request)
+        duplicadas = registro.duplicadas(self.min_duplicadas)
+        datos = {
+            'vista': vista,
+            'metodo': request.method,
+            'status': response.status_code,
+            'ms': round(total_ms, 1),
+            'consultas': len(registro.consultas),
+            'db_ms': round(db_ms, 1),
+            'duplicadas': sum(veces for _, veces in duplicadas),
+        }
+        logger.info(json.dumps(datos))
+
+        if total_ms >= self.umbral_lento_ms:
+            logger.warning(json.dumps({
+                **datos,
+                'lenta': True,
+                'top_consultas': [{'sql': sql[:300], 'ms': round(ms, 2)} for sql, ms in registro.mas_lentas(5)],
+                'top_duplicadas': [{'sql': sql[:300], 'veces': veces} for sql, veces in duplicadas[:5]],
+            }))
+
+        return response
+
+    @staticmethod
+    def _vista(request):
+        match = getattr(request, 'resolver_match', None)
+        return (match.url_name or match.route) if match else 'sin_ruta'
+
+    def _observar_latencia(self, request, segundos):
+        # El histograma de latencia (/metrics) cuenta todas las peticiones, no solo las muestreadas
+        metricas.latencia_peticiones.observar(segundos, vista=self._vista(request), metodo=request.method)
+
+
+# -----------------------------------------------------------------
+# PERMISOS POR ROL EN TODA LA URLCONF DE GESTIÓN (ver permisos.py)
+# -----------------------------------------------------------------
+class PermisosMiddleware:
+    """
+    Verifica el permiso de cada vista de gestión antes de ejecutarla. Las
+    vistas sin @requiere_permiso exigen 'ver' (lectura) o 'registrar' (el
+    resto de los métodos). Los anónimos pasan: de ellos se encarga login_required.
+
+    Es sync y async: bajo ASGI usa la versión async de process_view, que lee
+    el usuario con request.auser() en vez de pasar por sync_to_async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._prefijo = None
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    @property
+    def prefijo(self):
+        # Se resuelve en la primera petición (las URLs no están cargadas al crear el middleware)
+        if self._prefijo is None:
+            from django.urls import reverse
+            self._prefijo = reverse('inicio_gestion')
+        return self._prefijo
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not request.path_info.startswith(self.prefijo) or not request.user.is_authenticated:
+            return None
+        if permiso_para(view_func, request.method) in permisos_de_peticion(request):
+            return None
+        return denegar(request, json=getattr(view_func, 'permiso_json', False))
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if not request.path_info.startswith(self.prefijo):
+            return None
+        usuario = await request.auser()
+        if not usuario.is_authenticated:
+            return None
+        if not hasattr(request, '_permisos'):
+            request._permisos = permisos_de(usuario)
+        if permiso_para(view_func, request.method) in request._permisos:
+            return None
+        return denegar(request, json=getattr(view_func, 'permiso_json', False))
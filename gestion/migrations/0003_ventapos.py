@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0002_bodega_alter_movimientoinventario_bodega'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaPOS',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_venta', models.CharField(max_length=100, unique=True, verbose_name='ID de Venta (caja)')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('respuesta', models.JSONField(blank=True, default=dict, verbose_name='Respuesta')),
+                ('bodega', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='gestion.bodega', verbose_name='Bodega')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Venta POS',
+                'verbose_name_plural': 'Ventas POS',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0003_ventapos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioCatalogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=20, verbose_name='Modelo')),
+                ('objeto_id', models.BigIntegerField(verbose_name='ID del Objeto')),
+                ('accion', models.CharField(choices=[('U', 'Guardado'), ('D', 'Eliminado')], max_length=1, verbose_name='Acción')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Cambio de Catálogo',
+                'verbose_name_plural': 'Cambios de Catálogo',
+                'indexes': [models.Index(fields=['modelo', 'objeto_id'], name='gestion_cam_modelo_e744a5_idx')],
+            },
+        ),
+    ]
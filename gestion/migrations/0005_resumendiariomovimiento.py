@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0001_initial'),
+        ('gestion', '0004_cambiocatalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiarioMovimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Día')),
+                ('tipo', models.CharField(choices=[('IN', 'Ingreso'), ('OUT', 'Salida'), ('AJ-P', 'Ajuste Positivo'), ('AJ-N', 'Ajuste Negativo'), ('DEV', 'Devolución')], max_length=4, verbose_name='Tipo de Movimiento')),
+                ('cantidad', models.PositiveBigIntegerField(default=0, verbose_name='Cantidad Total')),
+                ('movimientos', models.PositiveIntegerField(default=0, verbose_name='N° de Movimientos')),
+                ('bodega', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='gestion.bodega', verbose_name='Bodega')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='catalogo.producto')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Movimientos',
+                'verbose_name_plural': 'Resúmenes Diarios de Movimientos',
+                'indexes': [models.Index(fields=['fecha', 'tipo'], name='gestion_res_fecha_e497a5_idx')],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'producto', 'bodega', 'tipo'), name='resumen_diario_unico')],
+            },
+        ),
+    ]
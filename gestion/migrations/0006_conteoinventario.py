@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0001_initial'),
+        ('gestion', '0005_resumendiariomovimiento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConteoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descripcion', models.CharField(max_length=200, verbose_name='Descripción')),
+                ('estado', models.CharField(choices=[('ABIERTO', 'Abierto'), ('CONTABILIZADO', 'Contabilizado')], default='ABIERTO', max_length=15, verbose_name='Estado')),
+                ('fecha_creacion', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Creación')),
+                ('fecha_contabilizacion', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Contabilización')),
+                ('bodega', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='gestion.bodega', verbose_name='Bodega')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Conteo de Inventario',
+                'verbose_name_plural': 'Conteos de Inventario',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LineaConteo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lote', models.CharField(blank=True, default='', max_length=100, verbose_name='Lote')),
+                ('cantidad_contada', models.PositiveIntegerField(default=0, verbose_name='Cantidad Contada')),
+                ('cantidad_sistema', models.IntegerField(blank=True, null=True, verbose_name='Cantidad en Sistema')),
+                ('diferencia', models.IntegerField(blank=True, null=True, verbose_name='Diferencia')),
+                ('conteo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lineas', to='gestion.conteoinventario')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lineas_conteo', to='catalogo.producto')),
+            ],
+            options={
+                'verbose_name': 'Línea de Conteo',
+                'verbose_name_plural': 'Líneas de Conteo',
+                'constraints': [models.UniqueConstraint(fields=('conteo', 'producto', 'lote'), name='linea_conteo_unica')],
+            },
+        ),
+    ]
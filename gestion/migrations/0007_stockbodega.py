@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def cargar_saldos(apps, schema_editor):
+    # Saldo inicial de cada producto/bodega a partir del ledger existente
+    MovimientoInventario = apps.get_model('gestion', 'MovimientoInventario')
+    StockBodega = apps.get_model('gestion', 'StockBodega')
+    saldos = (
+        MovimientoInventario.objects.values('producto_id', 'bodega_id')
+        .annotate(saldo=models.Sum(models.Case(
+            models.When(tipo__in=['IN', 'AJ-P', 'DEV', 'TR-E'], then=models.F('cantidad')),
+            models.When(tipo__in=['OUT', 'AJ-N', 'TR-S'], then=-models.F('cantidad')),
+            default=0,
+            output_field=models.IntegerField(),
+        )))
+        .values_list('producto_id', 'bodega_id', 'saldo')
+    )
+    StockBodega.objects.bulk_create(
+        (StockBodega(producto_id=producto_id, bodega_id=bodega_id, cantidad=saldo or 0) for producto_id, bodega_id, saldo in saldos),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0001_initial'),
+        ('gestion', '0006_conteoinventario'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movimientoinventario',
+            name='tipo',
+            field=models.CharField(choices=[('IN', 'Ingreso'), ('OUT', 'Salida'), ('AJ-P', 'Ajuste Positivo'), ('AJ-N', 'Ajuste Negativo'), ('DEV', 'Devolución'), ('TR-S', 'Transferencia (salida)'), ('TR-E', 'Transferencia (entrada)')], max_length=4, verbose_name='Tipo de Movimiento'),
+        ),
+        migrations.AlterField(
+            model_name='resumendiariomovimiento',
+            name='tipo',
+            field=models.CharField(choices=[('IN', 'Ingreso'), ('OUT', 'Salida'), ('AJ-P', 'Ajuste Positivo'), ('AJ-N', 'Ajuste Negativo'), ('DEV', 'Devolución'), ('TR-S', 'Transferencia (salida)'), ('TR-E', 'Transferencia (entrada)')], max_length=4, verbose_name='Tipo de Movimiento'),
+        ),
+        migrations.CreateModel(
+            name='StockBodega',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Cantidad')),
+                ('bodega', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_productos', to='gestion.bodega')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_bodegas', to='catalogo.producto')),
+            ],
+            options={
+                'verbose_name': 'Stock por Bodega',
+                'verbose_name_plural': 'Stock por Bodega',
+                'constraints': [models.UniqueConstraint(fields=('producto', 'bodega'), name='stock_bodega_unico')],
+            },
+        ),
+        migrations.RunPython(cargar_saldos, migrations.RunPython.noop),
+    ]
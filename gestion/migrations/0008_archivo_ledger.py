@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0001_initial'),
+        ('gestion', '0007_stockbodega'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('IN', 'Ingreso'), ('OUT', 'Salida'), ('AJ-P', 'Ajuste Positivo'), ('AJ-N', 'Ajuste Negativo'), ('DEV', 'Devolución'), ('TR-S', 'Transferencia (salida)'), ('TR-E', 'Transferencia (entrada)')], max_length=4, verbose_name='Tipo de Movimiento')),
+                ('cantidad', models.PositiveIntegerField(verbose_name='Cantidad')),
+                ('fecha', models.DateTimeField(verbose_name='Fecha')),
+                ('lote', models.CharField(blank=True, max_length=100, null=True, verbose_name='Lote')),
+                ('serie', models.CharField(blank=True, max_length=100, null=True, verbose_name='Serie')),
+                ('fecha_vencimiento', models.DateField(blank=True, null=True, verbose_name='Fecha Vencimiento')),
+                ('doc_ref', models.CharField(blank=True, max_length=100, null=True, verbose_name='Doc. Referencia')),
+                ('motivo', models.CharField(blank=True, max_length=255, null=True, verbose_name='Motivo (ajustes/devoluciones)')),
+                ('observaciones', models.TextField(blank=True, null=True, verbose_name='Observaciones (notas de operación)')),
+            ],
+            options={
+                'verbose_name': 'Movimiento Archivado',
+                'verbose_name_plural': 'Movimientos Archivados',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoCierre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lote', models.CharField(blank=True, default='', max_length=100, verbose_name='Lote')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Cantidad')),
+                ('fecha_corte', models.DateTimeField(verbose_name='Fecha de Corte')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Cierre',
+                'verbose_name_plural': 'Saldos de Cierre',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['fecha'], name='gestion_mov_fecha_a27016_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['producto', 'fecha'], name='gestion_mov_product_30d90b_idx'),
+        ),
+        migrations.AddField(
+            model_name='movimientoarchivado',
+            name='bodega',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='gestion.bodega', verbose_name='Bodega'),
+        ),
+        migrations.AddField(
+            model_name='movimientoarchivado',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_archivados', to='catalogo.producto'),
+        ),
+        migrations.AddField(
+            model_name='movimientoarchivado',
+            name='proveedor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gestion.proveedor'),
+        ),
+        migrations.AddField(
+            model_name='saldocierre',
+            name='bodega',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gestion.bodega'),
+        ),
+        migrations.AddField(
+            model_name='saldocierre',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_cierre', to='catalogo.producto'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoarchivado',
+            index=models.Index(fields=['fecha'], name='gestion_mov_fecha_065c55_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='saldocierre',
+            constraint=models.UniqueConstraint(fields=('producto', 'bodega', 'lote'), name='saldo_cierre_unico'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0009_correopendiente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SesionActiva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_key', models.CharField(max_length=40, unique=True, verbose_name='Clave de Sesión')),
+                ('ip', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP')),
+                ('user_agent', models.CharField(blank=True, default='', max_length=255, verbose_name='Navegador')),
+                ('inicio', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Inicio')),
+                ('expira', models.DateTimeField(verbose_name='Expira')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sesiones', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Sesión Activa',
+                'verbose_name_plural': 'Sesiones Activas',
+                'indexes': [models.Index(fields=['usuario', 'expira'], name='gestion_ses_usuario_ffbef2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0010_sesionactiva'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proveedor',
+            name='activo',
+            field=models.BooleanField(default=True, verbose_name='Activo'),
+        ),
+        migrations.AddField(
+            model_name='proveedor',
+            name='fecha_baja',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Baja'),
+        ),
+    ]
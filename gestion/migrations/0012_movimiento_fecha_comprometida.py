@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0011_proveedor_activo_proveedor_fecha_baja'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientoarchivado',
+            name='fecha_comprometida',
+            field=models.DateField(blank=True, null=True, verbose_name='Fecha Comprometida'),
+        ),
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='fecha_comprometida',
+            field=models.DateField(blank=True, null=True, verbose_name='Fecha Comprometida'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0012_movimiento_fecha_comprometida'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientoarchivado',
+            name='cantidad_documento',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Cantidad en el Documento'),
+        ),
+        migrations.AddField(
+            model_name='movimientoarchivado',
+            name='unidad',
+            field=models.CharField(blank=True, default='', max_length=50, verbose_name='Unidad del Documento'),
+        ),
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='cantidad_documento',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Cantidad en el Documento'),
+        ),
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='unidad',
+            field=models.CharField(blank=True, default='', max_length=50, verbose_name='Unidad del Documento'),
+        ),
+    ]
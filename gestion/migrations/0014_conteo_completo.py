@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0013_movimiento_unidad'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conteoinventario',
+            name='completo',
+            field=models.BooleanField(default=False, help_text='Al contabilizar, todo lo que tenga saldo en la bodega y no se haya contado se ajusta a cero.', verbose_name='Conteo completo'),
+        ),
+    ]
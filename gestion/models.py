@@ -1,11 +1,15 @@
 # En: gestion/models.py
 
+from collections import defaultdict
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser # <-- AÑADE ESTA IMPORTACIÓN
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.dispatch import Signal
 from django.utils import timezone
-from catalogo.models import Producto
-from rutificador import Rut
+from catalogo.models import Producto, ActivosManager, BajaLogicaMixin
+from .unidades import normalizar as normalizar_unidades
 # -----------------------------------------------------------------
 # 1. MODELO DE USUARIO PERSONALIZADO
 # -----------------------------------------------------------------
@@ -36,8 +40,7 @@ class CustomUser(AbstractUser):
     mfa_habilitado = models.BooleanField(default=False, verbose_name="MFA Habilitado")
     
     # 'ultimo_acceso' (last_login) ya viene en AbstractUser
-    # 'sesiones_activas' es un campo muy complejo de implementar (requiere un backend de sesiones),
-    # por ahora lo omitimos del modelo y lo mostraremos "falso" en el template.
+    # 'sesiones_activas' se lleva en SesionActiva (related_name 'sesiones', ver autenticacion.py)
 
     def __str__(self):
         return self.username
@@ -45,7 +48,7 @@ class CustomUser(AbstractUser):
 # -----------------------------------------------------------------
 # 2. MODELO PROVEEDOR
 # -----------------------------------------------------------------
-class Proveedor(models.Model):
+class Proveedor(BajaLogicaMixin, models.Model):
     # --- 1. Identificación y Contacto ---
     rut_nif = models.CharField(max_length=20, unique=True, verbose_name="RUT/NIF")
     razon_social = models.CharField(max_length=255, verbose_name="Razón Social")
@@ -76,6 +79,13 @@ class Proveedor(models.Model):
     
     # Podrías añadir campos para "certificaciones", "acuerdos", etc. aquí si fuera necesario.
 
+    # --- 4. Baja lógica (ver catalogo.models.ActivosManager) ---
+    activo = models.BooleanField(default=True, verbose_name="Activo")
+    fecha_baja = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de Baja")
+
+    objects = ActivosManager()
+    todos = models.Manager()
+
     def __str__(self):
         return f"{self.razon_social} ({self.rut_nif})"
 
@@ -94,6 +104,13 @@ class Bodega(models.Model):
 # -----------------------------------------------------------------
 #  MODELO MOVIMIENTO INVENTARIO
 # -----------------------------------------------------------------
+
+# Se emite (después del commit) cada vez que se registran movimientos, ya sea
+# uno a uno con save() o en bloque con movimientos.registrar_movimientos().
+# Argumentos: movimientos (lista) y saldos ({producto_id: stock_actual}).
+# Ojo: el stock se actualiza con UPDATE directo, no pasa por post_save de Producto.
+movimientos_registrados = Signal()
+
 class MovimientoInventario(models.Model):
     
     class TipoMovimiento(models.TextChoices):
@@ -102,12 +119,19 @@ class MovimientoInventario(models.Model):
         AJUSTE_POS = 'AJ-P', 'Ajuste Positivo'
         AJUSTE_NEG = 'AJ-N', 'Ajuste Negativo'
         DEVOLUCION = 'DEV', 'Devolución'
+        TRANSFERENCIA_SALIDA = 'TR-S', 'Transferencia (salida)'
+        TRANSFERENCIA_ENTRADA = 'TR-E', 'Transferencia (entrada)'
 
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="movimientos")
     proveedor = models.ForeignKey(Proveedor, on_delete=models.SET_NULL, null=True, blank=True)
     
     tipo = models.CharField(max_length=4, choices=TipoMovimiento.choices, verbose_name="Tipo de Movimiento")
+    # Siempre en la unidad de stock (uom_venta del producto). Si el documento
+    # viene en otra unidad (ej: 10 CAJA), al registrarlo se convierte con
+    # factor_conversion y lo original queda en unidad/cantidad_documento.
     cantidad = models.PositiveIntegerField(verbose_name="Cantidad")
+    unidad = models.CharField(max_length=50, blank=True, default='', verbose_name="Unidad del Documento")
+    cantidad_documento = models.PositiveIntegerField(blank=True, null=True, verbose_name="Cantidad en el Documento")
     
     fecha = models.DateTimeField(default=timezone.now, verbose_name="Fecha")
 
@@ -120,23 +144,68 @@ class MovimientoInventario(models.Model):
 
     # --- Campos de la Pestaña 3 ---
     doc_ref = models.CharField(max_length=100, blank=True, null=True, verbose_name="Doc. Referencia")
+    # Fecha que el proveedor comprometió para la entrega (ingresos): base del % a tiempo, ver proveedores.py
+    fecha_comprometida = models.DateField(blank=True, null=True, verbose_name="Fecha Comprometida")
     motivo = models.CharField(max_length=255, blank=True, null=True, verbose_name="Motivo (ajustes/devoluciones)") # <-- NUEVO CAMPO
     observaciones = models.TextField(blank=True, null=True, verbose_name="Observaciones (notas de operación)")
 
-    # --- Lógica de Stock (Sin cambios) ---
+    TIPOS_ENTRADA = [TipoMovimiento.INGRESO, TipoMovimiento.AJUSTE_POS, TipoMovimiento.DEVOLUCION]
+    TIPOS_SALIDA = [TipoMovimiento.SALIDA, TipoMovimiento.AJUSTE_NEG]
+    # Las transferencias mueven stock entre bodegas: no cambian el stock global
+    TIPOS_TRANSFERENCIA = [TipoMovimiento.TRANSFERENCIA_SALIDA, TipoMovimiento.TRANSFERENCIA_ENTRADA]
+
+    @property
+    def delta_stock(self):
+        # Efecto (con signo) del movimiento sobre Producto.stock_actual
+        if self.tipo in self.TIPOS_ENTRADA:
+            return self.cantidad
+        if self.tipo in self.TIPOS_SALIDA:
+            return -self.cantidad
+        return 0
+
+    @property
+    def delta_bodega(self):
+        # Efecto (con signo) sobre el saldo de su bodega (StockBodega)
+        if self.tipo == self.TipoMovimiento.TRANSFERENCIA_ENTRADA:
+            return self.cantidad
+        if self.tipo == self.TipoMovimiento.TRANSFERENCIA_SALIDA:
+            return -self.cantidad
+        return self.delta_stock
+
+    # --- Lógica de Stock ---
     def save(self, *args, **kwargs):
-        # ... (tu lógica de save() sin cambios) ...
         es_nuevo = self.pk is None 
-        producto = self.producto
-        if es_nuevo:
-            if self.tipo in [self.TipoMovimiento.INGRESO, self.TipoMovimiento.AJUSTE_POS, self.TipoMovimiento.DEVOLUCION]:
-                producto.stock_actual += self.cantidad
-            elif self.tipo in [self.TipoMovimiento.SALIDA, self.TipoMovimiento.AJUSTE_NEG]:
-                if producto.stock_actual < self.cantidad:
-                    raise ValidationError(f"Stock insuficiente. Stock actual: {producto.stock_actual}, se intentó sacar: {self.cantidad}")
-                producto.stock_actual -= self.cantidad
-            producto.save(update_fields=['stock_actual']) 
-        super().save(*args, **kwargs) 
+        if not es_nuevo:
+            return super().save(*args, **kwargs)
+
+        if self.unidad and self.cantidad_documento is None:
+            # Documento en otra unidad (ej: CAJA): se pasa a la unidad de stock
+            normalizar_unidades([self], {self.producto_id: (
+                self.producto.uom_compra, self.producto.uom_venta, self.producto.factor_conversion,
+            )})
+
+        # El stock se modifica con un UPDATE atómico (F) en vez de leer,
+        # sumar en Python y guardar: con varias cajas/bodegas posteando a la
+        # vez, el read-modify-write perdía actualizaciones.
+        delta = self.delta_stock
+        with transaction.atomic():
+            rebajas = StockBodega.reservar_salidas([self])
+            productos = Producto.todos.filter(pk=self.producto_id)
+            if delta < 0:
+                productos = productos.filter(stock_actual__gte=-delta)
+            if delta and not productos.update(stock_actual=models.F('stock_actual') + delta):
+                stock = Producto.todos.filter(pk=self.producto_id).values_list('stock_actual', flat=True).first()
+                raise ValidationError(f"Stock insuficiente. Stock actual: {stock}, se intentó sacar: {self.cantidad}")
+            self.producto.refresh_from_db(fields=['stock_actual'])
+            super().save(*args, **kwargs) 
+            StockBodega.aplicar([self])
+            StockBodega.verificar(rebajas)
+            ResumenDiarioMovimiento.acumular([self])
+
+        saldos = {self.producto_id: self.producto.stock_actual}
+        transaction.on_commit(
+            lambda: movimientos_registrados.send(sender=MovimientoInventario, movimientos=[self], saldos=saldos)
+        )
 
     def __str__(self):
         return f"[{self.fecha.strftime('%Y-%m-%d')}] {self.get_tipo_display()}: {self.cantidad} x {self.producto.sku}"
@@ -144,4 +213,348 @@ class MovimientoInventario(models.Model):
     class Meta:
         verbose_name = "Movimiento de Inventario"
         verbose_name_plural = "Movimientos de Inventario"
-        ordering = ['-fecha']
\ No newline at end of file
+        ordering = ['-fecha']
+        # Listados, búsquedas y exportaciones ordenan/filtran por fecha
+        indexes = [
+            models.Index(fields=['fecha']),
+            models.Index(fields=['producto', 'fecha']),
+        ]
+
+
+# -----------------------------------------------------------------
+#  MODELOS DE ARCHIVO DEL LEDGER (períodos cerrados)
+# -----------------------------------------------------------------
+class MovimientoArchivado(models.Model):
+    # Copia fiel (mismo id) de un MovimientoInventario de un período cerrado.
+    # Se llena con: manage.py archivar_movimientos (ver archivo.py)
+    id = models.BigIntegerField(primary_key=True)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="movimientos_archivados")
+    proveedor = models.ForeignKey(Proveedor, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    tipo = models.CharField(max_length=4, choices=MovimientoInventario.TipoMovimiento.choices, verbose_name="Tipo de Movimiento")
+    cantidad = models.PositiveIntegerField(verbose_name="Cantidad")
+    unidad = models.CharField(max_length=50, blank=True, default='', verbose_name="Unidad del Documento")
+    cantidad_documento = models.PositiveIntegerField(blank=True, null=True, verbose_name="Cantidad en el Documento")
+    fecha = models.DateTimeField(verbose_name="Fecha")
+    bodega = models.ForeignKey(Bodega, on_delete=models.PROTECT, related_name="+", verbose_name="Bodega")
+    lote = models.CharField(max_length=100, blank=True, null=True, verbose_name="Lote")
+    serie = models.CharField(max_length=100, blank=True, null=True, verbose_name="Serie")
+    fecha_vencimiento = models.DateField(blank=True, null=True, verbose_name="Fecha Vencimiento")
+    doc_ref = models.CharField(max_length=100, blank=True, null=True, verbose_name="Doc. Referencia")
+    fecha_comprometida = models.DateField(blank=True, null=True, verbose_name="Fecha Comprometida")
+    motivo = models.CharField(max_length=255, blank=True, null=True, verbose_name="Motivo (ajustes/devoluciones)")
+    observaciones = models.TextField(blank=True, null=True, verbose_name="Observaciones (notas de operación)")
+
+    def __str__(self):
+        return f"[{self.fecha.strftime('%Y-%m-%d')}] {self.get_tipo_display()}: {self.cantidad} (archivado)"
+
+    class Meta:
+        verbose_name = "Movimiento Archivado"
+        verbose_name_plural = "Movimientos Archivados"
+        ordering = ['-fecha']
+        indexes = [models.Index(fields=['fecha'])]
+
+
+class SaldoCierre(models.Model):
+    # Saldo acumulado (con transferencias) de todo lo archivado por producto/bodega/lote.
+    # Saldo real = SaldoCierre + movimientos vivos posteriores a fecha_corte.
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="saldos_cierre")
+    bodega = models.ForeignKey(Bodega, on_delete=models.CASCADE, related_name="+")
+    lote = models.CharField(max_length=100, blank=True, default='', verbose_name="Lote")
+    cantidad = models.IntegerField(default=0, verbose_name="Cantidad")
+    fecha_corte = models.DateTimeField(verbose_name="Fecha de Corte")
+
+    def __str__(self):
+        return f"{self.producto_id}/{self.bodega_id} lote '{self.lote}' al {self.fecha_corte:%Y-%m-%d}: {self.cantidad}"
+
+    class Meta:
+        verbose_name = "Saldo de Cierre"
+        verbose_name_plural = "Saldos de Cierre"
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'bodega', 'lote'], name='saldo_cierre_unico'),
+        ]
+
+
+# -----------------------------------------------------------------
+#  MODELO RESUMEN DIARIO (rollup de movimientos para el dashboard)
+# -----------------------------------------------------------------
+class ResumenDiarioMovimiento(models.Model):
+    # Una fila por (día, producto, bodega, tipo). Se mantiene al registrar cada
+    # movimiento (misma transacción) y se reconstruye con: manage.py reconstruir_resumenes
+    fecha = models.DateField(verbose_name="Día")
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="resumenes_diarios")
+    bodega = models.ForeignKey(Bodega, on_delete=models.CASCADE, verbose_name="Bodega")
+    tipo = models.CharField(max_length=4, choices=MovimientoInventario.TipoMovimiento.choices, verbose_name="Tipo de Movimiento")
+    cantidad = models.PositiveBigIntegerField(default=0, verbose_name="Cantidad Total")
+    movimientos = models.PositiveIntegerField(default=0, verbose_name="N° de Movimientos")
+
+    @classmethod
+    def acumular(cls, movimientos):
+        """Suma una tanda de movimientos a sus filas de resumen (una consulta por fila afectada)."""
+        acumulado = {}
+        for movimiento in movimientos:
+            clave = (timezone.localdate(movimiento.fecha), movimiento.producto_id, movimiento.bodega_id, movimiento.tipo)
+            cantidad, veces = acumulado.get(clave, (0, 0))
+            acumulado[clave] = (cantidad + movimiento.cantidad, veces + 1)
+
+        for (fecha, producto_id, bodega_id, tipo), (cantidad, veces) in acumulado.items():
+            filtro = cls.objects.filter(fecha=fecha, producto_id=producto_id, bodega_id=bodega_id, tipo=tipo)
+            if filtro.update(cantidad=models.F('cantidad') + cantidad, movimientos=models.F('movimientos') + veces):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        fecha=fecha, producto_id=producto_id, bodega_id=bodega_id, tipo=tipo,
+                        cantidad=cantidad, movimientos=veces,
+                    )
+            except IntegrityError:
+                # Otro proceso creó la fila entre medio
+                filtro.update(cantidad=models.F('cantidad') + cantidad, movimientos=models.F('movimientos') + veces)
+
+    def __str__(self):
+        return f"{self.fecha} {self.producto_id}/{self.bodega_id} {self.tipo}: {self.cantidad}"
+
+    class Meta:
+        verbose_name = "Resumen Diario de Movimientos"
+        verbose_name_plural = "Resúmenes Diarios de Movimientos"
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'producto', 'bodega', 'tipo'], name='resumen_diario_unico'),
+        ]
+        indexes = [models.Index(fields=['fecha', 'tipo'])]
+
+
+# -----------------------------------------------------------------
+#  MODELO STOCK POR BODEGA
+# -----------------------------------------------------------------
+class StockBodega(models.Model):
+    # Saldo de cada producto en cada bodega. Producto.stock_actual sigue siendo
+    # el total; la suma de StockBodega de un producto debe coincidir con él.
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="stock_bodegas")
+    bodega = models.ForeignKey(Bodega, on_delete=models.CASCADE, related_name="stock_productos")
+    # Con signo: los datos antiguos registraban salidas sin validar la bodega
+    cantidad = models.IntegerField(default=0, verbose_name="Cantidad")
+
+    @classmethod
+    def aplicar(cls, movimientos):
+        """Suma el efecto de una tanda de movimientos a los saldos por bodega (1 + una consulta por bodega)."""
+        deltas = defaultdict(dict)
+        for movimiento in movimientos:
+            if movimiento.delta_bodega:
+                por_producto = deltas[movimiento.bodega_id]
+                por_producto[movimiento.producto_id] = por_producto.get(movimiento.producto_id, 0) + movimiento.delta_bodega
+        if not deltas:
+            return
+        # Asegura que existan las filas (sin pisar las existentes) y luego un UPDATE relativo por bodega
+        cls.objects.bulk_create(
+            [cls(producto_id=producto_id, bodega_id=bodega_id) for bodega_id, por_producto in deltas.items() for producto_id in por_producto],
+            ignore_conflicts=True,
+        )
+        for bodega_id, por_producto in deltas.items():
+            cls.objects.filter(bodega_id=bodega_id, producto_id__in=por_producto).update(
+                cantidad=models.Case(
+                    *[models.When(producto_id=pk, then=models.F('cantidad') + delta) for pk, delta in por_producto.items()]
+                )
+            )
+
+    @classmethod
+    def reservar_salidas(cls, movimientos):
+        """
+        Bloquea (FOR UPDATE) los saldos que la tanda rebaja y la rechaza si
+        alguno queda negativo. Devuelve {(bodega_id, producto_id): delta} de
+        esas rebajas, para verificar() después de aplicar().
+        """
+        netos = defaultdict(int)
+        for movimiento in movimientos:
+            if movimiento.delta_bodega:
+                netos[(movimiento.bodega_id, movimiento.producto_id)] += movimiento.delta_bodega
+        rebajas = {par: delta for par, delta in netos.items() if delta < 0}
+        if not rebajas:
+            return rebajas
+        saldos = {
+            (bodega_id, producto_id): cantidad
+            for bodega_id, producto_id, cantidad in
+            cls.objects.select_for_update()
+            .filter(bodega_id__in={b for b, _ in rebajas}, producto_id__in={p for _, p in rebajas})
+            .values_list('bodega_id', 'producto_id', 'cantidad')
+        }
+        insuficientes = [par for par, delta in rebajas.items() if saldos.get(par, 0) + delta < 0]
+        if insuficientes:
+            detalle = ", ".join(
+                f"id {producto_id} en bodega {bodega_id}: saldo {saldos.get((bodega_id, producto_id), 0)}, "
+                f"se intentó sacar {-rebajas[(bodega_id, producto_id)]}"
+                for bodega_id, producto_id in insuficientes
+            )
+            raise ValidationError(f"Stock insuficiente en la bodega. {detalle}")
+        return rebajas
+
+    @classmethod
+    def verificar(cls, rebajas):
+        # Sin FOR UPDATE (SQLite) otra operación pudo adelantarse: se revisa
+        # después del UPDATE relativo y se revierte la transacción si hace falta
+        if not rebajas:
+            return
+        negativos = (
+            cls.objects
+            .filter(bodega_id__in={b for b, _ in rebajas}, producto_id__in={p for _, p in rebajas}, cantidad__lt=0)
+            .values_list('bodega_id', 'producto_id')
+        )
+        if any(par in rebajas for par in negativos):
+            raise ValidationError("Stock insuficiente en la bodega (modificado por otra operación).")
+
+    def __str__(self):
+        return f"{self.producto_id} en {self.bodega_id}: {self.cantidad}"
+
+    class Meta:
+        verbose_name = "Stock por Bodega"
+        verbose_name_plural = "Stock por Bodega"
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'bodega'], name='stock_bodega_unico'),
+        ]
+
+
+# -----------------------------------------------------------------
+#  MODELO VENTA POS (idempotencia de ventas desde caja)
+# -----------------------------------------------------------------
+class VentaPOS(models.Model):
+    # Identificador que entrega la caja; un reintento con el mismo id no vuelve a descontar stock
+    id_venta = models.CharField(max_length=100, unique=True, verbose_name="ID de Venta (caja)")
+    bodega = models.ForeignKey(Bodega, on_delete=models.PROTECT, verbose_name="Bodega")
+    usuario = models.ForeignKey('CustomUser', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Usuario")
+    fecha = models.DateTimeField(default=timezone.now, verbose_name="Fecha")
+    # Respuesta original, se devuelve tal cual ante un reintento
+    respuesta = models.JSONField(default=dict, blank=True, verbose_name="Respuesta")
+
+    def __str__(self):
+        return f"Venta {self.id_venta} ({self.fecha.strftime('%Y-%m-%d %H:%M')})"
+
+    class Meta:
+        verbose_name = "Venta POS"
+        verbose_name_plural = "Ventas POS"
+        ordering = ['-fecha']
+
+
+# -----------------------------------------------------------------
+#  MODELO CAMBIO CATÁLOGO (feed de sincronización para handhelds)
+# -----------------------------------------------------------------
+class CambioCatalogo(models.Model):
+    # El id autoincremental es el cursor monótono que usan los dispositivos (?since=<id>)
+
+    class Acciones(models.TextChoices):
+        GUARDADO = 'U', 'Guardado'
+        ELIMINADO = 'D', 'Eliminado'
+
+    modelo = models.CharField(max_length=20, verbose_name="Modelo")
+    objeto_id = models.BigIntegerField(verbose_name="ID del Objeto")
+    accion = models.CharField(max_length=1, choices=Acciones.choices, verbose_name="Acción")
+    fecha = models.DateTimeField(default=timezone.now, verbose_name="Fecha")
+
+    def __str__(self):
+        return f"#{self.pk} {self.get_accion_display()} {self.modelo}:{self.objeto_id}"
+
+    class Meta:
+        verbose_name = "Cambio de Catálogo"
+        verbose_name_plural = "Cambios de Catálogo"
+        indexes = [models.Index(fields=['modelo', 'objeto_id'])]
+
+
+# -----------------------------------------------------------------
+#  MODELOS DE CONTEO FÍSICO (toma de inventario)
+# -----------------------------------------------------------------
+class ConteoInventario(models.Model):
+
+    class Estados(models.TextChoices):
+        ABIERTO = 'ABIERTO', 'Abierto'
+        CONTABILIZADO = 'CONTABILIZADO', 'Contabilizado'
+
+    descripcion = models.CharField(max_length=200, verbose_name="Descripción")
+    bodega = models.ForeignKey(Bodega, on_delete=models.PROTECT, verbose_name="Bodega")
+    usuario = models.ForeignKey('CustomUser', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Usuario")
+    estado = models.CharField(max_length=15, choices=Estados.choices, default=Estados.ABIERTO, verbose_name="Estado")
+    # Completo: lo que tiene saldo en la bodega y no se contó queda en cero.
+    # Parcial (por defecto, conteo cíclico): solo se ajusta lo contado.
+    completo = models.BooleanField(
+        default=False, verbose_name="Conteo completo",
+        help_text="Al contabilizar, todo lo que tenga saldo en la bodega y no se haya contado se ajusta a cero.",
+    )
+    fecha_creacion = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Creación")
+    fecha_contabilizacion = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de Contabilización")
+
+    def __str__(self):
+        return f"Conteo #{self.pk} {self.descripcion} ({self.bodega})"
+
+    class Meta:
+        verbose_name = "Conteo de Inventario"
+        verbose_name_plural = "Conteos de Inventario"
+        ordering = ['-fecha_creacion']
+
+
+class LineaConteo(models.Model):
+    # Lote '' = sin lote (así la restricción única funciona igual en todos los motores)
+    conteo = models.ForeignKey(ConteoInventario, on_delete=models.CASCADE, related_name="lineas")
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="lineas_conteo")
+    lote = models.CharField(max_length=100, blank=True, default='', verbose_name="Lote")
+    cantidad_contada = models.PositiveIntegerField(default=0, verbose_name="Cantidad Contada")
+    # Se llenan al calcular diferencias (saldo del ledger en la bodega/lote)
+    cantidad_sistema = models.IntegerField(blank=True, null=True, verbose_name="Cantidad en Sistema")
+    diferencia = models.IntegerField(blank=True, null=True, verbose_name="Diferencia")
+
+    def __str__(self):
+        return f"{self.producto_id} lote '{self.lote}': {self.cantidad_contada}"
+
+    class Meta:
+        verbose_name = "Línea de Conteo"
+        verbose_name_plural = "Líneas de Conteo"
+        constraints = [
+            models.UniqueConstraint(fields=['conteo', 'producto', 'lote'], name='linea_conteo_unica'),
+        ]
+
+
+# -----------------------------------------------------------------
+#  MODELO COLA DE CORREOS SALIENTES
+# -----------------------------------------------------------------
+class CorreoPendiente(models.Model):
+    # Se encola en la petición y lo envía: manage.py procesar_correos (ver correo.py).
+    # Los enviados se eliminan y los FALLIDO quedan sin cuerpo: puede traer claves temporales.
+
+    class Estados(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        FALLIDO = 'FALLIDO', 'Fallido'
+
+    asunto = models.CharField(max_length=255, verbose_name="Asunto")
+    cuerpo = models.TextField(verbose_name="Cuerpo")
+    remitente = models.CharField(max_length=255, verbose_name="Remitente")
+    destinatarios = models.JSONField(default=list, verbose_name="Destinatarios")
+    estado = models.CharField(max_length=10, choices=Estados.choices, default=Estados.PENDIENTE, verbose_name="Estado")
+    intentos = models.PositiveIntegerField(default=0, verbose_name="Intentos")
+    proximo_intento = models.DateTimeField(default=timezone.now, verbose_name="Próximo Intento")
+    reservado_por = models.CharField(max_length=50, blank=True, default='', verbose_name="Reservado por")
+    ultimo_error = models.TextField(blank=True, default='', verbose_name="Último Error")
+    fecha_creacion = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Creación")
+
+    def __str__(self):
+        return f"{self.asunto} -> {', '.join(self.destinatarios)} ({self.get_estado_display()})"
+
+    class Meta:
+        verbose_name = "Correo Pendiente"
+        verbose_name_plural = "Correos Pendientes"
+        indexes = [models.Index(fields=['estado', 'proximo_intento'])]
+
+
+# -----------------------------------------------------------------
+#  MODELO SESIONES ACTIVAS POR USUARIO
+# -----------------------------------------------------------------
+class SesionActiva(models.Model):
+    # Se escribe al iniciar y cerrar sesión (ver autenticacion.py), no por petición
+    session_key = models.CharField(max_length=40, unique=True, verbose_name="Clave de Sesión")
+    usuario = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='sesiones', verbose_name="Usuario")
+    ip = models.GenericIPAddressField(blank=True, null=True, verbose_name="IP")
+    user_agent = models.CharField(max_length=255, blank=True, default='', verbose_name="Navegador")
+    inicio = models.DateTimeField(default=timezone.now, verbose_name="Inicio")
+    expira = models.DateTimeField(verbose_name="Expira")
+
+    def __str__(self):
+        return f"{self.usuario} desde {self.ip or '?'} ({self.inicio:%Y-%m-%d %H:%M})"
+
+    class Meta:
+        verbose_name = "Sesión Activa"
+        verbose_name_plural = "Sesiones Activas"
+        indexes = [models.Index(fields=['usuario', 'expira'])]
@@ -0,0 +1,100 @@
+# En: gestion/movimientos.py
+
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, When, F, IntegerField
+
+from catalogo.models import Producto
+from .models import MovimientoInventario, ResumenDiarioMovimiento, StockBodega, movimientos_registrados
+from .unidades import normalizar
+
+
+def cantidad_con_signo(por_bodega=False):
+    # Expresión SQL con el mismo criterio que delta_stock: Sum(cantidad_con_signo()) = saldo del ledger.
+    # Con por_bodega=True usa el de delta_bodega (cuenta también las transferencias).
+    entradas = list(MovimientoInventario.TIPOS_ENTRADA)
+    salidas = list(MovimientoInventario.TIPOS_SALIDA)
+    if por_bodega:
+        entradas.append(MovimientoInventario.TipoMovimiento.TRANSFERENCIA_ENTRADA)
+        salidas.append(MovimientoInventario.TipoMovimiento.TRANSFERENCIA_SALIDA)
+    return Case(
+        When(tipo__in=entradas, then=F('cantidad')),
+        When(tipo__in=salidas, then=-F('cantidad')),
+        default=0,
+        output_field=IntegerField(),
+    )
+
+
+# -----------------------------------------------------------------
+# REGISTRO DE MOVIMIENTOS EN BLOQUE
+# -----------------------------------------------------------------
+# Equivalente a llamar MovimientoInventario.save() por cada línea, pero con
+# un número fijo de consultas sin importar cuántas líneas traiga el documento:
+#   1. SELECT ... FOR UPDATE de los productos involucrados (valida stock y
+#      trae las unidades: las líneas en unidad de compra se convierten aquí)
+#      y de los saldos por bodega que se rebajan (valida cada bodega)
+#   2. INSERT masivo de los movimientos
+#   3. UPDATE único de stock_actual con CASE por producto (+ lectura del saldo final)
+#   4. Saldos por bodega (StockBodega, una consulta por bodega)
+#   5. Acumulado en los resúmenes diarios (una consulta por día/producto/bodega/tipo)
+
+def registrar_movimientos(movimientos):
+    """
+    Registra una lista de MovimientoInventario (sin guardar) en una sola
+    transacción. Las líneas con `unidad` se pasan a la unidad de stock (ver
+    unidades.py). Si alguna salida deja stock negativo, global o en su
+    bodega, no se registra nada.
+    Devuelve {producto_id: stock_actual nuevo}.
+    """
+    # Producto.todos: un producto dado de baja igual mantiene su stock al día
+    with transaction.atomic():
+        stocks, unidades = {}, {}
+        for pk, stock, uom_compra, uom_venta, factor in (
+            Producto.todos.select_for_update()
+            .filter(pk__in={movimiento.producto_id for movimiento in movimientos})
+            .values_list('pk', 'stock_actual', 'uom_compra', 'uom_venta', 'factor_conversion')
+        ):
+            stocks[pk] = stock
+            unidades[pk] = (uom_compra, uom_venta, factor)
+
+        no_existen = sorted({movimiento.producto_id for movimiento in movimientos} - stocks.keys())
+        if no_existen:
+            raise ValidationError(f"Productos inexistentes: {no_existen}")
+
+        normalizar(movimientos, unidades)
+        deltas = defaultdict(int)
+        for movimiento in movimientos:
+            deltas[movimiento.producto_id] += movimiento.delta_stock
+
+        saldos = {pk: stocks[pk] + delta for pk, delta in deltas.items()}
+        insuficientes = [pk for pk, saldo in saldos.items() if saldo < 0]
+        if insuficientes:
+            detalle = ", ".join(
+                f"id {pk}: stock {stocks[pk]}, se intentó sacar {-deltas[pk]}" for pk in insuficientes
+            )
+            raise ValidationError(f"Stock insuficiente. {detalle}")
+        rebajas = StockBodega.reservar_salidas(movimientos)
+
+        MovimientoInventario.objects.bulk_create(movimientos)
+
+        # Incremento relativo (F) y no el valor calculado: aunque el motor no
+        # soporte FOR UPDATE (SQLite), no se pisan escrituras concurrentes.
+        # Un saldo negativo lo rechaza la BD (stock_actual es positivo).
+        cambios = {pk: delta for pk, delta in deltas.items() if delta}
+        if cambios:
+            Producto.todos.filter(pk__in=cambios).update(
+                stock_actual=Case(*[When(pk=pk, then=F('stock_actual') + delta) for pk, delta in cambios.items()])
+            )
+            saldos.update(Producto.todos.filter(pk__in=cambios).values_list('pk', 'stock_actual'))
+
+        StockBodega.aplicar(movimientos)
+        StockBodega.verificar(rebajas)
+        ResumenDiarioMovimiento.acumular(movimientos)
+
+        transaction.on_commit(
+            lambda: movimientos_registrados.send(sender=MovimientoInventario, movimientos=movimientos, saldos=saldos)
+        )
+
+    return saldos
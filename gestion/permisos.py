@@ -0,0 +1,111 @@
+# En: gestion/permisos.py
+
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib import messages
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.utils.functional import SimpleLazyObject
+
+from .models import CustomUser
+
+# -----------------------------------------------------------------
+# PERMISOS POR ROL
+# -----------------------------------------------------------------
+# Un permiso por tipo de acción (no por vista):
+#   ver          páginas y consultas de gestión (GET)
+#   registrar    cualquier escritura: movimientos, ventas, transferencias,
+#                altas/ediciones/eliminaciones del catálogo
+#   exportar     descargas a Excel
+#   administrar  usuarios, bodegas, conteos físicos y snapshots
+#
+# PermisosMiddleware cubre TODA la URLconf de gestión: si la vista no declara
+# un permiso con @requiere_permiso, exige 'ver' para GET/HEAD y 'registrar'
+# para el resto. Así el AUDITOR queda en solo lectura sin marcar vista por vista.
+#
+# Los permisos efectivos se resuelven una vez por petición (permisos_de_peticion)
+# directamente desde esta tabla: es un lookup en memoria, sin caché ni BD.
+
+VER = 'ver'
+REGISTRAR = 'registrar'
+EXPORTAR = 'exportar'
+ADMINISTRAR = 'administrar'
+
+PERMISOS_POR_ROL = {
+    CustomUser.Roles.ROOT: {VER, REGISTRAR, EXPORTAR, ADMINISTRAR},
+    CustomUser.Roles.ADMIN: {VER, REGISTRAR, EXPORTAR, ADMINISTRAR},
+    CustomUser.Roles.OPERADOR: {VER, REGISTRAR, EXPORTAR},
+    CustomUser.Roles.AUDITOR: {VER, EXPORTAR},
+}
+
+METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _calcular(rol, estado):
+    # Solo los usuarios ACTIVO tienen permisos (BLOQUEADO ni siquiera entra, ver autenticacion.py)
+    if estado != CustomUser.Estados.ACTIVO:
+        return frozenset()
+    return frozenset(PERMISOS_POR_ROL.get(rol, ()))
+
+
+def permisos_de(usuario):
+    """Permisos efectivos del usuario según su rol y estado."""
+    if not usuario.is_authenticated:
+        return frozenset()
+    return _calcular(usuario.rol, usuario.estado)
+
+
+def permisos_de_peticion(request):
+    # Una sola resolución por petición
+    if not hasattr(request, '_permisos'):
+        request._permisos = permisos_de(request.user)
+    return request._permisos
+
+
+def permiso_para(view_func, metodo):
+    """Permiso que exige la vista: el declarado o el que corresponde al método HTTP."""
+    return getattr(view_func, 'permiso', None) or (VER if metodo in METODOS_LECTURA else REGISTRAR)
+
+
+def denegar(request, json=False):
+    if json:
+        return JsonResponse({'error': 'Acceso denegado.'}, status=403)
+    if VER not in permisos_de_peticion(request):
+        # Sin 'ver' no hay a dónde redirigir (inicio también lo exige)
+        raise PermissionDenied
+    messages.error(request, "No tienes permisos para esta acción.")
+    return redirect('inicio_gestion')
+
+
+def requiere_permiso(permiso, json=False):
+    """
+    Declara el permiso de una vista. En vistas síncronas además lo verifica
+    (por si se usan fuera de la URLconf de gestión); en las async lo verifica
+    el middleware, que corre antes.
+    """
+    def decorador(view_func):
+        if iscoroutinefunction(view_func):
+            vista = view_func
+        else:
+            @wraps(view_func)
+            def vista(request, *args, **kwargs):
+                if permiso not in permisos_de_peticion(request):
+                    return denegar(request, json)
+                return view_func(request, *args, **kwargs)
+        vista.permiso = permiso
+        vista.permiso_json = json
+        return vista
+    return decorador
+
+
+def permisos(request):
+    """
+    Context processor: {% if 'administrar' in permisos %} en las plantillas.
+    Perezoso: solo se resuelve (y se lee request.user) si la plantilla lo usa.
+    Las vistas async del catálogo no lo usan y no pueden tocar la BD al renderizar.
+    """
+    if not hasattr(request, 'user'):
+        return {}
+    return {'permisos': SimpleLazyObject(lambda: permisos_de_peticion(request))}
@@ -0,0 +1,93 @@
+# En: gestion/precios.py
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import F, IntegerField, Value
+from django.db.models.functions import Cast, Floor, Greatest
+
+from catalogo.models import Producto, precio_con_iva_sql
+from .escaner import cache_escaner
+from .reportes import invalidar as invalidar_reportes
+from .sincronizacion import registrar_cambios
+
+# -----------------------------------------------------------------
+# ACTUALIZACIÓN MASIVA DE PRECIOS Y COSTOS
+# -----------------------------------------------------------------
+# Sube o baja el precio de venta (o el costo estándar) de todos los
+# productos de una categoría, marca y/o proveedor, en porcentaje o en un
+# monto fijo. El nuevo valor se calcula en la base con una expresión, así
+# la vista previa y la aplicación usan exactamente la misma regla:
+#   - vista previa: la expresión como anotación (nuevo, nuevo_con_iva)
+#   - aplicación:   UN solo UPDATE ... SET campo = <expresión>
+#
+# Porcentajes en puntos básicos enteros (5,5% = 550) y redondeo desde ,5
+# hacia arriba, sin flotantes. Ningún valor queda bajo cero.
+#
+# El UPDATE no pasa por save(): se avisa a mano lo que harían las señales
+# de Producto (feed de sincronización, versión de los reportes y caché del
+# escáner de este proceso).
+
+CAMPOS = {
+    'precio_venta': 'Precio de venta (neto)',
+    'costo_estandar': 'Costo estándar',
+}
+PORCENTAJE = 'porcentaje'
+MONTO = 'monto'
+
+
+def productos_afectados(categoria=None, marca=None, proveedor=None):
+    productos = Producto.objects.all()
+    if categoria is not None:
+        productos = productos.filter(categoria=categoria)
+    if marca is not None:
+        productos = productos.filter(marca=marca)
+    if proveedor is not None:
+        productos = productos.filter(proveedores_asociados=proveedor)
+    return productos
+
+
+def nuevo_valor(campo, modo, valor):
+    """Expresión SQL del valor nuevo de `campo` (entero, nunca negativo)."""
+    if modo == PORCENTAJE:
+        # valor >= -100 (lo valida el formulario): el factor nunca es negativo
+        puntos = int((Decimal(valor) * 100).to_integral_value(ROUND_HALF_UP))
+        expresion = Floor((F(campo) * (10000 + puntos) + 5000) / 10000)
+    elif valor >= 0:
+        expresion = F(campo) + int(valor)
+    else:
+        # GREATEST(campo, d) - d: tope en 0 sin pasar por un negativo (las
+        # columnas son UNSIGNED en MySQL y restar bajo cero da error)
+        descuento = -int(valor)
+        expresion = Greatest(F(campo), Value(descuento)) - descuento
+    return Cast(expresion, IntegerField())
+
+
+def vista_previa(productos, campo, modo, valor, limite=50):
+    """Total de productos afectados y las primeras filas con el valor actual y el nuevo."""
+    anotados = productos.annotate(nuevo=nuevo_valor(campo, modo, valor)).order_by('nombre')
+    if campo == 'precio_venta':
+        anotados = anotados.annotate(
+            actual_con_iva=precio_con_iva_sql(),
+            nuevo_con_iva=precio_con_iva_sql('nuevo'),
+        )
+    filas = list(anotados.values('sku', 'nombre', 'impuesto_iva', campo, 'nuevo', *(
+        ('actual_con_iva', 'nuevo_con_iva') if campo == 'precio_venta' else ()
+    ))[:limite])
+    for fila in filas:
+        fila['actual'] = fila.pop(campo)
+    return {'total': productos.count(), 'filas': filas}
+
+
+def aplicar(productos, campo, modo, valor):
+    """Aplica el cambio con un solo UPDATE. Devuelve cuántos productos cambiaron."""
+    with transaction.atomic():
+        ids = list(productos.select_for_update().values_list('pk', flat=True))
+        if not ids:
+            return 0
+        actualizados = productos.update(**{campo: nuevo_valor(campo, modo, valor)})
+        registrar_cambios('producto', ids)
+        # La valorización usa el costo
+        transaction.on_commit(invalidar_reportes)
+        transaction.on_commit(lambda: [cache_escaner.invalidar(pk) for pk in ids])
+    return actualizados
@@ -0,0 +1,127 @@
+# En: gestion/proveedores.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Prefetch, Q, Sum
+
+from catalogo.models import Producto
+from .models import Proveedor, MovimientoInventario, MovimientoArchivado
+
+# -----------------------------------------------------------------
+# FICHA DE DESEMPEÑO POR PROVEEDOR
+# -----------------------------------------------------------------
+# Por proveedor, a partir de los ingresos (tipo IN con proveedor) vivos y
+# archivados:
+#   productos       productos activos que suministra (M2M)
+#   ultima_entrega  fecha del último ingreso
+#   volumen         unidades ingresadas
+#   entregas        líneas de ingreso
+#   a_tiempo        % de ingresos con fecha comprometida que llegaron ese día
+#                   o antes (None si ninguno trae fecha comprometida)
+#
+# Se calcula para muchos proveedores a la vez con una consulta agrupada por
+# tabla (no una por fila) y se guarda en la caché por proveedor: el listado
+# y la exportación solo calculan los que faltan. Un ingreso nuevo o un
+# cambio en sus productos invalida la ficha de ese proveedor (signals.py);
+# lo demás (bajas de productos, purgas) se refresca con el TTL
+# (PROVEEDORES_CACHE_TTL, segundos).
+
+PREFIJO = 'proveedor:ficha'
+VACIA = {'productos': 0, 'ultima_entrega': None, 'volumen': 0, 'entregas': 0, 'comprometidas': 0, 'a_tiempo': None}
+
+
+def _clave(proveedor_id):
+    return f'{PREFIJO}:{proveedor_id}'
+
+
+def _calcular(ids):
+    fichas = {pk: dict(VACIA) for pk in ids}
+
+    por_proveedor = (
+        Proveedor.productos_suministrados.through.objects
+        .filter(proveedor_id__in=ids, producto__activo=True)
+        .values('proveedor_id').annotate(productos=Count('producto_id')).order_by()
+    )
+    for fila in por_proveedor:
+        fichas[fila['proveedor_id']]['productos'] = fila['productos']
+
+    a_tiempo = {pk: 0 for pk in ids}
+    for modelo in (MovimientoInventario, MovimientoArchivado):
+        ingresos = (
+            modelo.objects
+            .filter(tipo=MovimientoInventario.TipoMovimiento.INGRESO, proveedor_id__in=ids)
+            .values('proveedor_id')
+            .annotate(
+                ultima_entrega=Max('fecha'),
+                volumen=Sum('cantidad'),
+                entregas=Count('pk'),
+                comprometidas=Count('pk', filter=Q(fecha_comprometida__isnull=False)),
+                a_tiempo=Count('pk', filter=Q(fecha__date__lte=F('fecha_comprometida'))),
+            )
+            .order_by()
+        )
+        for fila in ingresos:
+            ficha = fichas[fila['proveedor_id']]
+            if ficha['ultima_entrega'] is None or fila['ultima_entrega'] > ficha['ultima_entrega']:
+                ficha['ultima_entrega'] = fila['ultima_entrega']
+            ficha['volumen'] += fila['volumen']
+            ficha['entregas'] += fila['entregas']
+            ficha['comprometidas'] += fila['comprometidas']
+            a_tiempo[fila['proveedor_id']] += fila['a_tiempo']
+
+    for pk, ficha in fichas.items():
+        if ficha['comprometidas']:
+            ficha['a_tiempo'] = round(100 * a_tiempo[pk] / ficha['comprometidas'], 1)
+    return fichas
+
+
+def fichas(ids):
+    """{proveedor_id: ficha} desde la caché, calculando solo las que faltan."""
+    ids = list(ids)
+    if not ids:
+        return {}
+    en_cache = cache.get_many([_clave(pk) for pk in ids])
+    resultado = {pk: en_cache[_clave(pk)] for pk in ids if _clave(pk) in en_cache}
+    faltan = [pk for pk in ids if pk not in resultado]
+    if faltan:
+        calculadas = _calcular(faltan)
+        cache.set_many(
+            {_clave(pk): ficha for pk, ficha in calculadas.items()},
+            getattr(settings, 'PROVEEDORES_CACHE_TTL', 900),
+        )
+        resultado.update(calculadas)
+    return resultado
+
+
+def invalidar(ids):
+    cache.delete_many([_clave(pk) for pk in ids if pk])
+
+
+def con_fichas(proveedores):
+    """Evalúa el queryset y deja la ficha en cada proveedor (proveedor.ficha)."""
+    proveedores = list(proveedores)
+    por_id = fichas(p.pk for p in proveedores)
+    for proveedor in proveedores:
+        proveedor.ficha = por_id[proveedor.pk]
+    return proveedores
+
+
+# -----------------------------------------------------------------
+# MATRIZ PROVEEDOR-PRODUCTO (prefetch en ambos sentidos)
+# -----------------------------------------------------------------
+def con_productos(proveedores):
+    """Trae los productos de todos los proveedores en una consulta (proveedor.productos_lista)."""
+    return proveedores.prefetch_related(Prefetch(
+        'productos_suministrados',
+        queryset=Producto.objects.only('id', 'sku', 'nombre').order_by('nombre'),
+        to_attr='productos_lista',
+    ))
+
+
+def con_proveedores(productos):
+    """Trae los proveedores de todos los productos en una consulta (producto.proveedores_lista)."""
+    return productos.prefetch_related(Prefetch(
+        'proveedores_asociados',
+        queryset=Proveedor.objects.only('id', 'rut_nif', 'razon_social').order_by('razon_social'),
+        to_attr='proveedores_lista',
+    ))
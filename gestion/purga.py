@@ -0,0 +1,108 @@
+# En: gestion/purga.py
+
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from catalogo.models import Producto
+from .models import (
+    Proveedor, MovimientoInventario, MovimientoArchivado, SaldoCierre,
+    ResumenDiarioMovimiento, StockBodega, LineaConteo,
+)
+
+# -----------------------------------------------------------------
+# PURGA DE PRODUCTOS Y PROVEEDORES DADOS DE BAJA
+# -----------------------------------------------------------------
+# Eliminar en la vista significa baja lógica (activo=False, ver
+# BajaLogicaMixin): un delete() directo arrastraría por CASCADE todo el
+# ledger del producto en una sola transacción, con la tabla bloqueada.
+#
+# El borrado físico lo hace manage.py purgar_eliminados, fuera de las
+# peticiones: primero las filas dependientes en tandas pequeñas (cada una en
+# su propia transacción corta, con una pausa entre tandas para no competir
+# con las ventas y movimientos en curso) y al final el registro, que ya no
+# tiene nada que arrastrar. Si alguien lo restaura a medio camino, la purga
+# de ese registro se detiene.
+
+# (modelo, campo): filas que se borran con el producto
+DEPENDIENTES_PRODUCTO = [
+    (MovimientoInventario, 'producto'),
+    (MovimientoArchivado, 'producto'),
+    (ResumenDiarioMovimiento, 'producto'),
+    (SaldoCierre, 'producto'),
+    (StockBodega, 'producto'),
+    (LineaConteo, 'producto'),
+    (Proveedor.productos_suministrados.through, 'producto'),
+]
+
+# (modelo, campo): referencias al proveedor que quedan en NULL (SET_NULL) ...
+REFERENCIAS_PROVEEDOR = [
+    (MovimientoInventario, 'proveedor'),
+    (MovimientoArchivado, 'proveedor'),
+]
+# ... y filas que se borran con él
+DEPENDIENTES_PROVEEDOR = [
+    (Proveedor.productos_suministrados.through, 'proveedor'),
+]
+
+MODELOS = {
+    'producto': Producto,
+    'proveedor': Proveedor,
+}
+
+
+def pendientes(modelo, dias=0):
+    """Registros dados de baja hace al menos `dias` días."""
+    limite = timezone.now() - timedelta(days=dias)
+    return modelo.todos.filter(activo=False, fecha_baja__lte=limite)
+
+
+def _sigue_de_baja(registro):
+    return type(registro).todos.filter(pk=registro.pk, activo=False).exists()
+
+
+def _por_tandas(dependiente, campo, pk, tanda, pausa, accion):
+    total = 0
+    while True:
+        pks = list(
+            dependiente._base_manager.filter(**{campo: pk})
+            .order_by('pk').values_list('pk', flat=True)[:tanda]
+        )
+        if not pks:
+            return total
+        with transaction.atomic():
+            accion(dependiente._base_manager.filter(pk__in=pks))
+        total += len(pks)
+        if pausa:
+            time.sleep(pausa)
+
+
+def purgar(registro, tanda=1000, pausa=0.1):
+    """
+    Borra físicamente un producto o proveedor dado de baja y sus filas
+    dependientes, por tandas. Devuelve las filas tocadas, o None si el
+    registro fue restaurado (o ya no existe) y se dejó tal cual.
+    """
+    if isinstance(registro, Producto):
+        pasos = [(m, c, lambda qs: qs.delete()) for m, c in DEPENDIENTES_PRODUCTO]
+    else:
+        pasos = (
+            [(m, c, lambda qs, c=c: qs.update(**{c: None})) for m, c in REFERENCIAS_PROVEEDOR]
+            + [(m, c, lambda qs: qs.delete()) for m, c in DEPENDIENTES_PROVEEDOR]
+        )
+
+    total = 0
+    for dependiente, campo, accion in pasos:
+        if not _sigue_de_baja(registro):
+            return None
+        total += _por_tandas(dependiente, campo, registro.pk, tanda, pausa, accion)
+
+    with transaction.atomic():
+        if not type(registro).todos.select_for_update().filter(pk=registro.pk, activo=False).exists():
+            return None
+        # Ya sin dependientes: el delete() no arrastra nada (y emite post_delete
+        # para la caché del escáner y el feed de sincronización)
+        registro.delete()
+    return total + 1
@@ -0,0 +1,160 @@
+# En: gestion/reportes.py
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum, F
+from django.utils import timezone
+
+from catalogo.models import Producto
+from .dependencias import cargar
+from .kpis import costo_unitario
+from .models import MovimientoInventario, ResumenDiarioMovimiento, StockBodega
+
+# -----------------------------------------------------------------
+# MOTOR DE REPORTES: VALORIZACIÓN DE STOCK Y CLASIFICACIÓN ABC
+# -----------------------------------------------------------------
+# Cada reporte trae solo las columnas necesarias con unas pocas consultas
+# agrupadas y hace los cálculos (rankings, % acumulados) en memoria, con
+# NumPy si está instalado. El resultado se guarda en la caché de Django
+# con una clave que incluye la "versión de los datos":
+#   - versión del catálogo: cambia al editar productos, categorías o marcas
+#     (signals.py) y con la actualización masiva de precios; el costo y la
+#     categoría se ven en el siguiente reporte.
+#   - ventana de tiempo (REPORTES_VENTANA, segundos): los movimientos NO
+#     cambian la versión. En una caja con ventas cada segundo eso recalcularía
+#     el reporte en cada petición; se tolera que el stock del reporte tenga
+#     hasta una ventana de atraso.
+
+UMBRAL_A = 0.80  # % acumulado del valor de consumo hasta el que un SKU es clase A
+UMBRAL_B = 0.95
+DIAS_ABC = 90
+
+
+CLAVE_VERSION = 'reporte:version-catalogo'
+
+
+def ventana():
+    return getattr(settings, 'REPORTES_VENTANA', 300)
+
+
+def version_catalogo():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        version = time.time_ns()
+        cache.add(CLAVE_VERSION, version, None)
+        version = cache.get(CLAVE_VERSION, version)
+    return version
+
+
+def invalidar(**kwargs):
+    cache.set(CLAVE_VERSION, time.time_ns(), None)
+
+
+def version_datos():
+    return f"{version_catalogo()}-{int(time.time() // ventana())}"
+
+
+def _cacheado(nombre, calcular, *args):
+    clave = f"reporte:{nombre}:{':'.join(map(str, args))}:{version_datos()}"
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = calcular(*args)
+        # Pasada la ventana la clave ya no se usa: no vale la pena guardarla más
+        cache.set(clave, resultado, ventana())
+    return resultado
+
+
+# --- Valorización ---
+def _calcular_valorizacion():
+    def agrupar(modelo, campo, cantidad, prefijo=''):
+        filas = (
+            modelo.objects.values(campo)
+            .annotate(unidades=Sum(cantidad), valor=Sum(F(cantidad) * costo_unitario(prefijo)))
+            .order_by('-valor')
+        )
+        return [
+            {'nombre': fila[campo] or 'Sin asignar', 'unidades': fila['unidades'] or 0, 'valor': fila['valor'] or 0}
+            for fila in filas
+        ]
+
+    por_categoria = agrupar(Producto, 'categoria__nombre', 'stock_actual')
+    return {
+        'por_categoria': por_categoria,
+        'por_marca': agrupar(Producto, 'marca__nombre', 'stock_actual'),
+        'por_bodega': agrupar(StockBodega, 'bodega__nombre', 'cantidad', 'producto__'),
+        'valor_total': sum(fila['valor'] for fila in por_categoria),
+    }
+
+
+def valorizacion_stock():
+    """Valor del stock (stock_actual x costo) por categoría, marca y bodega."""
+    return _cacheado('valorizacion', _calcular_valorizacion)
+
+
+# --- Clasificación ABC ---
+def _clasificar(valores):
+    """Devuelve (orden, % acumulado, clases) para los valores de consumo."""
+    # Dependencia opcional: sin NumPy se usa la versión en Python puro
+    np = cargar('numpy')
+    if np is not None:
+        arreglo = np.asarray(valores, dtype=np.float64)
+        orden = np.argsort(-arreglo, kind='stable')
+        acumulado = np.cumsum(arreglo[orden])
+        total = acumulado[-1] if len(acumulado) else 0
+        participacion = acumulado / total if total else np.zeros_like(acumulado)
+        # La clase se decide por el acumulado ANTES del SKU: el que cruza el umbral sigue siendo A
+        previo = participacion - (arreglo[orden] / total if total else 0)
+        clases = np.where(previo < UMBRAL_A, 'A', np.where(previo < UMBRAL_B, 'B', 'C'))
+        return orden.tolist(), participacion.tolist(), clases.tolist()
+
+    orden = sorted(range(len(valores)), key=lambda i: -valores[i])
+    total = sum(valores)
+    participacion, clases, acumulado = [], [], 0
+    for i in orden:
+        previo = acumulado / total if total else 0
+        acumulado += valores[i]
+        participacion.append(acumulado / total if total else 0.0)
+        clases.append('A' if previo < UMBRAL_A else 'B' if previo < UMBRAL_B else 'C')
+    return orden, participacion, clases
+
+
+def _calcular_abc(dias):
+    desde = timezone.localdate() - timedelta(days=dias - 1)
+    consumo = dict(
+        ResumenDiarioMovimiento.objects
+        .filter(fecha__gte=desde, tipo=MovimientoInventario.TipoMovimiento.SALIDA)
+        .values('producto_id').annotate(total=Sum('cantidad'))
+        .values_list('producto_id', 'total')
+    )
+    productos = list(
+        Producto.objects.filter(pk__in=consumo).annotate(costo=costo_unitario())
+        .values_list('pk', 'sku', 'nombre', 'costo')
+    )
+    valores = [consumo[pk] * costo for pk, _, _, costo in productos]
+    orden, participacion, clases = _clasificar(valores)
+
+    filas = []
+    for posicion, (i, acumulado, clase) in enumerate(zip(orden, participacion, clases), start=1):
+        pk, sku, nombre, costo = productos[i]
+        filas.append({
+            'ranking': posicion,
+            'sku': sku,
+            'nombre': nombre,
+            'unidades': consumo[pk],
+            'valor_consumo': valores[i],
+            'participacion_acumulada': round(acumulado * 100, 2),
+            'clase': clase,
+        })
+    return {
+        'dias': dias,
+        'filas': filas,
+        'resumen': {clase: sum(1 for f in filas if f['clase'] == clase) for clase in 'ABC'},
+    }
+
+
+def clasificacion_abc(dias=DIAS_ABC):
+    """Pareto de SKUs por valor de consumo (salidas x costo) en los últimos `dias`."""
+    return _cacheado('abc', _calcular_abc, dias)
@@ -0,0 +1,141 @@
+# En: gestion/signals.py
+
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from catalogo.models import Producto, Categoria, Marca
+from .escaner import cache_escaner
+from .eventos import broker_stock, eventos_desde_movimientos, intervalo_sondeo
+from . import metricas
+from .autenticacion import registrar_sesion
+from .fragmentos import invalidar_formularios
+from .reportes import invalidar as invalidar_reportes
+from . import proveedores as fichas_proveedor
+from .models import Proveedor, Bodega, CambioCatalogo, SesionActiva, MovimientoInventario, movimientos_registrados
+from .sincronizacion import registrar_cambios
+
+
+# -----------------------------------------------------------------
+# INVALIDACIÓN DE LA CACHÉ DEL ESCÁNER
+# -----------------------------------------------------------------
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def invalidar_escaner(sender, instance, **kwargs):
+    cache_escaner.invalidar(instance.pk, *filter(None, [instance.ean_upc, instance.sku]))
+
+
+@receiver(movimientos_registrados)
+def invalidar_escaner_por_movimientos(sender, saldos, **kwargs):
+    # El stock se actualiza con UPDATE directo (sin post_save de Producto)
+    for producto_id in saldos:
+        cache_escaner.invalidar(producto_id)
+
+
+# -----------------------------------------------------------------
+# FEED DE CAMBIOS PARA SINCRONIZACIÓN (ver sincronizacion.py)
+# -----------------------------------------------------------------
+MODELOS_SINCRONIZADOS = {
+    Producto: 'producto',
+    Categoria: 'categoria',
+    Marca: 'marca',
+    Proveedor: 'proveedor',
+}
+
+def _registrar_guardado(sender, instance, **kwargs):
+    registrar_cambios(MODELOS_SINCRONIZADOS[sender], [instance.pk])
+
+def _registrar_eliminado(sender, instance, **kwargs):
+    registrar_cambios(MODELOS_SINCRONIZADOS[sender], [instance.pk], CambioCatalogo.Acciones.ELIMINADO)
+
+for _modelo in MODELOS_SINCRONIZADOS:
+    post_save.connect(_registrar_guardado, sender=_modelo, dispatch_uid=f'sync_guardado_{_modelo.__name__}')
+    post_delete.connect(_registrar_eliminado, sender=_modelo, dispatch_uid=f'sync_eliminado_{_modelo.__name__}')
+
+
+@receiver(movimientos_registrados)
+def registrar_cambios_de_stock(sender, movimientos, saldos, **kwargs):
+    # El stock se actualiza con UPDATE directo (sin post_save de Producto).
+    # Las transferencias no cambian el stock global: no generan cambio.
+    registrar_cambios('producto', {m.producto_id for m in movimientos if m.delta_stock})
+
+
+# -----------------------------------------------------------------
+# EVENTOS EN VIVO DE STOCK (SSE, ver eventos.py)
+# -----------------------------------------------------------------
+@receiver(movimientos_registrados)
+def publicar_eventos_de_stock(sender, movimientos, saldos, **kwargs):
+    # Con EVENTOS_SONDEO los publica el sondeo de cada worker (ver eventos.py)
+    if not broker_stock.total_suscriptores or intervalo_sondeo():
+        return
+    for evento in eventos_desde_movimientos(movimientos, saldos):
+        broker_stock.publicar(evento)
+
+
+# -----------------------------------------------------------------
+# MÉTRICAS (ver metricas.py)
+# -----------------------------------------------------------------
+@receiver(movimientos_registrados)
+def contar_movimientos(sender, movimientos, saldos, **kwargs):
+    con_salida = set()
+    for movimiento in movimientos:
+        metricas.movimientos_registrados_total.inc(tipo=movimiento.tipo, bodega=movimiento.bodega_id)
+        if movimiento.delta_stock < 0:
+            con_salida.add(movimiento.producto_id)
+    quiebres = sum(1 for producto_id in con_salida if saldos.get(producto_id) == 0)
+    if quiebres:
+        metricas.quiebres_stock_total.inc(quiebres)
+
+
+# -----------------------------------------------------------------
+# SESIONES ACTIVAS (ver autenticacion.py)
+# -----------------------------------------------------------------
+@receiver(user_logged_in)
+def registrar_inicio_de_sesion(sender, request, user, **kwargs):
+    registrar_sesion(request, user)
+
+
+@receiver(user_logged_out)
+def registrar_cierre_de_sesion(sender, request, user, **kwargs):
+    if request is not None and request.session.session_key:
+        SesionActiva.objects.filter(session_key=request.session.session_key).delete()
+
+
+# -----------------------------------------------------------------
+# VERSIÓN DEL CATÁLOGO DE LOS REPORTES CACHEADOS (ver reportes.py)
+# -----------------------------------------------------------------
+for _modelo in (Producto, Categoria, Marca):
+    post_save.connect(invalidar_reportes, sender=_modelo, dispatch_uid=f'reportes_guardado_{_modelo.__name__}')
+    post_delete.connect(invalidar_reportes, sender=_modelo, dispatch_uid=f'reportes_eliminado_{_modelo.__name__}')
+
+
+# -----------------------------------------------------------------
+# FRAGMENTOS DE FORMULARIOS CACHEADOS (ver fragmentos.py)
+# -----------------------------------------------------------------
+for _modelo in (Producto, Categoria, Marca, Proveedor, Bodega):
+    post_save.connect(invalidar_formularios, sender=_modelo, dispatch_uid=f'fragmentos_guardado_{_modelo.__name__}')
+    post_delete.connect(invalidar_formularios, sender=_modelo, dispatch_uid=f'fragmentos_eliminado_{_modelo.__name__}')
+
+
+# -----------------------------------------------------------------
+# FICHAS DE PROVEEDORES CACHEADAS (ver proveedores.py)
+# -----------------------------------------------------------------
+@receiver(movimientos_registrados)
+def invalidar_fichas_por_ingresos(sender, movimientos, **kwargs):
+    fichas_proveedor.invalidar({
+        m.proveedor_id for m in movimientos
+        if m.proveedor_id and m.tipo == MovimientoInventario.TipoMovimiento.INGRESO
+    })
+
+
+@receiver(m2m_changed, sender=Proveedor.productos_suministrados.through)
+def invalidar_fichas_por_productos(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        fichas_proveedor.invalidar([instance.pk])
+    elif pk_set:
+        fichas_proveedor.invalidar(pk_set)
+    else:
+        # post_clear desde el producto: pk_set no trae a quiénes se quitó
+        fichas_proveedor.invalidar(Proveedor.todos.values_list('pk', flat=True))
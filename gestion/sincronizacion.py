@@ -0,0 +1,165 @@
+# En: gestion/sincronizacion.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from catalogo.models import Producto, Categoria, Marca
+from .models import Proveedor, CambioCatalogo
+
+# -----------------------------------------------------------------
+# FEED DE CAMBIOS PARA DISPOSITIVOS OFFLINE (HANDHELDS)
+# -----------------------------------------------------------------
+# Cada alta/edición/baja de los modelos sincronizados (y cada cambio de
+# stock) deja una fila en CambioCatalogo. El dispositivo guarda el último
+# cursor recibido y pide solo lo posterior: /gestion/sync/?since=<cursor>.
+#
+# Las filas se insertan en on_commit (autocommit), así el id se asigna
+# cuando el cambio ya es visible. Aun así dos inserciones concurrentes
+# pueden hacerse visibles al revés (N+1 antes que N): un dispositivo que
+# sincroniza entre medio pasaría su cursor sobre N y nunca lo recibiría.
+# Por eso cambios_desde() solo entrega filas con más de SYNC_MARGEN_SEGUNDOS
+# y corta en la primera más nueva: el cursor nunca pasa sobre un id que
+# todavía puede aparecer. Los cambios llegan con ese atraso.
+#
+# La carga inicial (since=0) también va por páginas: se recorre modelo por
+# modelo y por id; cada respuesta trae en 'siguiente' los parámetros de la
+# página que sigue y todas devuelven el cursor leído en la primera.
+
+# Campos que viajan al dispositivo, en el orden del arreglo compacto
+ESQUEMA = {
+    'producto': ('id', 'sku', 'ean_upc', 'nombre', 'categoria_id', 'marca_id',
+                 'precio_venta', 'impuesto_iva', 'stock_actual'),
+    'categoria': ('id', 'nombre'),
+    'marca': ('id', 'nombre'),
+    'proveedor': ('id', 'rut_nif', 'razon_social', 'estado'),
+}
+
+MODELOS = {
+    'producto': Producto,
+    'categoria': Categoria,
+    'marca': Marca,
+    'proveedor': Proveedor,
+}
+
+LIMITE_POR_DEFECTO = 500
+LIMITE_MAXIMO = 5000
+
+
+def _limite(limite):
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def margen():
+    return timedelta(seconds=getattr(settings, 'SYNC_MARGEN_SEGUNDOS', 5))
+
+
+def registrar_cambios(modelo, ids, accion=CambioCatalogo.Acciones.GUARDADO):
+    ids = list(ids)
+    if not ids:
+        return
+    transaction.on_commit(lambda: CambioCatalogo.objects.bulk_create(
+        [CambioCatalogo(modelo=modelo, objeto_id=pk, accion=accion) for pk in ids]
+    ))
+
+
+def _filas(modelo, ids=None):
+    qs = MODELOS[modelo].objects.all()
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+    return [list(fila) for fila in qs.order_by('pk').values_list(*ESQUEMA[modelo])]
+
+
+def snapshot_completo(limite=LIMITE_POR_DEFECTO, modelo=None, desde=0, corte=None):
+    """
+    Una página de la carga inicial (since=0). La primera se pide sin
+    parámetros; las siguientes con los de 'siguiente' (modelo, desde, corte).
+    """
+    limite = _limite(limite)
+    if corte is None:
+        # El cursor se lee ANTES que los datos: lo que cambie entre medio se
+        # reenviará en la siguiente llamada (aplicar dos veces es inocuo).
+        corte = CambioCatalogo.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    modelos = list(MODELOS)
+    pendientes = modelos[modelos.index(modelo):] if modelo else modelos
+
+    cambios, siguiente, restante = {}, None, limite
+    for nombre in pendientes:
+        inicio = desde if nombre == pendientes[0] else 0
+        filas = [
+            list(fila) for fila in
+            MODELOS[nombre].objects.filter(pk__gt=inicio).order_by('pk')
+            .values_list(*ESQUEMA[nombre])[:restante + 1]
+        ]
+        if len(filas) > restante:
+            filas = filas[:restante]
+            siguiente = {'modelo': nombre, 'desde': filas[-1][0] if filas else inicio, 'corte': corte}
+        if filas:
+            cambios[nombre] = filas
+            restante -= len(filas)
+        if siguiente:
+            break
+        if not restante:
+            posterior = pendientes[pendientes.index(nombre) + 1:]
+            if posterior:
+                siguiente = {'modelo': posterior[0], 'desde': 0, 'corte': corte}
+            break
+
+    return {
+        'cursor': corte,
+        'mas': siguiente is not None,
+        'siguiente': siguiente,
+        'completo': True,
+        'esquema': ESQUEMA,
+        'cambios': cambios,
+        'eliminados': {},
+    }
+
+
+def cambios_desde(cursor, limite=LIMITE_POR_DEFECTO):
+    """Cambios posteriores a `cursor`, comprimidos al último estado por objeto."""
+    limite = _limite(limite)
+    registros = list(
+        CambioCatalogo.objects.filter(pk__gt=cursor)
+        .order_by('pk')
+        .values_list('pk', 'modelo', 'objeto_id', 'accion', 'fecha')[:limite + 1]
+    )
+    mas = len(registros) > limite
+    registros = registros[:limite]
+    # Se corta en la primera fila demasiado nueva (ver el encabezado)
+    listos = timezone.now() - margen()
+    recientes = next((i for i, fila in enumerate(registros) if fila[4] > listos), None)
+    if recientes is not None:
+        registros, mas = registros[:recientes], False
+
+    # Solo importa la última acción de cada objeto dentro del lote
+    ultima_accion = {}
+    for _, modelo, objeto_id, accion, _ in registros:
+        if modelo in MODELOS:
+            ultima_accion[(modelo, objeto_id)] = accion
+
+    guardados = {modelo: set() for modelo in MODELOS}
+    eliminados = {modelo: set() for modelo in MODELOS}
+    for (modelo, objeto_id), accion in ultima_accion.items():
+        destino = eliminados if accion == CambioCatalogo.Acciones.ELIMINADO else guardados
+        destino[modelo].add(objeto_id)
+
+    cambios = {}
+    for modelo, ids in guardados.items():
+        if not ids:
+            continue
+        filas = _filas(modelo, ids)
+        cambios[modelo] = filas
+        # Guardado y luego borrado fuera de este lote: se informa como eliminado
+        eliminados[modelo] |= ids - {fila[0] for fila in filas}
+
+    return {
+        'cursor': registros[-1][0] if registros else cursor,
+        'mas': mas,
+        'completo': False,
+        'esquema': {modelo: ESQUEMA[modelo] for modelo in cambios},
+        'cambios': cambios,
+        'eliminados': {modelo: sorted(ids) for modelo, ids in eliminados.items() if ids},
+    }
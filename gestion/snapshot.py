@@ -0,0 +1,205 @@
+# En: gestion/snapshot.py
+
+import csv
+import gzip
+import io
+import json
+import os
+import zlib
+
+from django.utils import timezone
+
+from catalogo.models import Producto
+from .dependencias import cargar
+from .models import Proveedor, Bodega, MovimientoInventario, MovimientoArchivado
+
+# -----------------------------------------------------------------
+# SNAPSHOT ANALÍTICO (formato columnar para notebooks)
+# -----------------------------------------------------------------
+# Exporta las tablas completas con todas sus columnas, leyendo con
+# QuerySet.iterator() por tandas (memoria constante):
+#   - Parquet (un archivo por tabla) si pyarrow está instalado
+#   - si no, CSV gzip partido en archivos de FILAS_POR_ARCHIVO filas
+# En ambos casos se escribe un manifest.json con el esquema de cada tabla
+# y el último id de movimiento exportado: un snapshot incremental solo
+# trae los movimientos posteriores a ese id (las tablas maestras siempre
+# van completas, son chicas).
+
+FILAS_POR_TANDA = 5000
+FILAS_POR_ARCHIVO = 200000
+MANIFEST = 'manifest.json'
+
+Enlace = Proveedor.productos_suministrados.through
+
+# Tabla -> modelo(s) de origen. Los movimientos incluyen los archivados.
+TABLAS = {
+    'productos': (Producto,),
+    'proveedores': (Proveedor,),
+    'bodegas': (Bodega,),
+    'proveedor_producto': (Enlace,),
+    'movimientos': (MovimientoInventario, MovimientoArchivado),
+}
+
+TIPOS_ENTEROS = {
+    'AutoField', 'BigAutoField', 'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+    'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField', 'ForeignKey',
+}
+
+
+def _columnas(modelo):
+    return [(campo.attname, campo.get_internal_type(), campo) for campo in modelo._meta.concrete_fields]
+
+
+def _tipo_esquema(tipo):
+    if tipo in TIPOS_ENTEROS:
+        return 'int64'
+    return {
+        'BooleanField': 'bool',
+        'DecimalField': 'decimal',
+        'DateTimeField': 'timestamp',
+        'DateField': 'date',
+    }.get(tipo, 'string')
+
+
+def _tipo_arrow(pa, tipo, campo):
+    esquema = _tipo_esquema(tipo)
+    if esquema == 'int64':
+        return pa.int64()
+    if esquema == 'bool':
+        return pa.bool_()
+    if esquema == 'decimal':
+        return pa.decimal128(campo.max_digits, campo.decimal_places)
+    if esquema == 'timestamp':
+        return pa.timestamp('us', tz='UTC')
+    if esquema == 'date':
+        return pa.date32()
+    return pa.string()
+
+
+def filas(tabla, desde_id=0, hasta_id=None):
+    """Itera las filas (tuplas) de una tabla en el orden de _columnas()."""
+    nombres = [nombre for nombre, _, _ in _columnas(TABLAS[tabla][0])]
+    for modelo in TABLAS[tabla]:
+        # _base_manager: incluye lo dado de baja (la columna 'activo' va en el snapshot)
+        qs = modelo._base_manager.order_by('pk').values_list(*nombres)
+        if tabla == 'movimientos':
+            qs = qs.filter(pk__gt=desde_id)
+            if hasta_id is not None:
+                qs = qs.filter(pk__lte=hasta_id)
+        yield from qs.iterator(chunk_size=FILAS_POR_TANDA)
+
+
+def _tandas(iterable, tamano):
+    tanda = []
+    for fila in iterable:
+        tanda.append(fila)
+        if len(tanda) >= tamano:
+            yield tanda
+            tanda = []
+    if tanda:
+        yield tanda
+
+
+def _escribir_parquet(pa, tabla, ruta_base, desde_id, hasta_id):
+    pq = cargar('pyarrow.parquet')
+    columnas = _columnas(TABLAS[tabla][0])
+    esquema = pa.schema([(nombre, _tipo_arrow(pa, tipo, campo)) for nombre, tipo, campo in columnas])
+    archivo = f"{tabla}.parquet"
+    total = 0
+    with pq.ParquetWriter(os.path.join(ruta_base, archivo), esquema, compression='zstd') as escritor:
+        for tanda in _tandas(filas(tabla, desde_id, hasta_id), FILAS_POR_TANDA):
+            datos = {nombre: [fila[i] for fila in tanda] for i, (nombre, _, _) in enumerate(columnas)}
+            escritor.write_batch(pa.RecordBatch.from_pydict(datos, schema=esquema))
+            total += len(tanda)
+    return [archivo], total
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
+
+
+def _escribir_csv(tabla, ruta_base, desde_id, hasta_id, filas_por_archivo):
+    archivos, total = [], 0
+    for numero, tanda in enumerate(_tandas(filas(tabla, desde_id, hasta_id), filas_por_archivo), start=1):
+        archivo = f"{tabla}-{numero:05d}.csv.gz"
+        with gzip.open(os.path.join(ruta_base, archivo), 'wt', encoding='utf-8', newline='') as f:
+            escritor = csv.writer(f)
+            escritor.writerow([nombre for nombre, _, _ in _columnas(TABLAS[tabla][0])])
+            escritor.writerows([_valor_csv(v) for v in fila] for fila in tanda)
+        archivos.append(archivo)
+        total += len(tanda)
+    return archivos, total
+
+
+def leer_manifest(ruta_base):
+    try:
+        with open(os.path.join(ruta_base, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def exportar(ruta_base, incremental=False, formato='auto', filas_por_archivo=FILAS_POR_ARCHIVO):
+    """
+    Escribe el snapshot en `ruta_base` (un subdirectorio por corrida) y
+    actualiza ruta_base/manifest.json. Devuelve el manifest de la corrida.
+    """
+    # Dependencia opcional: sin pyarrow se exporta CSV gzip
+    pa = cargar('pyarrow') if formato in ('auto', 'parquet') and cargar('pyarrow.parquet') else None
+    if formato == 'parquet' and pa is None:
+        raise ValueError("Formato parquet pedido pero pyarrow no está instalado.")
+
+    previo = leer_manifest(ruta_base) if incremental else None
+    desde_id = previo['hasta_id'] if previo else 0
+    # Se fija el tope antes de leer: lo que entre durante la exportación va en la siguiente
+    hasta_id = MovimientoInventario.objects.order_by('-pk').values_list('pk', flat=True).first() or desde_id
+
+    ahora = timezone.now()
+    corrida = ahora.strftime('%Y%m%dT%H%M%S')
+    ruta_corrida = os.path.join(ruta_base, corrida)
+    os.makedirs(ruta_corrida, exist_ok=True)
+
+    manifest = {
+        'generado': ahora.isoformat(),
+        'formato': 'parquet' if pa is not None else 'csv.gz',
+        'incremental': bool(previo),
+        'desde_id': desde_id,
+        'hasta_id': hasta_id,
+        'directorio': corrida,
+        'tablas': {},
+    }
+    for tabla in TABLAS:
+        if pa is not None:
+            archivos, total = _escribir_parquet(pa, tabla, ruta_corrida, desde_id, hasta_id)
+        else:
+            archivos, total = _escribir_csv(tabla, ruta_corrida, desde_id, hasta_id, filas_por_archivo)
+        manifest['tablas'][tabla] = {
+            'columnas': [{'nombre': n, 'tipo': _tipo_esquema(t)} for n, t, _ in _columnas(TABLAS[tabla][0])],
+            'archivos': archivos,
+            'filas': total,
+        }
+
+    for destino in (os.path.join(ruta_corrida, MANIFEST), os.path.join(ruta_base, MANIFEST)):
+        with open(destino, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def csv_gzip_stream(tabla, desde_id=0):
+    """Genera una tabla como CSV gzip, por pedazos (para StreamingHttpResponse)."""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = formato gzip
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow([nombre for nombre, _, _ in _columnas(TABLAS[tabla][0])])
+    for tanda in _tandas(filas(tabla, desde_id), FILAS_POR_TANDA):
+        escritor.writerows([_valor_csv(v) for v in fila] for fila in tanda)
+        bloque = compresor.compress(buffer.getvalue().encode('utf-8'))
+        buffer.seek(0)
+        buffer.truncate()
+        if bloque:
+            yield bloque
+    yield compresor.compress(buffer.getvalue().encode('utf-8')) + compresor.flush()
@@ -1,3 +1,657 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.exceptions import ValidationError
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalogo.models import Categoria, Producto
+from . import conteos, correo, fragmentos, metricas, sincronizacion, unidades, usuarios
+from .dependencias import MODULOS_PESADOS, cargar
+from .escaner import cache_escaner
+from .eventos import broker_stock
+from .models import Bodega, CambioCatalogo, ConteoInventario, CorreoPendiente, CustomUser, MovimientoInventario, StockBodega
+from .movimientos import registrar_movimientos
+from .ventas import registrar_venta
+
+
+# -----------------------------------------------------------------
+# ARRANQUE EN FRÍO (python -X importtime)
+# -----------------------------------------------------------------
+class ArranqueEnFrioTests(SimpleTestCase):
+    """
+    Arranca Django y carga la URLconf en un proceso nuevo, como un worker
+    recién creado, y mide los imports con -X importtime. Falla si se cuela
+    un import pesado (ver dependencias.py) o si el total pasa del presupuesto
+    (settings.ARRANQUE_PRESUPUESTO_MS, por defecto 1500 ms).
+    """
+
+    LINEA = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        entorno = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+            'PYTHONPATH': os.pathsep.join(p for p in sys.path if p),
+        }
+        salida = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import django; django.setup(); import dulceria_project.urls'],
+            env=entorno, capture_output=True, text=True, timeout=120,
+        )
+        if salida.returncode != 0:
+            raise AssertionError(f"El proceso de arranque falló:\n{salida.stderr[-2000:]}")
+        # (módulo, microsegundos propios)
+        cls.imports = [
+            (m.group(4), int(m.group(1)))
+            for m in map(cls.LINEA.match, salida.stderr.splitlines()) if m
+        ]
+
+    def test_no_importa_dependencias_pesadas(self):
+        importados = {modulo.split('.')[0] for modulo, _ in self.imports}
+        self.assertEqual(sorted(importados & set(MODULOS_PESADOS)), [])
+
+    def test_tiempo_de_arranque_dentro_del_presupuesto(self):
+        presupuesto_ms = getattr(settings, 'ARRANQUE_PRESUPUESTO_MS', 1500)
+        total_ms = sum(us for _, us in self.imports) / 1000
+        mas_lentos = sorted(self.imports, key=lambda i: i[1], reverse=True)[:10]
+        detalle = ', '.join(f"{modulo} {us / 1000:.0f} ms" for modulo, us in mas_lentos)
+        self.assertLessEqual(total_ms, presupuesto_ms, f"Arranque en {total_ms:.0f} ms. Más lentos: {detalle}")
+
+
+# -----------------------------------------------------------------
+# CATÁLOGO PÚBLICO (vistas async) CON SESIÓN INICIADA
+# -----------------------------------------------------------------
+class CatalogoConSesionTests(TestCase):
+    """
+    Las vistas async del catálogo renderizan dentro del loop: ningún context
+    processor puede leer request.user ni la BD al armar el contexto.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre='Chocolates')
+        cls.producto = Producto.objects.create(sku='CAT-1', nombre='Bombón', categoria=cls.categoria)
+        cls.usuario = CustomUser.objects.create_user('operador', password='x', rol=CustomUser.Roles.OPERADOR)
+
+    def test_vistas_del_catalogo_con_usuario_autenticado(self):
+        self.client.force_login(self.usuario)
+        for url in ('/', f'/producto/{self.producto.pk}/', f'/categoria/{self.categoria.nombre}/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+# -----------------------------------------------------------------
+# BAJA LÓGICA DESDE EL ADMIN
+# -----------------------------------------------------------------
+class BajaLogicaAdminTests(TestCase):
+    """El admin no borra físicamente: da de baja y restaura pasando por save()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.producto = Producto.objects.create(sku='ADM-1', nombre='Caramelo')
+        cls.usuario = CustomUser.objects.create_superuser('root', password='x', rol=CustomUser.Roles.ROOT)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _accion(self, accion):
+        return self.client.post('/admin/catalogo/producto/', {
+            'action': accion, '_selected_action': [self.producto.pk],
+        })
+
+    def test_sin_borrado_fisico(self):
+        respuesta = self.client.get(f'/admin/catalogo/producto/{self.producto.pk}/delete/')
+        self.assertEqual(respuesta.status_code, 403)
+        self._accion('delete_selected')
+        self.assertTrue(Producto.todos.filter(pk=self.producto.pk).exists())
+
+    def test_dar_de_baja_y_restaurar(self):
+        self._accion('dar_de_baja')
+        producto = Producto.todos.get(pk=self.producto.pk)
+        self.assertFalse(producto.activo)
+        self.assertIsNotNone(producto.fecha_baja)
+
+        self._accion('restaurar')
+        producto.refresh_from_db()
+        self.assertTrue(producto.activo)
+        self.assertIsNone(producto.fecha_baja)
+
+
+# -----------------------------------------------------------------
+# CONTEO FÍSICO: PARCIAL Y COMPLETO
+# -----------------------------------------------------------------
+class ConteoFisicoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bodega = Bodega.objects.create(nombre='Central')
+        cls.contado = Producto.objects.create(sku='CNT-1', nombre='Contado')
+        cls.olvidado = Producto.objects.create(sku='CNT-2', nombre='No contado')
+        registrar_movimientos([
+            MovimientoInventario(producto=producto, bodega=cls.bodega, tipo='IN', cantidad=10)
+            for producto in (cls.contado, cls.olvidado)
+        ])
+
+    def _contabilizar(self, completo):
+        conteo = ConteoInventario.objects.create(descripcion='Prueba', bodega=self.bodega, completo=completo)
+        conteos.registrar_lectura(conteo, 'CNT-1', cantidad=7)
+        # La lectura ya deja calculada la diferencia de ese producto
+        self.assertEqual(conteo.lineas.get().diferencia, -3)
+        conteos.contabilizar(conteo)
+        return {pk: Producto.objects.get(pk=pk).stock_actual for pk in (self.contado.pk, self.olvidado.pk)}
+
+    def test_parcial_solo_ajusta_lo_contado(self):
+        self.assertEqual(self._contabilizar(completo=False), {self.contado.pk: 7, self.olvidado.pk: 10})
+
+    def test_completo_lleva_a_cero_lo_no_contado(self):
+        self.assertEqual(self._contabilizar(completo=True), {self.contado.pk: 7, self.olvidado.pk: 0})
+
+
+# -----------------------------------------------------------------
+# SALIDAS VALIDADAS POR BODEGA
+# -----------------------------------------------------------------
+class StockPorBodegaTests(TestCase):
+    """El stock global alcanza, pero la bodega de la salida no tiene saldo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.central = Bodega.objects.create(nombre='Central')
+        cls.sala = Bodega.objects.create(nombre='Sala')
+        cls.producto = Producto.objects.create(sku='BOD-1', nombre='Chicle')
+        registrar_movimientos([MovimientoInventario(producto=cls.producto, bodega=cls.central, tipo='IN', cantidad=10)])
+
+    def _saldos(self):
+        self.producto.refresh_from_db()
+        return self.producto.stock_actual, dict(StockBodega.objects.values_list('bodega_id', 'cantidad'))
+
+    def test_registro_en_bloque(self):
+        with self.assertRaisesMessage(ValidationError, 'bodega'):
+            registrar_movimientos([MovimientoInventario(producto=self.producto, bodega=self.sala, tipo='OUT', cantidad=1)])
+        self.assertEqual(self._saldos(), (10, {self.central.pk: 10}))
+
+    def test_save(self):
+        with self.assertRaisesMessage(ValidationError, 'bodega'):
+            MovimientoInventario(producto=self.producto, bodega=self.sala, tipo='AJ-N', cantidad=1).save()
+        MovimientoInventario(producto=self.producto, bodega=self.central, tipo='AJ-N', cantidad=4).save()
+        self.assertEqual(self._saldos(), (6, {self.central.pk: 6}))
+
+
+# -----------------------------------------------------------------
+# ALTA MASIVA DE USUARIOS: VALIDACIÓN DE LA PLANILLA
+# -----------------------------------------------------------------
+class ImportarUsuariosTests(TestCase):
+
+    def _errores(self, nombre, contenido):
+        with self.assertRaises(ValidationError) as error:
+            usuarios.importar_usuarios(SimpleUploadedFile(nombre, contenido))
+        return ' '.join(error.exception.messages)
+
+    def test_aplica_los_validadores_del_modelo(self):
+        errores = self._errores('u.csv', b'username,email,telefono\nno valido!,a@b.cl,' + b'9' * 30 + b'\n')
+        self.assertIn('Fila 2: nombre de usuario', errores)
+        self.assertIn('Fila 2: Teléfono', errores)
+        self.assertFalse(CustomUser.objects.exists())
+
+    def test_archivo_ilegible(self):
+        self.assertIn('UTF-8', self._errores('u.csv', 'username\nñandú'.encode('latin-1')))
+        self.assertIn('XLSX', self._errores('u.xlsx', b'no es un zip'))
+
+
+# -----------------------------------------------------------------
+# CONVERSIÓN DE UNIDADES (unidades.py)
+# -----------------------------------------------------------------
+class UnidadesTests(SimpleTestCase):
+    UNIDADES = {1: ('CAJA', 'UN', Decimal('12')), 2: ('PACK', 'UN', Decimal('2.5')), 3: (None, 'UN', Decimal('1'))}
+
+    def _convertir(self, lineas, forzar_numpy=None):
+        movimientos = [MovimientoInventario(producto_id=pk, cantidad=cantidad, unidad=unidad) for pk, cantidad, unidad in lineas]
+        if forzar_numpy is None:
+            unidades.normalizar(movimientos, self.UNIDADES)
+        else:
+            with mock.patch.object(unidades, 'LINEAS_PARA_NUMPY', 0 if forzar_numpy else len(lineas) + 1):
+                unidades.normalizar(movimientos, self.UNIDADES)
+        return [(m.cantidad, m.unidad, m.cantidad_documento) for m in movimientos]
+
+    def test_resolver(self):
+        self.assertEqual(unidades.resolver('caja', 'CAJA', 'UN', Decimal('12')), ('CAJA', 1200))
+        self.assertEqual(unidades.resolver('COMPRA', 'CAJA', 'UN', Decimal('12')), ('CAJA', 1200))
+        # Sin unidad de compra el alias cae en la de stock
+        self.assertEqual(unidades.resolver('COMPRA', None, 'UN', Decimal('1')), ('UN', 100))
+        # Un factor en 0 no se confunde con "sin factor"
+        self.assertEqual(unidades.resolver('CAJA', 'CAJA', 'UN', Decimal('0')), ('CAJA', None))
+        self.assertEqual(unidades.resolver('CAJA', 'CAJA', 'UN', None), ('CAJA', 100))
+        self.assertEqual(unidades.resolver('KG', 'CAJA', 'UN', Decimal('12')), ('KG', None))
+
+    def test_normalizar(self):
+        self.assertEqual(
+            self._convertir([(1, 3, 'CAJA'), (2, 4, 'PACK'), (3, 5, 'COMPRA'), (1, 7, '')]),
+            [(36, 'CAJA', 3), (10, 'PACK', 4), (5, 'UN', 5), (7, '', None)],
+        )
+        with self.assertRaisesMessage(ValidationError, 'no da unidades enteras'):
+            self._convertir([(2, 3, 'PACK')])
+        with self.assertRaisesMessage(ValidationError, 'no corresponde'):
+            self._convertir([(1, 3, 'KG')])
+
+    @skipIf(cargar('numpy') is None, "NumPy no está instalado")
+    def test_numpy_y_python_coinciden(self):
+        azar = random.Random(50)
+        lineas = [
+            (pk, azar.randint(1, 10_000) * (2 if pk == 2 else 1), azar.choice(['COMPRA', 'UN']))
+            for pk in (azar.choice([1, 2, 3]) for _ in range(2000))
+        ]
+        self.assertEqual(self._convertir(lineas, forzar_numpy=True), self._convertir(lineas, forzar_numpy=False))
+
+
+# -----------------------------------------------------------------
+# VENTAS DESDE CAJA (ventas.py)
+# -----------------------------------------------------------------
+class RegistrarVentaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bodega = Bodega.objects.create(nombre='Caja 1')
+        cls.productos = [Producto.objects.create(sku=f'POS-{i}', nombre=f'Dulce {i}') for i in range(10)]
+        registrar_movimientos([
+            MovimientoInventario(producto=producto, bodega=cls.bodega, tipo='IN', cantidad=5) for producto in cls.productos
+        ])
+
+    def _stock(self):
+        return sorted(Producto.objects.filter(sku__startswith='POS-').values_list('stock_actual', flat=True))
+
+    def test_id_venta_es_idempotente(self):
+        lineas = [{'codigo': 'POS-0', 'cantidad': 2}]
+        respuesta, es_nueva = registrar_venta('V-1', self.bodega.pk, lineas)
+        self.assertTrue(es_nueva)
+        self.assertEqual(registrar_venta('V-1', self.bodega.pk, lineas), (respuesta, False))
+        self.assertEqual(respuesta['saldos'], {'POS-0': 3})
+        self.assertEqual(Producto.objects.get(sku='POS-0').stock_actual, 3)
+
+    def test_stock_insuficiente_con_consultas_fijas(self):
+        # Validar el stock de la canasta cuesta lo mismo con 1 que con 10 líneas
+        consultas = []
+        for numero, cantidad_lineas in enumerate((1, 10)):
+            lineas = [{'codigo': f'POS-{i}', 'cantidad': 6 if i == 0 else 1} for i in range(cantidad_lineas)]
+            with CaptureQueriesContext(connection) as capturadas, self.assertRaisesMessage(ValidationError, 'Stock insuficiente'):
+                registrar_venta(f'V-{numero}', self.bodega.pk, lineas)
+            consultas.append(len(capturadas))
+        self.assertEqual(consultas[0], consultas[1])
+        self.assertEqual(self._stock(), [5] * 10)
+
+    def test_lineas_con_formato_invalido(self):
+        for lineas in ('POS-0', [['POS-0', 1]], [{'codigo': 'POS-0', 'cantidad': 0}]):
+            with self.subTest(lineas=lineas), self.assertRaises(ValidationError):
+                registrar_venta('V-X', self.bodega.pk, lineas)
+
+
+# -----------------------------------------------------------------
+# MÉTRICAS MULTIPROCESO Y ACCESO A /metrics
+# -----------------------------------------------------------------
+class MetricasMultiprocesoTests(SimpleTestCase):
+    PID_MUERTO = 2 ** 22 + 1  # sobre pid_max por defecto: nunca existe
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        ajuste = override_settings(METRICAS_DIR=self.directorio.name)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.registro = metricas.RegistroMetricas()
+        self.contador = self.registro.contador('ventas_total', 'Ventas.')
+
+    def _archivo(self, pid, valor):
+        ruta = os.path.join(self.directorio.name, f'metricas_{pid}_abc123.json')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump({'ventas_total': {'': valor}}, f)
+        return ruta
+
+    def test_consolida_procesos_muertos_sin_perder_conteos(self):
+        muerto = self._archivo(self.PID_MUERTO, 5)
+        vivo = self._archivo(os.getppid(), 2)
+        self.contador.inc(1)
+        for _ in range(2):  # la segunda lectura ya usa los finalizados
+            self.assertIn('ventas_total 8', self.registro.texto_prometheus())
+        self.assertFalse(os.path.exists(muerto))
+        self.assertTrue(os.path.exists(vivo))
+
+    def test_marcar_proceso_muerto(self):
+        # pid reciclado: sigue "vivo", pero gunicorn avisó que el worker murió
+        ruta = self._archivo(os.getppid(), 3)
+        self.registro.marcar_proceso_muerto(os.getppid())
+        self.assertFalse(os.path.exists(ruta))
+        self.assertIn('ventas_total 3', self.registro.texto_prometheus())
+
+
+class MetricasAccesoTests(SimpleTestCase):
+
+    @override_settings(METRICAS_TOKEN=None, METRICAS_IPS=['127.0.0.1'])
+    def test_sin_token_solo_loopback(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.9').status_code, 403)
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_con_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto').status_code, 200)
+
+
+# -----------------------------------------------------------------
+# COLA DE CORREOS: DESCARTADOS SIN CLAVES
+# -----------------------------------------------------------------
+class ColaCorreosTests(TestCase):
+
+    @override_settings(CORREO_MAX_INTENTOS=1)
+    def test_descartado_no_guarda_el_cuerpo(self):
+        correo.encolar('Clave temporal', 'Usuario: ana\nClave: s3cr3ta', ['ana@ejemplo.cl'])
+        conexion = mock.Mock()
+        conexion.send_messages.side_effect = OSError('SMTP caído')
+        self.assertEqual(correo.procesar_cola(conexion=conexion), (0, 1))
+        descartado = CorreoPendiente.objects.get()
+        self.assertEqual(descartado.estado, CorreoPendiente.Estados.FALLIDO)
+        self.assertEqual(descartado.cuerpo, '')
+        self.assertIn('SMTP caído', descartado.ultimo_error)
+
+
+# -----------------------------------------------------------------
+# DATOS SINTÉTICOS
+# -----------------------------------------------------------------
+class GenerarDatosTests(TestCase):
+
+    def test_ningun_saldo_por_bodega_negativo(self):
+        call_command('generar_datos', productos=20, movimientos=2000, bodegas=4, proveedores=3,
+                     categorias=2, marcas=2, stdout=StringIO())
+        self.assertTrue(StockBodega.objects.exists())
+        self.assertFalse(StockBodega.objects.filter(cantidad__lt=0).exists())
+
+
+# -----------------------------------------------------------------
+# BENCHMARK (smoke test con la configuración real de hosts)
+# -----------------------------------------------------------------
+class BenchmarkTests(TestCase):
+
+    @override_settings(ALLOWED_HOSTS=[], DEBUG=False)
+    def test_todos_los_escenarios_responden(self):
+        call_command('generar_datos', productos=10, movimientos=60, bodegas=2, proveedores=3,
+                     categorias=2, marcas=2, stdout=StringIO())
+        salida = StringIO()
+        call_command('benchmark', repeticiones=1, stdout=salida, stderr=StringIO())
+        escenarios = json.loads(salida.getvalue())['escenarios']
+        self.assertIn('registrar_movimiento', escenarios)
+        for nombre, medicion in escenarios.items():
+            with self.subTest(escenario=nombre):
+                self.assertEqual(medicion['status'], 302 if nombre == 'registrar_movimiento' else 200)
+
+
+# -----------------------------------------------------------------
+# FEED DE SINCRONIZACIÓN DEL CATÁLOGO
+# -----------------------------------------------------------------
+@override_settings(SYNC_MARGEN_SEGUNDOS=0)
+class SincronizacionTests(TestCase):
+
+    def setUp(self):
+        usuario = CustomUser.objects.create_user('dispositivo', password='x', rol=CustomUser.Roles.OPERADOR)
+        self.client.force_login(usuario)
+
+    def _crear_categorias(self, cantidad):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [Categoria.objects.create(nombre=f'Sync {i}') for i in range(cantidad)]
+
+    def _cursor_actual(self):
+        return CambioCatalogo.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    def test_cursor_pagina_los_cambios(self):
+        cursor = self._cursor_actual()
+        categorias = self._crear_categorias(5)
+
+        recibidas, paginas = [], 0
+        while True:
+            datos = sincronizacion.cambios_desde(cursor, limite=2)
+            recibidas += [fila[0] for fila in datos['cambios'].get('categoria', [])]
+            cursor, paginas = datos['cursor'], paginas + 1
+            if not datos['mas']:
+                break
+        self.assertEqual(paginas, 3)
+        self.assertEqual(recibidas, [c.pk for c in categorias])
+        self.assertEqual(sincronizacion.cambios_desde(cursor)['cambios'], {})
+
+    def test_guardar_y_eliminar_se_comprime_en_eliminados(self):
+        cursor = self._cursor_actual()
+        categoria, = self._crear_categorias(1)
+        pk = categoria.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            categoria.nombre = 'Renombrada'
+            categoria.save()
+            categoria.delete()
+
+        datos = sincronizacion.cambios_desde(cursor)
+        self.assertNotIn('categoria', datos['cambios'])
+        self.assertEqual(datos['eliminados'], {'categoria': [pk]})
+        self.assertFalse(datos['mas'])
+
+    @override_settings(SYNC_MARGEN_SEGUNDOS=60)
+    def test_margen_retiene_los_cambios_recientes(self):
+        cursor = self._cursor_actual()
+        self._crear_categorias(3)
+
+        datos = sincronizacion.cambios_desde(cursor, limite=2)
+        self.assertEqual(datos['cursor'], cursor)
+        self.assertEqual(datos['cambios'], {})
+        self.assertFalse(datos['mas'])
+
+    def test_snapshot_por_paginas(self):
+        categorias = self._crear_categorias(3)
+        producto = Producto.objects.create(sku='SYN-1', nombre='Sincronizado', categoria=categorias[0])
+        esperado = {
+            modelo: [fila[0] for fila in sincronizacion._filas(modelo)]
+            for modelo in sincronizacion.MODELOS
+        }
+        self.assertIn(producto.pk, esperado['producto'])
+
+        recibido, parametros, cortes = {}, {}, set()
+        while True:
+            respuesta = self.client.get(reverse('sync_catalogo'), {'limite': 2, **parametros})
+            datos = respuesta.json()
+            self.assertLessEqual(sum(len(filas) for filas in datos['cambios'].values()), 2)
+            for modelo, filas in datos['cambios'].items():
+                recibido.setdefault(modelo, []).extend(fila[0] for fila in filas)
+            cortes.add(datos['cursor'])
+            if not datos['mas']:
+                break
+            parametros = datos['siguiente']
+        self.assertEqual(recibido, {m: ids for m, ids in esperado.items() if ids})
+        self.assertEqual(len(cortes), 1)
+
+    def test_snapshot_modelo_desconocido(self):
+        respuesta = self.client.get(reverse('sync_catalogo'), {'modelo': 'cliente'})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+# -----------------------------------------------------------------
+# EVENTOS EN VIVO DE STOCK (SSE)
+# -----------------------------------------------------------------
+class StockEventosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bodega = Bodega.objects.create(nombre='Sala de ventas')
+        cls.producto = Producto.objects.create(sku='SSE-1', nombre='Chicle')
+        cls.usuario = CustomUser.objects.create_user('pantalla', password='x', rol=CustomUser.Roles.OPERADOR)
+
+    def _registrar_ingreso(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_movimientos([MovimientoInventario(producto=self.producto, bodega=self.bodega, tipo='IN', cantidad=7)])
+
+    async def _leer_evento(self, sondeo):
+        await self.async_client.aforce_login(self.usuario)
+        respuesta = await self.async_client.get(reverse('stock_eventos'), {'producto': self.producto.pk})
+        flujo = aiter(respuesta.streaming_content)
+        self.assertEqual(await anext(flujo), b'retry: 3000\n\n')
+        if sondeo:
+            # Que el sondeo lea el último id antes de registrar el movimiento
+            await asyncio.sleep(0.2)
+        await sync_to_async(self._registrar_ingreso)()
+        bloque = (await asyncio.wait_for(anext(flujo), timeout=5)).decode()
+
+        # El cliente se desconecta: el servidor ASGI cancela la lectura en curso
+        lectura = asyncio.ensure_future(anext(flujo))
+        await asyncio.sleep(0)
+        lectura.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await lectura
+        self.assertEqual(broker_stock.total_suscriptores, 0)
+        if sondeo:
+            # Sin suscriptores el sondeo termina solo
+            await asyncio.wait_for(broker_stock._sondeo, timeout=1)
+
+        self.assertTrue(bloque.startswith('event: stock\ndata: '))
+        return json.loads(bloque.split('data: ', 1)[1])
+
+    async def test_movimiento_llega_al_flujo(self):
+        evento = await self._leer_evento(sondeo=False)
+        self.assertEqual(evento['producto_id'], self.producto.pk)
+        self.assertEqual(evento['stock_actual'], 7)
+        self.assertEqual(evento['bodegas'], [self.bodega.pk])
+
+    async def test_sondeo_publica_una_sola_vez(self):
+        # Con EVENTOS_SONDEO el evento sale de la BD, no del on_commit
+        with self.settings(EVENTOS_SONDEO=0.05):
+            evento = await self._leer_evento(sondeo=True)
+        self.assertEqual(evento['stock_actual'], 7)
+        self.assertEqual(len(evento['movimientos']), 1)
+
+
+# -----------------------------------------------------------------
+# CACHÉ DE FRAGMENTOS (formularios de producto_list)
+# -----------------------------------------------------------------
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'tests-fragmentos'}})
+class FragmentosTests(TestCase):
+
+    CAMPOS = 'gestion/producto_form_campos.html'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = CustomUser.objects.create_superuser('root', password='x', rol=CustomUser.Roles.ROOT)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def _dibuja_campos(self):
+        respuesta = self.client.get(reverse('producto_list'))
+        self.assertEqual(respuesta.status_code, 200)
+        return self.CAMPOS in [plantilla.name for plantilla in respuesta.templates]
+
+    @override_settings(FRAGMENTOS_FORMULARIOS=True)
+    def test_fragmento_se_reusa_hasta_invalidar(self):
+        self.assertTrue(self._dibuja_campos())
+        self.assertFalse(self._dibuja_campos())
+        Categoria.objects.create(nombre='Gomitas')
+        self.assertTrue(self._dibuja_campos())
+        self.assertFalse(self._dibuja_campos())
+
+    @override_settings(FRAGMENTOS_FORMULARIOS=False)
+    def test_sin_cache_compartida_no_toca_la_cache(self):
+        self.assertTrue(self._dibuja_campos())
+        self.assertTrue(self._dibuja_campos())
+        self.assertIsNone(cache.get(fragmentos.CLAVE_VERSION))
+
+
+# -----------------------------------------------------------------
+# STRESS DE MOVIMIENTOS CONCURRENTES (hilos con conexiones propias)
+# -----------------------------------------------------------------
+class StressMovimientosTests(TransactionTestCase):
+
+    def _correr(self, **opciones):
+        salida = StringIO()
+        call_command('stress_movimientos', trabajadores=4, operaciones=15, en_bloque=True,
+                     transferencias=0.2, stdout=salida, stderr=StringIO(), **opciones)
+        return salida.getvalue()
+
+    def test_hilos_dejan_el_stock_consistente(self):
+        salida = self._correr()
+        self.assertIn('Stock consistente con el ledger.', salida)
+        self.assertFalse(Producto.todos.filter(sku__startswith='STRESS-').exists())
+
+    def test_inconsistencia_sale_con_codigo_1(self):
+        verificar = 'gestion.management.commands.stress_movimientos.Command._verificar'
+        with mock.patch(verificar, return_value=['Producto 1: descuadre.']):
+            with self.assertRaises(CommandError) as contexto:
+                self._correr()
+        self.assertEqual(contexto.exception.returncode, 1)
+
+
+# -----------------------------------------------------------------
+# CACHÉ DEL ESCÁNER POS
+# -----------------------------------------------------------------
+class CacheEscanerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bodega = Bodega.objects.create(nombre='Mostrador')
+        cls.producto = Producto.objects.create(sku='ESC-1', ean_upc='7800000000011', nombre='Alfajor')
+
+    def setUp(self):
+        cache_escaner.limpiar()
+        self.addCleanup(cache_escaner.limpiar)
+
+    def test_acierto_sin_consultas(self):
+        cache_escaner.cargar()
+        with self.assertNumQueries(0):
+            self.assertEqual(cache_escaner.buscar('7800000000011')['id'], self.producto.pk)
+            self.assertEqual(cache_escaner.buscar('ESC-1')['id'], self.producto.pk)
+
+    def test_fallo_se_recuerda_hasta_invalidar(self):
+        cache_escaner.cargar()
+        with self.assertNumQueries(2):
+            self.assertIsNone(cache_escaner.buscar('NO-EXISTE'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(cache_escaner.buscar('NO-EXISTE'))
+        nuevo = Producto.objects.create(sku='NO-EXISTE', nombre='Recién creado')
+        self.assertEqual(cache_escaner.buscar('NO-EXISTE')['id'], nuevo.pk)
+
+    def test_movimiento_invalida_el_stock(self):
+        self.assertEqual(cache_escaner.buscar('ESC-1')['stock_actual'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_movimientos([MovimientoInventario(producto=self.producto, bodega=self.bodega, tipo='IN', cantidad=9)])
+        self.assertEqual(cache_escaner.buscar('ESC-1')['stock_actual'], 9)
+
+    def test_ean_manda_sobre_sku(self):
+        # El SKU de uno coincide con el EAN de otro: con y sin precarga gana el EAN
+        otro = Producto.objects.create(sku='7800000000011-X', ean_upc='ESC-1', nombre='Confuso')
+        cache_escaner.cargar()
+        self.assertEqual(cache_escaner.buscar('ESC-1')['id'], otro.pk)
+        self.assertEqual(cache_escaner._buscar_en_bd('ESC-1')['id'], otro.pk)
+
+    def test_invalidacion_durante_la_consulta_no_se_pisa(self):
+        cache_escaner.cargar()
+        leer = cache_escaner._buscar_en_bd
+
+        def leer_e_invalidar(codigo):
+            resumen = leer(codigo)
+            # Un movimiento se confirma mientras la fila vieja está en vuelo
+            cache_escaner.invalidar(self.producto.pk, codigo)
+            return resumen
+
+        cache_escaner.invalidar(self.producto.pk)
+        with mock.patch.object(cache_escaner, '_buscar_en_bd', side_effect=leer_e_invalidar):
+            cache_escaner.buscar('ESC-1')
+        self.assertNotIn('ESC-1', cache_escaner._por_codigo)
@@ -0,0 +1,71 @@
+# En: gestion/transferencias.py
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from catalogo.models import Producto
+from .models import MovimientoInventario, ResumenDiarioMovimiento, StockBodega, Bodega, movimientos_registrados
+
+# -----------------------------------------------------------------
+# TRANSFERENCIAS ENTRE BODEGAS
+# -----------------------------------------------------------------
+# Una transferencia mueve N líneas de una bodega a otra en una sola
+# transacción: por cada línea se crea un par TR-S (origen) / TR-E (destino)
+# con el mismo doc_ref. Solo cambian los saldos por bodega (StockBodega);
+# Producto.stock_actual no se toca porque el total no cambia.
+
+
+def registrar_transferencia(origen_id, destino_id, lineas, doc_ref=None, observaciones=None):
+    """
+    Transfiere stock de la bodega `origen_id` a `destino_id`.
+    `lineas` es una lista de dicts con 'producto_id', 'cantidad' y 'lote' (opcional).
+    Devuelve el doc_ref de la transferencia.
+    """
+    if str(origen_id) == str(destino_id):
+        raise ValidationError("La bodega de origen y destino deben ser distintas.")
+    if not lineas:
+        raise ValidationError("La transferencia no trae líneas.")
+    bodegas = set(Bodega.objects.filter(pk__in=[origen_id, destino_id]).values_list('pk', flat=True))
+    if len(bodegas) != 2:
+        raise ValidationError("Bodega de origen o destino inexistente.")
+
+    cantidades = {}
+    for linea in lineas:
+        try:
+            producto_id, cantidad = int(linea['producto_id']), int(linea['cantidad'])
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(f"Línea inválida: {linea}")
+        if cantidad <= 0:
+            raise ValidationError(f"Línea inválida: {linea}")
+        cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+
+    ahora = timezone.now()
+    doc_ref = doc_ref or f"TR-{origen_id}-{destino_id}-{ahora:%Y%m%d%H%M%S%f}"
+    movimientos = []
+    for linea in lineas:
+        comunes = {
+            'producto_id': int(linea['producto_id']),
+            'cantidad': int(linea['cantidad']),
+            'lote': linea.get('lote') or None,
+            'fecha': ahora,
+            'doc_ref': doc_ref,
+            'observaciones': observaciones,
+        }
+        movimientos.append(MovimientoInventario(bodega_id=origen_id, tipo=MovimientoInventario.TipoMovimiento.TRANSFERENCIA_SALIDA, **comunes))
+        movimientos.append(MovimientoInventario(bodega_id=destino_id, tipo=MovimientoInventario.TipoMovimiento.TRANSFERENCIA_ENTRADA, **comunes))
+
+    with transaction.atomic():
+        rebajas = StockBodega.reservar_salidas(movimientos)
+        MovimientoInventario.objects.bulk_create(movimientos)
+        StockBodega.aplicar(movimientos)
+        StockBodega.verificar(rebajas)
+        ResumenDiarioMovimiento.acumular(movimientos)
+
+        # El stock global no cambia; se informa para los eventos en vivo
+        saldos = dict(Producto.todos.filter(pk__in=cantidades).values_list('pk', 'stock_actual'))
+        transaction.on_commit(
+            lambda: movimientos_registrados.send(sender=MovimientoInventario, movimientos=movimientos, saldos=saldos)
+        )
+
+    return doc_ref
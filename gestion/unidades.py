@@ -0,0 +1,88 @@
+# En: gestion/unidades.py
+
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+
+from .dependencias import cargar
+
+# -----------------------------------------------------------------
+# CONVERSIÓN DE UNIDADES AL REGISTRAR MOVIMIENTOS
+# -----------------------------------------------------------------
+# El stock se lleva en la unidad de venta del producto (uom_venta). Un
+# movimiento puede venir en la unidad de compra (ej: 10 CAJA): al
+# registrarlo se multiplica por factor_conversion (unidades de venta por
+# unidad de compra) y lo original queda en unidad/cantidad_documento.
+#
+# normalizar() convierte un documento completo de una vez con los datos de
+# producto que registrar_movimientos() ya leyó en su SELECT ... FOR UPDATE
+# (sin otra consulta ni una pasada por línea contra la base). El factor
+# tiene 2 decimales: se trabaja en centésimas enteras, y si el resultado no
+# es un número entero de unidades el documento se rechaza. Con documentos
+# grandes y NumPy instalado el producto se calcula vectorizado.
+
+LINEAS_PARA_NUMPY = 500
+# Alias para documentos de compra: "la unidad de compra de cada producto"
+# (la de stock si el producto no tiene unidad de compra)
+COMPRA = 'COMPRA'
+
+
+def _centesimas(factor):
+    # Solo un factor ausente vale 1: un 0 explícito queda en 0 (unidad no válida)
+    return int(Decimal(1 if factor is None else factor) * 100)
+
+
+def resolver(unidad, uom_compra, uom_venta, factor_conversion):
+    """
+    (unidad, centésimas de unidad de stock por unidad). Las centésimas son
+    None si la unidad no es ni la de compra ni la de venta del producto.
+    """
+    unidad = (unidad or '').strip().upper()
+    if unidad == COMPRA:
+        unidad = (uom_compra or uom_venta or '').upper()
+    if not unidad or unidad == (uom_venta or '').upper():
+        return unidad, 100
+    if unidad == (uom_compra or '').upper():
+        # Un factor en 0 (mal configurado) se trata como unidad no válida
+        return unidad, _centesimas(factor_conversion) or None
+    return unidad, None
+
+
+def normalizar(movimientos, unidades):
+    """
+    Pasa a la unidad de stock los movimientos que traen `unidad` y aún no
+    se convirtieron. `unidades` es {producto_id: (uom_compra, uom_venta,
+    factor_conversion)}. Modifica los movimientos en el lugar.
+    """
+    pendientes = [m for m in movimientos if m.unidad and m.cantidad_documento is None]
+    if not pendientes:
+        return
+
+    resueltas = [resolver(m.unidad, *unidades[m.producto_id]) for m in pendientes]
+    factores = [factor for _, factor in resueltas]
+    desconocidas = sorted({(m.producto_id, m.unidad) for m, f in zip(pendientes, factores) if f is None})
+    if desconocidas:
+        detalle = ", ".join(f"producto {pk}: {unidad}" for pk, unidad in desconocidas[:20])
+        raise ValidationError(f"Unidad no corresponde al producto ({detalle}).")
+
+    cantidades = [m.cantidad for m in pendientes]
+    np = cargar('numpy') if len(pendientes) >= LINEAS_PARA_NUMPY else None
+    if np is not None:
+        centesimas = np.asarray(cantidades, dtype=np.int64) * np.asarray(factores, dtype=np.int64)
+        fraccionarias = np.flatnonzero(centesimas % 100).tolist()
+        convertidas = (centesimas // 100).tolist()
+    else:
+        centesimas = [c * f for c, f in zip(cantidades, factores)]
+        fraccionarias = [i for i, c in enumerate(centesimas) if c % 100]
+        convertidas = [c // 100 for c in centesimas]
+
+    if fraccionarias:
+        detalle = ", ".join(
+            f"producto {pendientes[i].producto_id}: {cantidades[i]} {resueltas[i][0]}" for i in fraccionarias[:20]
+        )
+        raise ValidationError(f"La conversión no da unidades enteras ({detalle}).")
+
+    for movimiento, (unidad, _), cantidad in zip(pendientes, resueltas, convertidas):
+        movimiento.unidad = unidad
+        movimiento.cantidad_documento = movimiento.cantidad
+        movimiento.cantidad = cantidad
@@ -11,6 +11,7 @@ urlpatterns = [
     path('productos/editar/<str:sku>/', views.producto_update, name='producto_update'),
     path('productos/eliminar/<str:sku>/', views.producto_delete, name='producto_delete'),
     path('productos/exportar/', views.exportar_productos_excel, name='exportar_productos_excel'),
+    path('productos/precios/', views.precios_masivos, name='precios_masivos'),
 
     # CRUD de Proveedores
     path('proveedores/', views.proveedor_list, name='proveedor_list'),
@@ -21,9 +22,32 @@ urlpatterns = [
     # Inventario
     path('inventario/', views.inventario_list, name='inventario_list'),
     path('inventario/exportar/', views.exportar_inventario_excel, name='exportar_inventario_excel'),
+    path('inventario/transferir/', views.transferencia_nueva, name='transferencia_nueva'),
+    path('inventario/recepcion/', views.recepcion_nueva, name='recepcion_nueva'),
+    path('inventario/eventos/', views.stock_eventos, name='stock_eventos'),
+    path('inventario/kpis/', views.inventario_kpis, name='inventario_kpis'),
+    path('inventario/valorizacion/exportar/', views.exportar_valorizacion_excel, name='exportar_valorizacion_excel'),
+    path('inventario/abc/exportar/', views.exportar_abc_excel, name='exportar_abc_excel'),
+
+    # Conteo físico de inventario
+    path('conteos/', views.conteo_list, name='conteo_list'),
+    path('conteos/<int:pk>/', views.conteo_detalle, name='conteo_detalle'),
+    path('conteos/<int:pk>/escanear/', views.conteo_escanear, name='conteo_escanear'),
+    path('conteos/<int:pk>/contabilizar/', views.conteo_contabilizar, name='conteo_contabilizar'),
+
+    # Punto de Venta (POS)
+    path('pos/escanear/<str:codigo>/', views.escanear_codigo, name='escanear_codigo'),
+    path('pos/ventas/', views.registrar_venta_pos, name='registrar_venta_pos'),
+
+    # Snapshot analítico
+    path('snapshot/<str:tabla>.csv.gz', views.snapshot_tabla, name='snapshot_tabla'),
+
+    # Sincronización de dispositivos
+    path('sync/', views.sync_catalogo, name='sync_catalogo'),
     
     # CRUD de Usuarios
     path('usuarios/', views.user_list, name='user_list'),
+    path('usuarios/importar/', views.user_importar, name='user_importar'),
     path('usuarios/editar/<int:pk>/', views.user_update, name='user_update'),
     path('usuarios/eliminar/<int:pk>/', views.user_delete, name='user_delete'),
     path('usuarios/exportar/', views.exportar_usuarios_excel, name='exportar_usuarios_excel'),
@@ -0,0 +1,141 @@
+# En: gestion/usuarios.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from .models import CustomUser
+from .conteos import leer_filas
+from .correo import encolar_varios
+from .utils import generar_password_robusta
+
+# -----------------------------------------------------------------
+# ALTA MASIVA DE USUARIOS (planilla CSV/XLSX)
+# -----------------------------------------------------------------
+# Columnas: username, email, first_name, last_name, telefono, rol, estado.
+# Lo caro de crear un usuario es el hash de la clave (PBKDF2 a fuerza
+# completa, a propósito). Para cientos de usuarios:
+#   1. Se valida TODA la planilla antes de tocar la base (todo o nada).
+#   2. Las claves temporales se hashean repartidas en un pool de procesos.
+#   3. Los usuarios entran con un bulk_create y los correos con la clave
+#      se encolan de una vez (ver correo.py), en la misma transacción.
+
+CLAVES_POR_TANDA = 50
+# Con menos usuarios no compensa levantar procesos
+MINIMO_PARA_POOL = 20
+
+ASUNTO_BIENVENIDA = 'Bienvenido - Clave Temporal'
+
+
+def _hashear(claves):
+    return [make_password(clave) for clave in claves]
+
+
+def _iniciar_proceso():
+    # Con 'spawn' (Windows/macOS) el proceso hijo parte sin Django configurado
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def hashear_claves(claves, procesos=None):
+    """Hashes de `claves` (mismo orden), repartidos en un pool de procesos."""
+    tandas = [claves[i:i + CLAVES_POR_TANDA] for i in range(0, len(claves), CLAVES_POR_TANDA)]
+    procesos = min(procesos or os.cpu_count() or 1, len(tandas))
+    if procesos <= 1 or len(claves) < MINIMO_PARA_POOL:
+        return _hashear(claves)
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso) as pool:
+        return [hash_ for tanda in pool.map(_hashear, tandas) for hash_ in tanda]
+
+
+def _texto(fila, columna):
+    return str(fila.get(columna) or '').strip()
+
+
+def _validar(filas):
+    """Lista de dicts listos para CustomUser(**datos). Junta todos los errores."""
+    roles = {valor: valor for valor in CustomUser.Roles.values}
+    roles.update({etiqueta.upper(): valor for valor, etiqueta in CustomUser.Roles.choices})
+    estados = {valor: valor for valor in CustomUser.Estados.values}
+    estados.update({etiqueta.upper(): valor for valor, etiqueta in CustomUser.Estados.choices})
+
+    usuarios, errores, vistos = [], [], set()
+    for numero, fila in enumerate(filas, start=2):
+        if not any(_texto(fila, c) for c in fila):
+            continue
+        username = _texto(fila, 'username')
+        email = _texto(fila, 'email')
+        rol = roles.get(_texto(fila, 'rol').upper() or CustomUser.Roles.OPERADOR)
+        estado = estados.get(_texto(fila, 'estado').upper() or CustomUser.Estados.ACTIVO)
+        # Campos con error propio: el full_clean de abajo no los repite
+        revisados = ['password']
+        if not username:
+            errores.append(f"Fila {numero}: falta el username.")
+            revisados.append('username')
+        elif username.lower() in vistos:
+            errores.append(f"Fila {numero}: el username '{username}' está repetido en la planilla.")
+        vistos.add(username.lower())
+        try:
+            validate_email(email)
+        except ValidationError:
+            errores.append(f"Fila {numero}: email inválido ({email or 'vacío'}).")
+            revisados.append('email')
+        if rol is None:
+            errores.append(f"Fila {numero}: rol desconocido ({_texto(fila, 'rol')}).")
+            revisados.append('rol')
+        if estado is None:
+            errores.append(f"Fila {numero}: estado desconocido ({_texto(fila, 'estado')}).")
+            revisados.append('estado')
+        datos = {
+            'username': username, 'email': email, 'rol': rol, 'estado': estado,
+            'first_name': _texto(fila, 'first_name') or _texto(fila, 'nombre'),
+            'last_name': _texto(fila, 'last_name') or _texto(fila, 'apellido'),
+            'telefono': _texto(fila, 'telefono') or None,
+        }
+        # Validadores y largos del modelo (bulk_create no los aplica). La
+        # unicidad se revisa abajo para toda la planilla en una consulta.
+        try:
+            CustomUser(**datos).full_clean(exclude=revisados, validate_unique=False)
+        except ValidationError as e:
+            errores += [
+                f"Fila {numero}: {CustomUser._meta.get_field(campo).verbose_name}: {mensaje}"
+                if campo != NON_FIELD_ERRORS else f"Fila {numero}: {mensaje}"
+                for campo, mensajes in e.message_dict.items() for mensaje in mensajes
+            ]
+        usuarios.append(datos)
+
+    # Una sola consulta para los que ya existen (username sin distinguir mayúsculas)
+    existentes = set(
+        CustomUser.objects.annotate(u=Lower('username'))
+        .filter(u__in=[datos['username'].lower() for datos in usuarios]).values_list('u', flat=True)
+    )
+    errores += [f"El usuario '{datos['username']}' ya existe." for datos in usuarios if datos['username'].lower() in existentes]
+    if errores:
+        raise ValidationError(errores[:20] + ([f"... y {len(errores) - 20} errores más."] if len(errores) > 20 else []))
+    return usuarios
+
+
+def importar_usuarios(archivo, procesos=None):
+    """Crea los usuarios de la planilla y encola sus claves temporales. Devuelve cuántos creó."""
+    usuarios = _validar(leer_filas(archivo))
+    if not usuarios:
+        raise ValidationError("La planilla no trae usuarios.")
+
+    claves = [generar_password_robusta() for _ in usuarios]
+    hashes = hashear_claves(claves, procesos)
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(
+            [CustomUser(password=hash_, **datos) for datos, hash_ in zip(usuarios, hashes)], batch_size=500,
+        )
+        encolar_varios([
+            (ASUNTO_BIENVENIDA, f"Usuario: {datos['username']}\nClave: {clave}", [datos['email']])
+            for datos, clave in zip(usuarios, claves)
+        ])
+    return len(usuarios)
@@ -0,0 +1,13 @@
+# En: gestion/utils.py
+
+import secrets
+import string
+
+
+def generar_password_robusta(largo=10):
+    """Clave temporal con al menos una minúscula, una mayúscula y un dígito."""
+    alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
+    while True:
+        password = ''.join(secrets.choice(alphabet) for i in range(largo))
+        if (any(c.islower() for c in password) and any(c.isupper() for c in password) and any(c.isdigit() for c in password)):
+            return password
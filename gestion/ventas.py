@@ -0,0 +1,106 @@
+# En: gestion/ventas.py
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from catalogo.models import Producto
+from .models import MovimientoInventario, VentaPOS, Bodega
+from .movimientos import registrar_movimientos
+
+
+# -----------------------------------------------------------------
+# INGRESO DE VENTAS DESDE CAJA (POS)
+# -----------------------------------------------------------------
+# Una venta = una canasta de líneas {codigo, cantidad}. Cada venta se
+# registra completa o no se registra (una transacción por venta), y el
+# id_venta que manda la caja la hace idempotente: si la caja reintenta,
+# devolvemos la respuesta original sin volver a descontar stock.
+
+def resolver_codigos(codigos):
+    # Una sola consulta para todos los códigos (EAN/UPC o SKU) de la canasta
+    productos = Producto.objects.filter(Q(ean_upc__in=codigos) | Q(sku__in=codigos)).values_list('pk', 'sku', 'ean_upc')
+    por_codigo = {}
+    for pk, sku, ean in productos:
+        por_codigo[sku] = (pk, sku)
+        if ean:
+            por_codigo[ean] = (pk, sku)
+    return por_codigo
+
+
+def registrar_venta(id_venta, bodega_id, lineas, usuario=None):
+    """
+    Registra una venta y devuelve (respuesta, es_nueva).
+    `lineas` es una lista de dicts con 'codigo' (EAN o SKU) y 'cantidad'.
+    """
+    id_venta = str(id_venta or '').strip()
+    if not id_venta:
+        raise ValidationError("La venta no trae id_venta.")
+    if not lineas:
+        raise ValidationError(f"La venta {id_venta} no trae líneas.")
+    # El JSON de la caja puede traer cualquier cosa: sin esto un str o un int
+    # en 'lineas' terminaba en AttributeError (500) en vez de un error por venta
+    if not isinstance(lineas, list):
+        raise ValidationError(f"Las líneas de la venta {id_venta} deben ser una lista.")
+
+    previa = VentaPOS.objects.filter(id_venta=id_venta).values_list('respuesta', flat=True).first()
+    if previa is not None:
+        return previa, False
+
+    try:
+        bodega = Bodega.objects.get(pk=bodega_id)
+    except (Bodega.DoesNotExist, ValueError, TypeError):
+        raise ValidationError(f"Bodega {bodega_id} no existe.")
+
+    cantidades = {}
+    for linea in lineas:
+        if not isinstance(linea, dict):
+            raise ValidationError(f"Línea inválida en venta {id_venta}: {linea}")
+        codigo = str(linea.get('codigo', '')).strip()
+        try:
+            cantidad = int(linea.get('cantidad', 0))
+        except (TypeError, ValueError):
+            cantidad = 0
+        if not codigo or cantidad <= 0:
+            raise ValidationError(f"Línea inválida en venta {id_venta}: {linea}")
+        cantidades[codigo] = cantidades.get(codigo, 0) + cantidad
+
+    por_codigo = resolver_codigos(list(cantidades))
+    desconocidos = [c for c in cantidades if c not in por_codigo]
+    if desconocidos:
+        raise ValidationError(f"Códigos no encontrados: {', '.join(desconocidos)}")
+
+    fecha = timezone.now()
+    doc_ref = f"POS-{id_venta}"[:100]
+    movimientos = [
+        MovimientoInventario(
+            producto_id=por_codigo[codigo][0],
+            tipo=MovimientoInventario.TipoMovimiento.SALIDA,
+            cantidad=cantidad,
+            bodega=bodega,
+            fecha=fecha,
+            doc_ref=doc_ref,
+        )
+        for codigo, cantidad in cantidades.items()
+    ]
+    sku_por_id = {pk: sku for pk, sku in por_codigo.values()}
+
+    try:
+        with transaction.atomic():
+            # El INSERT con id_venta único es el candado contra dobles envíos concurrentes
+            venta = VentaPOS.objects.create(id_venta=id_venta, bodega=bodega, usuario=usuario, fecha=fecha)
+            saldos = registrar_movimientos(movimientos)
+            venta.respuesta = {
+                'id_venta': id_venta,
+                'fecha': fecha.isoformat(),
+                'saldos': {sku_por_id[pk]: saldo for pk, saldo in saldos.items()},
+            }
+            venta.save(update_fields=['respuesta'])
+    except IntegrityError:
+        previa = VentaPOS.objects.filter(id_venta=id_venta).values_list('respuesta', flat=True).first()
+        if previa is None:
+            raise
+        return previa, False
+
+    return venta.respuesta, True
@@ -1,48 +1,67 @@
 # En: gestion/views.py
 
-from django.http import HttpResponse
+import hmac
+import json
+import time
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from django.views.decorators.gzip import gzip_page
 from django.contrib import messages
 from django.db.models import Sum, Count, Q
 from django.core.paginator import Paginator
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from django.core.mail import send_mail
 from django.conf import settings
-from openpyxl import Workbook
 
 # Modelos
 from catalogo.models import Producto, Categoria, Marca
-from .models import Proveedor, MovimientoInventario, CustomUser, Bodega
+from .models import Proveedor, MovimientoInventario, CustomUser, Bodega, ConteoInventario
+from .escaner import cache_escaner
+from .ventas import registrar_venta
+from . import sincronizacion
+from .eventos import broker_stock
+from .kpis import kpis_inventario, akpis_inventario, datos_dashboard
+from .reportes import valorizacion_stock, clasificacion_abc, DIAS_ABC
+from . import conteos
+from .transferencias import registrar_transferencia
+from .movimientos import registrar_movimientos
+from .archivo import historial
+from . import snapshot
+from .correo import encolar as encolar_correo
+from .usuarios import importar_usuarios
+from .autenticacion import cerrar_sesiones, ip_de
+from .proveedores import con_fichas, con_productos, con_proveedores
+from . import precios
+from .permisos import requiere_permiso, VER, REGISTRAR, EXPORTAR, ADMINISTRAR
+from . import metricas
+from .dependencias import cargar
 
 # Formularios
 from .forms import (
     ProductoForm, ProveedorForm, MovimientoForm, 
     CustomUserCreationForm, CustomUserChangeForm, 
-    CategoriaForm, MarcaForm, BodegaForm
+    CategoriaForm, MarcaForm, BodegaForm,
+    ConteoInventarioForm, CargaConteoForm, TransferenciaForm, CargaUsuariosForm,
+    ActualizacionPreciosForm, RecepcionForm,
 )
 
-# Utilidad para contraseñas (Crea gestion/utils.py si no existe con la función generar_password_robusta)
-try:
-    from .utils import generar_password_robusta
-except ImportError:
-    # Fallback por si no tienes el archivo utils.py
-    import secrets
-    import string
-    def generar_password_robusta():
-        alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
-        while True:
-            password = ''.join(secrets.choice(alphabet) for i in range(10))
-            if (any(c.islower() for c in password) and any(c.isupper() for c in password) and any(c.isdigit() for c in password)):
-                return password
+# Utilidad para contraseñas
+from .utils import generar_password_robusta
 
 # ----------------------------------------------
 # VISTA DE INICIO
 # ----------------------------------------------
 @login_required 
 def inicio_gestion(request):
-    return render(request, 'gestion/inicio_gestion.html')
+    # ?dias=365 para ver los últimos 12 meses
+    try:
+        dias = min(max(int(request.GET.get('dias', 30)), 1), 366)
+    except ValueError:
+        dias = 30
+    return render(request, 'gestion/inicio_gestion.html', {'dashboard': datos_dashboard(dias)})
 
 # ----------------------------------------------
 # CRUD DE PRODUCTOS
@@ -60,20 +79,61 @@ def producto_list(request):
     else:
         form = ProductoForm()
 
-    # Búsqueda y Paginación
+    # Búsqueda, orden y Paginación (el precio c/IVA se ordena y filtra en SQL)
     query = request.GET.get('q', '')
-    productos_list = Producto.objects.all().order_by('nombre')
-    
-    if query:
-        productos_list = productos_list.filter(Q(nombre__icontains=query) | Q(sku__icontains=query))
+    productos_list, orden = _filtrar_productos(request, con_proveedores(Producto.objects.all()))
 
     paginator = Paginator(productos_list, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    context = {'form': form, 'page_obj': page_obj, 'query': query}
+    context = {
+        'form': form, 'page_obj': page_obj, 'query': query, 'orden': orden,
+        'precio_min': request.GET.get('precio_min', ''), 'precio_max': request.GET.get('precio_max', ''),
+        'filtros': _sin_pagina(request),
+    }
     return render(request, 'gestion/producto_list.html', context)
 
+ORDENES_PRODUCTO = ('nombre', '-nombre', 'sku', '-sku', 'precio_venta', '-precio_venta', 'precio_con_iva', '-precio_con_iva', 'stock_actual', '-stock_actual')
+
+def _filtrar_productos(request, productos, orden_por_defecto='nombre'):
+    # Común al listado y la exportación: ?q=, ?orden= y ?precio_min=/?precio_max= (precio c/IVA)
+    productos = productos.con_precio_con_iva()
+    query = request.GET.get('q', '')
+    if query:
+        productos = productos.filter(Q(nombre__icontains=query) | Q(sku__icontains=query))
+    for parametro, lookup in (('precio_min', 'precio_con_iva__gte'), ('precio_max', 'precio_con_iva__lte')):
+        valor = request.GET.get(parametro, '')
+        if valor.isdigit():
+            productos = productos.filter(**{lookup: int(valor)})
+    orden = request.GET.get('orden', orden_por_defecto)
+    if orden not in ORDENES_PRODUCTO:
+        orden = orden_por_defecto
+    return productos.order_by(orden, 'pk'), orden
+
+def _sin_pagina(request):
+    parametros = request.GET.copy()
+    parametros.pop('page', None)
+    return parametros.urlencode()
+
+@login_required
+@requiere_permiso(REGISTRAR)
+def precios_masivos(request):
+    previa = None
+    if request.method == 'POST':
+        form = ActualizacionPreciosForm(request.POST)
+        if form.is_valid():
+            datos = form.cleaned_data
+            productos = precios.productos_afectados(datos['categoria'], datos['marca'], datos['proveedor'])
+            if request.POST.get('accion') == 'aplicar':
+                actualizados = precios.aplicar(productos, datos['campo'], datos['modo'], datos['valor'])
+                messages.success(request, f'{precios.CAMPOS[datos["campo"]]} actualizado en {actualizados} productos.')
+                return redirect('producto_list')
+            previa = precios.vista_previa(productos, datos['campo'], datos['modo'], datos['valor'])
+    else:
+        form = ActualizacionPreciosForm()
+    return render(request, 'gestion/precios_masivos.html', {'form': form, 'previa': previa})
+
 @login_required
 def producto_update(request, sku):
     producto = get_object_or_404(Producto, sku=sku)
@@ -88,13 +148,12 @@ def producto_update(request, sku):
     return render(request, 'gestion/producto_form_edit.html', {'form': form, 'producto': producto})
 
 @login_required
+@requiere_permiso(REGISTRAR)
 def producto_delete(request, sku):
+    # Baja lógica: el historial queda; el borrado físico es manage.py purgar_eliminados
     producto = get_object_or_404(Producto, sku=sku)
-    try:
-        producto.delete()
-        messages.success(request, f'Producto {sku} eliminado.')
-    except Exception as e:
-        messages.error(request, f'No se puede eliminar. Error: {e}')
+    producto.dar_de_baja()
+    messages.success(request, f'Producto {sku} eliminado.')
     return redirect('producto_list')
 
 # ----------------------------------------------
@@ -114,9 +173,11 @@ def proveedor_list(request):
         form = ProveedorForm()
 
     query = request.GET.get('q', '')
-    proveedores_list = Proveedor.objects.all().order_by('razon_social')
+    proveedores_list = con_productos(Proveedor.objects.all()).order_by('razon_social')
     if query:
         proveedores_list = proveedores_list.filter(Q(razon_social__icontains=query) | Q(rut_nif__icontains=query))
+    # Ficha de desempeño (productos, última entrega, volumen, % a tiempo) sin una consulta por fila
+    proveedores_list = con_fichas(proveedores_list)
 
     # Usamos 'proveedores' en el contexto para simplificar si no usas paginator aquí,
     # pero idealmente usa Paginator igual que en productos.
@@ -137,24 +198,20 @@ def proveedor_update(request, rut_nif):
     return render(request, 'gestion/proveedor_form_edit.html', {'form': form, 'proveedor': proveedor})
 
 @login_required
+@requiere_permiso(REGISTRAR)
 def proveedor_delete(request, rut_nif):
+    # Baja lógica: el historial queda; el borrado físico es manage.py purgar_eliminados
     proveedor = get_object_or_404(Proveedor, rut_nif=rut_nif)
-    try:
-        proveedor.delete()
-        messages.success(request, 'Proveedor eliminado.')
-    except:
-        messages.error(request, 'No se puede eliminar, tiene datos asociados.')
+    proveedor.dar_de_baja()
+    messages.success(request, 'Proveedor eliminado.')
     return redirect('proveedor_list')
 
 # ----------------------------------------------
 # CRUD DE USUARIOS (Solo Admin/Root)
 # ----------------------------------------------
 @login_required
+@requiere_permiso(ADMINISTRAR)
 def user_list(request):
-    if request.user.rol not in [CustomUser.Roles.ROOT, CustomUser.Roles.ADMIN]:
-        messages.error(request, "No tienes permisos para gestionar usuarios.")
-        return redirect('inicio_gestion')
-
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
         if form.is_valid():
@@ -164,15 +221,13 @@ def user_list(request):
             user.debe_cambiar_clave = True
             user.save()
             
-            # Enviar correo (consola)
-            send_mail(
+            # Se encola; lo envía el worker: manage.py procesar_correos
+            encolar_correo(
                 'Bienvenido - Clave Temporal',
                 f'Usuario: {user.username}\nClave: {temp_pass}',
-                settings.DEFAULT_FROM_EMAIL,
                 [user.email],
-                fail_silently=True
             )
-            messages.success(request, f'Usuario creado. Clave enviada al correo.')
+            messages.success(request, f'Usuario creado. La clave se enviará al correo en unos momentos.')
             return redirect('user_list')
         else:
             messages.error(request, 'Error al crear usuario.')
@@ -180,21 +235,39 @@ def user_list(request):
         form = CustomUserCreationForm()
 
     query = request.GET.get('q', '')
-    users = CustomUser.objects.exclude(pk=request.user.pk).order_by('username')
+    users = CustomUser.objects.exclude(pk=request.user.pk).annotate(
+        sesiones_activas=Count('sesiones', filter=Q(sesiones__expira__gt=timezone.now()))
+    ).order_by('username')
     if query:
         users = users.filter(username__icontains=query)
 
-    return render(request, 'gestion/user_list.html', {'form': form, 'usuarios': users})
+    return render(request, 'gestion/user_list.html', {'form': form, 'form_carga': CargaUsuariosForm(), 'usuarios': users})
+
+@login_required
+@require_POST
+@requiere_permiso(ADMINISTRAR)
+def user_importar(request):
+    form = CargaUsuariosForm(request.POST, request.FILES)
+    if form.is_valid():
+        try:
+            creados = importar_usuarios(form.cleaned_data['archivo'])
+            messages.success(request, f'{creados} usuarios creados. Las claves se enviarán a sus correos.')
+        except ValidationError as e:
+            messages.error(request, ' '.join(e.messages))
+    else:
+        messages.error(request, ' '.join(form.errors.get('archivo', ['Archivo inválido.'])))
+    return redirect('user_list')
 
 @login_required
+@requiere_permiso(ADMINISTRAR)
 def user_update(request, pk):
-    if request.user.rol not in [CustomUser.Roles.ROOT, CustomUser.Roles.ADMIN]:
-        return redirect('inicio_gestion')
     user_to_edit = get_object_or_404(CustomUser, pk=pk)
     if request.method == 'POST':
         form = CustomUserChangeForm(request.POST, instance=user_to_edit)
         if form.is_valid():
-            form.save()
+            usuario = form.save()
+            if 'estado' in form.changed_data and usuario.estado == CustomUser.Estados.BLOQUEADO:
+                cerrar_sesiones(usuario)
             messages.success(request, 'Usuario actualizado.')
             return redirect('user_list')
     else:
@@ -202,9 +275,8 @@ def user_update(request, pk):
     return render(request, 'gestion/user_form_edit.html', {'form': form, 'usuario_editado': user_to_edit})
 
 @login_required
+@requiere_permiso(ADMINISTRAR)
 def user_delete(request, pk):
-    if request.user.rol not in [CustomUser.Roles.ROOT, CustomUser.Roles.ADMIN]:
-        return redirect('inicio_gestion')
     user_to_delete = get_object_or_404(CustomUser, pk=pk)
     if user_to_delete.rol == CustomUser.Roles.ROOT:
         messages.error(request, 'No se puede eliminar al ROOT.')
@@ -246,6 +318,7 @@ def categoria_update(request, pk):
     return render(request, 'gestion/categoria_marca_form_edit.html', {'form': form, 'item': item, 'titulo': 'Categoría', 'lista_url': 'categoria_list'})
 
 @login_required
+@requiere_permiso(REGISTRAR)
 def categoria_delete(request, pk):
     item = get_object_or_404(Categoria, pk=pk)
     try:
@@ -288,6 +361,7 @@ def marca_update(request, pk):
     return render(request, 'gestion/categoria_marca_form_edit.html', {'form': form, 'item': item, 'titulo': 'Marca', 'lista_url': 'marca_list'})
 
 @login_required
+@requiere_permiso(REGISTRAR)
 def marca_delete(request, pk):
     item = get_object_or_404(Marca, pk=pk)
     try:
@@ -301,11 +375,8 @@ def marca_delete(request, pk):
 # CRUD DE BODEGAS (¡EL QUE FALTABA!)
 # ----------------------------------------------
 @login_required
+@requiere_permiso(ADMINISTRAR)
 def bodega_list(request):
-    if request.user.rol not in [CustomUser.Roles.ROOT, CustomUser.Roles.ADMIN]:
-        messages.error(request, "Acceso denegado.")
-        return redirect('inicio_gestion')
-
     if request.method == 'POST':
         form = BodegaForm(request.POST)
         if form.is_valid():
@@ -319,8 +390,8 @@ def bodega_list(request):
     return render(request, 'gestion/categoria_marca_list.html', {'form': form, 'items': items, 'titulo': 'Bodegas'})
 
 @login_required
+@requiere_permiso(ADMINISTRAR)
 def bodega_update(request, pk):
-    if request.user.rol not in [CustomUser.Roles.ROOT, CustomUser.Roles.ADMIN]: return redirect('inicio_gestion')
     item = get_object_or_404(Bodega, pk=pk)
     if request.method == 'POST':
         form = BodegaForm(request.POST, instance=item)
@@ -332,8 +403,8 @@ def bodega_update(request, pk):
     return render(request, 'gestion/categoria_marca_form_edit.html', {'form': form, 'item': item, 'titulo': 'Bodega', 'lista_url': 'bodega_list'})
 
 @login_required
+@requiere_permiso(ADMINISTRAR)
 def bodega_delete(request, pk):
-    if request.user.rol not in [CustomUser.Roles.ROOT, CustomUser.Roles.ADMIN]: return redirect('inicio_gestion')
     item = get_object_or_404(Bodega, pk=pk)
     try:
         item.delete()
@@ -362,12 +433,7 @@ def inventario_list(request):
     else:
         form = MovimientoForm()
 
-    today = timezone.now().date()
-    kpis = {
-        'movimientos_hoy': MovimientoInventario.objects.filter(fecha__date=today).count(),
-        'stock_total': Producto.objects.aggregate(total=Sum('stock_actual'))['total'] or 0,
-        'productos_unicos': Producto.objects.count()
-    }
+    kpis = kpis_inventario()
 
     query = request.GET.get('q', '')
     movimientos = MovimientoInventario.objects.all().select_related('producto', 'proveedor', 'bodega').order_by('-fecha')
@@ -376,45 +442,324 @@ def inventario_list(request):
 
     return render(request, 'gestion/inventario_list.html', {'form': form, 'kpis': kpis, 'movimientos': movimientos[:50]})
 
+@login_required
+@requiere_permiso(VER, json=True)
+async def inventario_kpis(request):
+    # Solo lectura, para pantallas de bodega que refrescan los KPIs sin recargar la página
+    return JsonResponse(await akpis_inventario())
+
+@login_required
+def transferencia_nueva(request):
+    if request.method == 'POST':
+        form = TransferenciaForm(request.POST)
+        if form.is_valid():
+            datos = form.cleaned_data
+            try:
+                doc_ref = registrar_transferencia(
+                    datos['origen'].pk, datos['destino'].pk, datos['lineas'],
+                    doc_ref=datos['doc_ref'] or None, observaciones=datos['observaciones'] or None,
+                )
+                messages.success(request, f'Transferencia {doc_ref} registrada ({len(datos["lineas"])} líneas).')
+                return redirect('inventario_list')
+            except ValidationError as e:
+                messages.error(request, f"Error: {' '.join(e.messages)}")
+    else:
+        form = TransferenciaForm()
+    return render(request, 'gestion/transferencia_form.html', {'form': form})
+
+@login_required
+def recepcion_nueva(request):
+    # Documento de compra completo, en unidades de compra: se convierte y registra en un solo bloque
+    if request.method == 'POST':
+        form = RecepcionForm(request.POST)
+        if form.is_valid():
+            datos = form.cleaned_data
+            movimientos = [
+                MovimientoInventario(
+                    producto_id=linea['producto_id'], tipo=MovimientoInventario.TipoMovimiento.INGRESO,
+                    cantidad=linea['cantidad'], unidad=linea['unidad'], lote=linea['lote'] or None,
+                    proveedor=datos['proveedor'], bodega=datos['bodega'], doc_ref=datos['doc_ref'] or None,
+                    fecha_comprometida=datos['fecha_comprometida'],
+                )
+                for linea in datos['lineas']
+            ]
+            try:
+                registrar_movimientos(movimientos)
+                unidades = sum(m.cantidad for m in movimientos)
+                messages.success(request, f'Recepción registrada ({len(movimientos)} líneas, {unidades} unidades de stock).')
+                return redirect('inventario_list')
+            except ValidationError as e:
+                messages.error(request, f"Error: {' '.join(e.messages)}")
+    else:
+        form = RecepcionForm()
+    return render(request, 'gestion/recepcion_form.html', {'form': form})
+
+# ----------------------------------------------
+# CONTEO FÍSICO DE INVENTARIO
+# ----------------------------------------------
+@login_required
+@requiere_permiso(ADMINISTRAR)
+def conteo_list(request):
+    if request.method == 'POST':
+        form = ConteoInventarioForm(request.POST)
+        if form.is_valid():
+            conteo = form.save(commit=False)
+            conteo.usuario = request.user
+            conteo.save()
+            messages.success(request, 'Conteo creado. Carga el archivo o usa el escáner.')
+            return redirect('conteo_detalle', pk=conteo.pk)
+    else:
+        form = ConteoInventarioForm()
+
+    items = ConteoInventario.objects.select_related('bodega', 'usuario').annotate(total_lineas=Count('lineas'))
+    return render(request, 'gestion/conteo_list.html', {'form': form, 'items': items})
+
+@login_required
+@requiere_permiso(ADMINISTRAR)
+def conteo_detalle(request, pk):
+    conteo = get_object_or_404(ConteoInventario.objects.select_related('bodega'), pk=pk)
+
+    # Las diferencias se recalculan al cargar o a pedido ('recalcular'), no en cada GET
+    if request.method == 'POST' and request.POST.get('accion') == 'recalcular':
+        if conteo.estado == ConteoInventario.Estados.ABIERTO:
+            conteos.calcular_diferencias(conteo)
+            messages.success(request, 'Diferencias recalculadas contra el saldo actual.')
+        return redirect('conteo_detalle', pk=conteo.pk)
+    if request.method == 'POST':
+        form = CargaConteoForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                lineas = conteos.cargar_archivo(conteo, form.cleaned_data['archivo'])
+                conteos.calcular_diferencias(conteo)
+                messages.success(request, f'{lineas} líneas cargadas.')
+                return redirect('conteo_detalle', pk=conteo.pk)
+            except ValidationError as e:
+                messages.error(request, ' '.join(e.messages))
+    else:
+        form = CargaConteoForm()
+
+    lineas = conteo.lineas.select_related('producto').order_by('producto__sku', 'lote')
+    if request.GET.get('solo_diferencias'):
+        lineas = lineas.exclude(diferencia=0)
+    resumen = conteo.lineas.aggregate(
+        total=Count('pk'),
+        con_diferencia=Count('pk', filter=~Q(diferencia=0)),
+        sobrantes=Sum('diferencia', filter=Q(diferencia__gt=0)),
+        faltantes=Sum('diferencia', filter=Q(diferencia__lt=0)),
+    )
+    page_obj = Paginator(lineas, 100).get_page(request.GET.get('page'))
+    return render(request, 'gestion/conteo_detalle.html', {'conteo': conteo, 'form': form, 'page_obj': page_obj, 'resumen': resumen})
+
+@login_required
+@require_POST
+@requiere_permiso(ADMINISTRAR, json=True)
+def conteo_escanear(request, pk):
+    # Lectura del escáner: {"codigo", "cantidad" (opcional, 1), "lote" (opcional)}
+    conteo = get_object_or_404(ConteoInventario, pk=pk)
+    try:
+        datos = json.loads(request.body)
+        cantidad = int(datos.get('cantidad', 1))
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'JSON inválido.'}, status=400)
+    if cantidad <= 0:
+        return JsonResponse({'error': 'La cantidad debe ser positiva.'}, status=400)
+    try:
+        conteos.registrar_lectura(conteo, datos.get('codigo', ''), cantidad, datos.get('lote', ''))
+    except ValidationError as e:
+        return JsonResponse({'error': ' '.join(e.messages)}, status=400)
+    return JsonResponse({'ok': True})
+
+@login_required
+@require_POST
+@requiere_permiso(ADMINISTRAR)
+def conteo_contabilizar(request, pk):
+    conteo = get_object_or_404(ConteoInventario, pk=pk)
+    try:
+        ajustes = conteos.contabilizar(conteo)
+        messages.success(request, f'Conteo contabilizado: {ajustes} ajustes registrados.')
+    except ValidationError as e:
+        messages.error(request, f"Error: {' '.join(e.messages)}")
+    return redirect('conteo_detalle', pk=conteo.pk)
+
+# ----------------------------------------------
+# PUNTO DE VENTA (POS)
+# ----------------------------------------------
+@login_required
+@requiere_permiso(VER, json=True)
+def escanear_codigo(request, codigo):
+    # Búsqueda por EAN/UPC o SKU desde la caché en memoria (ver escaner.py)
+    resumen = cache_escaner.buscar(codigo.strip())
+    if resumen is None:
+        return JsonResponse({'error': f'Código {codigo} no encontrado.'}, status=404)
+    return JsonResponse(resumen)
+
+@login_required
+@require_POST
+@requiere_permiso(REGISTRAR, json=True)
+def registrar_venta_pos(request):
+    # Acepta una venta {"id_venta", "bodega", "lineas": [{"codigo", "cantidad"}]}
+    # o un micro-lote {"ventas": [...]}. Cada venta se registra por separado.
+    try:
+        datos = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'JSON inválido.'}, status=400)
+
+    ventas = datos.get('ventas') if isinstance(datos, dict) and 'ventas' in datos else [datos]
+    if not isinstance(ventas, list):
+        return JsonResponse({'error': "'ventas' debe ser una lista."}, status=400)
+
+    resultados = []
+    for venta in ventas:
+        if not isinstance(venta, dict):
+            resultados.append({'estado': 'ERROR', 'error': 'Venta con formato inválido.'})
+            continue
+        try:
+            respuesta, es_nueva = registrar_venta(
+                venta.get('id_venta'), venta.get('bodega'), venta.get('lineas'), usuario=request.user
+            )
+            resultados.append({**respuesta, 'estado': 'OK' if es_nueva else 'DUPLICADA'})
+        except ValidationError as e:
+            resultados.append({'id_venta': venta.get('id_venta'), 'estado': 'ERROR', 'error': ' '.join(e.messages)})
+
+    return JsonResponse({'ventas': resultados})
+
+# ----------------------------------------------
+# SNAPSHOT ANALÍTICO (ver snapshot.py)
+# ----------------------------------------------
+@login_required
+@requiere_permiso(ADMINISTRAR, json=True)
+def snapshot_tabla(request, tabla):
+    # Una tabla completa como CSV gzip en streaming; ?desde_id=N para movimientos incrementales
+    if tabla not in snapshot.TABLAS:
+        return JsonResponse({'error': f'Tabla desconocida. Opciones: {", ".join(snapshot.TABLAS)}'}, status=404)
+    try:
+        desde_id = int(request.GET.get('desde_id', 0))
+    except ValueError:
+        return JsonResponse({'error': 'desde_id inválido.'}, status=400)
+
+    response = StreamingHttpResponse(snapshot.csv_gzip_stream(tabla, desde_id), content_type='application/gzip')
+    response['Content-Disposition'] = f'attachment; filename="{tabla}.csv.gz"'
+    return response
+
+# ----------------------------------------------
+# SINCRONIZACIÓN DE DISPOSITIVOS (HANDHELDS)
+# ----------------------------------------------
+@login_required
+@gzip_page
+@requiere_permiso(VER, json=True)
+def sync_catalogo(request):
+    # ?since=<cursor> devuelve solo lo cambiado; sin cursor (o 0) devuelve todo,
+    # por páginas: las siguientes se piden con los parámetros de 'siguiente'
+    try:
+        cursor = int(request.GET.get('since', 0))
+        limite = int(request.GET.get('limite', sincronizacion.LIMITE_POR_DEFECTO))
+        desde = int(request.GET.get('desde', 0))
+        corte = int(request.GET['corte']) if request.GET.get('corte') else None
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros since/limite/desde/corte inválidos.'}, status=400)
+    modelo = request.GET.get('modelo') or None
+    if modelo is not None and modelo not in sincronizacion.MODELOS:
+        return JsonResponse({'error': f'Modelo desconocido: {modelo}.'}, status=400)
+
+    if cursor <= 0:
+        datos = sincronizacion.snapshot_completo(limite, modelo, desde, corte)
+    else:
+        datos = sincronizacion.cambios_desde(cursor, limite)
+    return JsonResponse(datos)
+
+# ----------------------------------------------
+# EVENTOS EN VIVO DE STOCK (SSE, requiere servidor ASGI)
+# ----------------------------------------------
+def _ids_desde_parametro(valor):
+    return {int(v) for v in valor.split(',') if v.strip().isdigit()} if valor else set()
+
+@login_required
+@requiere_permiso(VER, json=True)
+async def stock_eventos(request):
+    # Filtros opcionales: ?bodega=1,2&producto=10,11
+    bodegas = _ids_desde_parametro(request.GET.get('bodega'))
+    productos = _ids_desde_parametro(request.GET.get('producto'))
+
+    async def flujo():
+        suscripcion = broker_stock.suscribir(bodegas, productos)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                lote = await suscripcion.siguiente_lote(espera_maxima=15)
+                if not lote:
+                    # Comentario SSE para mantener viva la conexión (proxies)
+                    yield ': ping\n\n'
+                    continue
+                for evento in lote:
+                    yield f"event: stock\ndata: {json.dumps(evento)}\n\n"
+        finally:
+            broker_stock.desuscribir(suscripcion)
+
+    response = StreamingHttpResponse(flujo(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+# ----------------------------------------------
+# MÉTRICAS PROMETHEUS (/metrics)
+# ----------------------------------------------
+def metricas_prometheus(request):
+    # Sin login (lo consulta el scraper): con METRICAS_TOKEN se exige como
+    # Bearer; sin token solo responde a las IPs de METRICAS_IPS (loopback)
+    token = getattr(settings, 'METRICAS_TOKEN', None)
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse(status=401)
+    elif ip_de(request) not in getattr(settings, 'METRICAS_IPS', ('127.0.0.1', '::1')):
+        return HttpResponse(status=403)
+    return HttpResponse(metricas.registro.texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # ----------------------------------------------
 # EXPORTACIONES A EXCEL (OPTIMIZADO)
 # ----------------------------------------------
 
 # Función auxiliar para no repetir código
 def export_base(filename, headers, data_generator):
-    wb = Workbook()
+    inicio = time.perf_counter()
+    wb = cargar('excel.libro')()
     ws = wb.active
     ws.title = filename.capitalize()
     ws.append(headers)
     
+    filas = 0
     for row in data_generator:
         ws.append(row)
+        filas += 1
     
     response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     response['Content-Disposition'] = f'attachment; filename="listado_{filename}.xlsx"'
     wb.save(response)
+
+    metricas.exportacion_duracion.observar(time.perf_counter() - inicio, exportacion=filename)
+    metricas.exportacion_filas_total.inc(filas, exportacion=filename)
     return response
 
 @login_required
+@requiere_permiso(EXPORTAR)
 def exportar_productos_excel(request):
-    # 1. Recuperar filtro
-    query = request.GET.get('q', '')
-    productos = Producto.objects.all().order_by('sku')
+    # 1. Categoría y proveedores en bloque (sin una consulta por fila)
+    productos = con_proveedores(Producto.objects.select_related('categoria'))
     
-    # 2. Aplicar filtro (Igual que en la lista)
-    if query:
-        productos = productos.filter(Q(nombre__icontains=query) | Q(sku__icontains=query))
+    # 2. Aplicar filtro y orden (Igual que en la lista)
+    productos, _ = _filtrar_productos(request, productos, orden_por_defecto='sku')
 
     # 3. Generar datos (Incluyendo Categoría legible y Precio con IVA)
     data = []
     for p in productos:
         cat_nombre = p.categoria.nombre if p.categoria else "Sin Categoría"
-        # Usamos la propiedad .precio_venta_con_iva del modelo
-        data.append([p.sku, p.nombre, cat_nombre, p.stock_actual, p.precio_venta, p.precio_venta_con_iva])
+        proveedores = ", ".join(proveedor.razon_social for proveedor in p.proveedores_lista)
+        # precio_con_iva viene calculado en la consulta (ver ProductoQuerySet)
+        data.append([p.sku, p.nombre, cat_nombre, p.stock_actual, p.precio_venta, p.precio_con_iva, proveedores])
 
-    return export_base('productos', ['SKU', 'Nombre', 'Categoría', 'Stock', 'Precio Neto', 'Precio c/IVA'], data)
+    return export_base('productos', ['SKU', 'Nombre', 'Categoría', 'Stock', 'Precio Neto', 'Precio c/IVA', 'Proveedores'], data)
 
 @login_required
+@requiere_permiso(EXPORTAR)
 def exportar_proveedores_excel(request):
     query = request.GET.get('q', '')
     qs = Proveedor.objects.all().order_by('razon_social')
@@ -422,22 +767,47 @@ def exportar_proveedores_excel(request):
     if query:
         qs = qs.filter(Q(razon_social__icontains=query) | Q(rut_nif__icontains=query))
 
-    data = ([p.rut_nif, p.razon_social, p.email, p.telefono, p.get_estado_display()] for p in qs)
-    return export_base('proveedores', ['RUT', 'Razón Social', 'Email', 'Teléfono', 'Estado'], data)
+    def filas():
+        # Por tandas: las fichas se piden (a la caché o en bloque) de a 500 proveedores
+        tanda = []
+        for proveedor in qs.iterator(chunk_size=500):
+            tanda.append(proveedor)
+            if len(tanda) == 500:
+                yield from con_fichas(tanda)
+                tanda = []
+        yield from con_fichas(tanda)
+
+    data = (
+        [p.rut_nif, p.razon_social, p.email, p.telefono, p.get_estado_display(),
+         p.ficha['productos'], p.ficha['ultima_entrega'].strftime('%Y-%m-%d') if p.ficha['ultima_entrega'] else '',
+         p.ficha['volumen'], p.ficha['entregas'], p.ficha['a_tiempo']]
+        for p in filas()
+    )
+    return export_base('proveedores', [
+        'RUT', 'Razón Social', 'Email', 'Teléfono', 'Estado',
+        'Productos', 'Última Entrega', 'Volumen Entregado', 'Entregas', '% a Tiempo',
+    ], data)
 
 @login_required
+@requiere_permiso(EXPORTAR)
 def exportar_inventario_excel(request):
     query = request.GET.get('q', '')
-    qs = MovimientoInventario.objects.all().order_by('-fecha')
-    
-    if query:
-        qs = qs.filter(Q(producto__sku__icontains=query) | Q(producto__nombre__icontains=query))
+    filtro = Q(producto__sku__icontains=query) | Q(producto__nombre__icontains=query) if query else None
+
+    # ?historico=1 incluye los períodos archivados (ver archivo.py)
+    if request.GET.get('historico'):
+        qs = historial(filtro)
+    else:
+        qs = MovimientoInventario.objects.select_related('producto', 'bodega').order_by('-fecha')
+        if filtro is not None:
+            qs = qs.filter(filtro)
 
     # Incluimos Bodega y Tipo legible
     data = ([m.fecha.strftime('%Y-%m-%d'), m.get_tipo_display(), m.producto.sku, m.cantidad, m.bodega.nombre if m.bodega else ""] for m in qs)
     return export_base('inventario', ['Fecha', 'Tipo', 'Producto', 'Cantidad', 'Bodega'], data)
 
 @login_required
+@requiere_permiso(ADMINISTRAR)
 def exportar_usuarios_excel(request):
     query = request.GET.get('q', '')
     qs = CustomUser.objects.all().order_by('username')
@@ -449,6 +819,7 @@ def exportar_usuarios_excel(request):
     return export_base('usuarios', ['Usuario', 'Email', 'Rol', 'Estado'], data)
 
 @login_required
+@requiere_permiso(EXPORTAR)
 def exportar_categorias_excel(request):
     # Las categorías suelen ser pocas, el filtro es opcional pero útil
     query = request.GET.get('q', '')
@@ -459,10 +830,36 @@ def exportar_categorias_excel(request):
     return export_base('categorias', ['Nombre'], data)
 
 @login_required
+@requiere_permiso(EXPORTAR)
 def exportar_marcas_excel(request):
     query = request.GET.get('q', '')
     qs = Marca.objects.all().order_by('nombre')
     if query: qs = qs.filter(nombre__icontains=query)
     
     data = ([i.nombre] for i in qs)
-    return export_base('marcas', ['Nombre'], data)
\ No newline at end of file
+    return export_base('marcas', ['Nombre'], data)
+
+@login_required
+@requiere_permiso(EXPORTAR)
+def exportar_valorizacion_excel(request):
+    reporte = valorizacion_stock()
+    data = (
+        [dimension, fila['nombre'], fila['unidades'], fila['valor']]
+        for dimension, clave in (('Categoría', 'por_categoria'), ('Marca', 'por_marca'), ('Bodega', 'por_bodega'))
+        for fila in reporte[clave]
+    )
+    return export_base('valorizacion', ['Dimensión', 'Nombre', 'Unidades', 'Valor'], data)
+
+@login_required
+@requiere_permiso(EXPORTAR)
+def exportar_abc_excel(request):
+    try:
+        dias = min(max(int(request.GET.get('dias', DIAS_ABC)), 1), 366)
+    except ValueError:
+        dias = DIAS_ABC
+    reporte = clasificacion_abc(dias)
+    data = (
+        [f['ranking'], f['sku'], f['nombre'], f['unidades'], f['valor_consumo'], f['participacion_acumulada'], f['clase']]
+        for f in reporte['filas']
+    )
+    return export_base('abc', ['Ranking', 'SKU', 'Nombre', 'Unidades', 'Valor Consumo', '% Acumulado', 'Clase'], data)